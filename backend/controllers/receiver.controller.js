@@ -173,8 +173,8 @@ async function analyzeFakeRequest(requestId, userId, location) {
     // Extract features
     const features = await mlService.extractFeatures(userId, location);
 
-    // Call ML API
-    const mlResult = await mlService.analyzeFakeRequest(features);
+    // Call ML API (batched with other requests created at the same time)
+    const mlResult = await mlService.enqueueFakeRequestAnalysis(features);
 
     // Save analysis
     await FakeRequestAnalysis.create({
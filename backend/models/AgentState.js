@@ -67,7 +67,8 @@ const agentStateSchema = new mongoose.Schema({
       reliabilityScore: Number,
       responseTimePrediction: Number, // predicted minutes
       successProbability: Number, // 0-1
-      reason: String // why this donor was selected
+      reason: String, // why this donor was selected
+      scoreBreakdown: mongoose.Schema.Types.Mixed // ML sub-scores, sent back with the donor's response
     }],
     
     strategyType: {
@@ -164,11 +164,11 @@ class AgentController {
     }
 
     try {
-      console.log(`🤖 Calling ML API: ${this.mlApiUrl}/score-donors`);
+      console.log(`🤖 Calling ML API: ${this.mlApiUrl}/match`);
       console.log(`   Donors to score: ${donorData.length}`);
       
-      // Score donors via ML service
-      const scoringResponse = await axios.post(`${this.mlApiUrl}/score-donors`, {
+      // Score donors and get the strategy recommendation in one call
+      const matchResponse = await axios.post(`${this.mlApiUrl}/match`, {
         donors: donorData,
         request_context: {
           blood_group: requestContext.bloodGroup,
@@ -178,32 +178,24 @@ class AgentController {
         }
       }, { timeout: 10000 }); // Increased timeout to 10s
 
-      const scoredDonors = scoringResponse.data.scored_donors || [];
+      const scoredDonors = matchResponse.data.scored_donors || [];
       console.log(`✅ ML API scored ${scoredDonors.length} donors`);
 
       // Convert ML format to our format
+      const donorsById = new Map(donorData.map(d => [d.donor_id, d]));
       const rankedDonors = scoredDonors.map(donor => ({
         donorId: donor.donor_id,
         score: donor.total_score,
         confidence: donor.confidence,
-        distance: donorData.find(d => d.donor_id === donor.donor_id)?.distance || 0,
-        reliabilityScore: donorData.find(d => d.donor_id === donor.donor_id)?.reliability_score || 50,
+        distance: donorsById.get(donor.donor_id)?.distance || 0,
+        reliabilityScore: donorsById.get(donor.donor_id)?.reliability_score || 50,
         responseTimePrediction: donor.predictions.response_time_minutes,
         successProbability: donor.predictions.success_probability,
-        reason: donor.reason
+        reason: donor.reason,
+        scoreBreakdown: donor.score_breakdown
       }));
 
-      // Get strategy recommendation
-      const strategyResponse = await axios.post(`${this.mlApiUrl}/recommend-strategy`, {
-        scored_donors: scoredDonors,
-        request_context: {
-          urgency: requestContext.urgency,
-          blood_group: requestContext.bloodGroup,
-          units_required: requestContext.unitsRequired
-        }
-      }, { timeout: 5000 });
-
-      const strategy = strategyResponse.data.strategy;
+      const strategy = matchResponse.data.strategy;
 
       return {
         rankedDonors,
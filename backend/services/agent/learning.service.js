@@ -1,6 +1,75 @@
 const axios = require('axios');
 const AgentState = require('../../models/AgentState');
 
+// Donor feedback is buffered and sent to the ML service in batches. The
+// buffer is shared by every LearningService (controllers create one per
+// request), retried while the ML service is unreachable, and flushed before
+// the process exits.
+const learningQueue = {
+  events: [],
+  timer: null,
+  exiting: false
+};
+const LEARNING_BATCH_SIZE = 50;
+const LEARNING_FLUSH_DELAY_MS = 1000;
+const LEARNING_RETRY_DELAY_MS = 5000;
+const MAX_PENDING_LEARNING_EVENTS = 10000;
+// Support both ML_API_URL and ML_SERVICE_URL for backward compatibility
+const ML_API_URL = process.env.ML_API_URL || process.env.ML_SERVICE_URL || 'http://localhost:5001';
+
+function scheduleLearningFlush(delayMs) {
+  if (learningQueue.timer || learningQueue.exiting) return;
+  learningQueue.timer = setTimeout(flushLearningEvents, delayMs);
+  learningQueue.timer.unref?.();
+}
+
+/**
+ * Send all queued learning events in a single request
+ * Events the ML service could not take (unreachable or 5xx) are put back
+ * and retried; events it rejected as invalid (4xx) are dropped.
+ */
+async function flushLearningEvents() {
+  if (learningQueue.timer) {
+    clearTimeout(learningQueue.timer);
+    learningQueue.timer = null;
+  }
+
+  const events = learningQueue.events.splice(0);
+  if (events.length === 0) return;
+
+  try {
+    await axios.post(`${ML_API_URL}/update-learning-batch`, { events }, { timeout: 10000 });
+  } catch (error) {
+    const status = error.response?.status;
+    if (status >= 400 && status < 500) {
+      console.error(`ML service rejected ${events.length} learning events:`, error.response.data?.message || error.message);
+      return;
+    }
+
+    learningQueue.events.unshift(...events);
+    const overflow = learningQueue.events.length - MAX_PENDING_LEARNING_EVENTS;
+    if (overflow > 0) {
+      learningQueue.events.splice(0, overflow); // Oldest first
+      console.error(`Dropped ${overflow} learning events while the ML service was unavailable`);
+    }
+    console.error('Failed to update ML learning, will retry:', error.message);
+    scheduleLearningFlush(LEARNING_RETRY_DELAY_MS);
+    // Don't throw - learning update is non-critical
+  }
+}
+
+async function flushLearningEventsOnExit() {
+  learningQueue.exiting = true;
+  await flushLearningEvents();
+}
+
+// The flush timer is unref'd, so send what is left when the event loop drains...
+process.once('beforeExit', flushLearningEventsOnExit);
+// ...or on SIGTERM (deploys), then let the signal terminate the process as usual
+process.once('SIGTERM', () => {
+  flushLearningEventsOnExit().finally(() => process.kill(process.pid, 'SIGTERM'));
+});
+
 /**
  * Learning Service
  * Implements the LEARN layer of the Agentic AI system
@@ -9,8 +78,7 @@ const AgentState = require('../../models/AgentState');
 
 class LearningService {
   constructor() {
-    // Support both ML_API_URL and ML_SERVICE_URL for backward compatibility
-    this.mlApiUrl = process.env.ML_API_URL || process.env.ML_SERVICE_URL || 'http://localhost:5001';
+    this.mlApiUrl = ML_API_URL;
   }
 
   /**
@@ -51,8 +119,8 @@ class LearningService {
     agentState.learning.donorResponses.push(responseRecord);
     await agentState.save();
 
-    // Send feedback to ML service for learning
-    await this._updateMLLearning(donorId, responseTimeMinutes, accepted);
+    // Send feedback to ML service for learning, with the sub-scores the donor was ranked on
+    await this._updateMLLearning(donorId, responseTimeMinutes, accepted, donorDecision?.scoreBreakdown);
 
     console.log(`📚 Recorded response: Donor ${donorId}, Time: ${responseTimeMinutes.toFixed(1)}min, Accepted: ${accepted}`);
 
@@ -229,18 +297,36 @@ class LearningService {
 
   /**
    * Update ML service with learning data
+   * Events are queued and flushed to /update-learning-batch once the batch
+   * is full or after a short delay, instead of one request per response.
+   * scoreBreakdown is the donor's score_breakdown from the scoring response;
+   * the ML service trains its scoring weights on it, and any ML worker can
+   * use it (the service's own memory of recent scores is per worker).
    */
-  async _updateMLLearning(donorId, responseTimeMinutes, success) {
-    try {
-      await axios.post(`${this.mlApiUrl}/update-learning`, {
-        donor_id: donorId.toString(),
-        response_time_minutes: responseTimeMinutes,
-        success: success
-      });
-    } catch (error) {
-      console.error('Failed to update ML learning:', error.message);
-      // Don't throw - learning update is non-critical
+  async _updateMLLearning(donorId, responseTimeMinutes, success, scoreBreakdown = null) {
+    const event = {
+      donor_id: donorId.toString(),
+      response_time_minutes: responseTimeMinutes,
+      success: success,
+      timestamp: new Date().toISOString()
+    };
+    if (scoreBreakdown) {
+      event.score_breakdown = scoreBreakdown;
     }
+    learningQueue.events.push(event);
+
+    if (learningQueue.events.length >= LEARNING_BATCH_SIZE) {
+      await flushLearningEvents();
+    } else {
+      scheduleLearningFlush(LEARNING_FLUSH_DELAY_MS);
+    }
+  }
+
+  /**
+   * Send all queued learning events now
+   */
+  async _flushMLLearning() {
+    await flushLearningEvents();
   }
 
   /**
@@ -179,7 +179,8 @@ class SmartMatchingEngine {
           city: donor.city,
           state: donor.state,
           lastDonationDate: donor.lastDonationDate,
-          totalDonations: donor.totalDonations
+          totalDonations: donor.totalDonations,
+          isAvailable: donor.isAvailable
         },
         metrics: {
           distance: Math.round(distance * 10) / 10, // km with 1 decimal
@@ -209,7 +210,7 @@ class SmartMatchingEngine {
     let finalMatches = scoredDonors;
     if (useMLRanking && scoredDonors.length > 0) {
       try {
-        finalMatches = await this.applyMLRanking(scoredDonors, request);
+        finalMatches = await this.applyMLRanking(scoredDonors, request, limit);
       } catch (error) {
         console.error('ML Ranking failed, using default scoring:', error.message);
       }
@@ -246,32 +247,46 @@ class SmartMatchingEngine {
 
   /**
    * Apply ML-based re-ranking using Python service
+   * Only the top `topK` donors come back from the ML service; the rest keep
+   * their rule-based order after them.
    */
-  async applyMLRanking(scoredDonors, request) {
+  async applyMLRanking(scoredDonors, request, topK = 20) {
     try {
-      const features = scoredDonors.map(d => ({
+      const donors = scoredDonors.map(d => ({
+        donor_id: d.donor.id.toString(),
+        blood_group: d.donor.bloodGroup,
         distance: d.metrics.distance,
-        bloodMatch: d.isExactMatch ? 1 : 0,
-        successRate: d.metrics.successRate / 100,
-        reliabilityScore: d.metrics.reliabilityScore,
-        totalDonations: d.metrics.totalDonations,
-        canDonate: d.canDonate ? 1 : 0,
-        urgencyFactor: request.urgency === 'critical' ? 3 : (request.urgency === 'urgent' ? 2 : 1)
+        reliability_score: Math.round(d.metrics.reliabilityScore * 100),
+        can_donate: d.canDonate,
+        days_since_last_donation: d.donor.lastDonationDate
+          ? Math.floor((Date.now() - new Date(d.donor.lastDonationDate)) / (1000 * 60 * 60 * 24))
+          : 999,
+        is_available: d.donor.isAvailable !== false
       }));
 
       const response = await axios.post(`${this.mlApiUrl}/rank-donors`, {
-        donors: features,
-        request_urgency: request.urgency
+        donors,
+        request_context: {
+          blood_group: request.bloodGroup,
+          urgency: request.urgency
+        },
+        top_k: topK
       }, { timeout: 5000 });
 
       if (response.data.success && response.data.rankings) {
-        // Re-order based on ML rankings
-        const rankings = response.data.rankings;
-        return scoredDonors.map((donor, idx) => ({
-          ...donor,
-          mlScore: rankings[idx]?.score || donor.score,
-          mlConfidence: rankings[idx]?.confidence || 0
-        })).sort((a, b) => (b.mlScore || b.score) - (a.mlScore || a.score));
+        // ML-ranked donors first, in ML order, then the remainder. Matched by
+        // donor_id, since the ML service may leave out ineligible donors
+        const donorsById = new Map(scoredDonors.map(d => [d.donor.id.toString(), d]));
+        const ranked = response.data.rankings
+          .filter(ranking => donorsById.has(ranking.donor_id))
+          .map(ranking => ({
+            ...donorsById.get(ranking.donor_id),
+            mlScore: ranking.total_score,
+            mlConfidence: ranking.confidence,
+            mlReason: ranking.reason
+          }));
+        const rankedIds = new Set(ranked.map(d => d.donor.id.toString()));
+        return ranked.concat(scoredDonors.filter(d => !rankedIds.has(d.donor.id.toString())));
       }
     } catch (error) {
       console.log('ML ranking service unavailable, using default scoring');
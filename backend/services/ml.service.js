@@ -40,6 +40,96 @@ exports.analyzeFakeRequest = async (features) => {
   }
 };
 
+/**
+ * Call ML API to analyze many blood requests in a single round trip
+ * @param {Array<Object>} featuresList - ML features for each request
+ * @returns {Promise<Array<Object>>} - ML prediction results, in input order
+ */
+exports.analyzeFakeRequestsBatch = async (featuresList) => {
+  if (!featuresList || featuresList.length === 0) {
+    return [];
+  }
+
+  try {
+    const mlApiUrl = process.env.ML_API_URL || 'http://localhost:5001';
+
+    const response = await axios.post(`${mlApiUrl}/predict-batch`, {
+      features: featuresList.map(features => [
+        features.requestsPerDay,
+        features.accountAgeDays,
+        features.timeGapHours,
+        features.locationChanges
+      ])
+    }, {
+      timeout: 10000 // 10 second timeout for the whole batch
+    });
+
+    return response.data.results.map(result => ({
+      success: true,
+      prediction: result.prediction,
+      score: result.score,
+      confidence: result.confidence
+    }));
+  } catch (error) {
+    console.error('ML API batch error:', error.message);
+
+    // If ML service is down, default every request to genuine
+    return featuresList.map(() => ({
+      success: false,
+      prediction: 'genuine',
+      score: 0,
+      confidence: 0,
+      error: 'ML service unavailable'
+    }));
+  }
+};
+
+// Analyses queued by enqueueFakeRequestAnalysis, sent together to /predict-batch
+const pendingAnalyses = [];
+let analysisFlushTimer = null;
+const ANALYSIS_BATCH_SIZE = 100;
+const ANALYSIS_FLUSH_DELAY_MS = 50;
+
+/**
+ * Queue one blood request for fake detection
+ * Requests created close together are scored in a single /predict-batch
+ * round trip, once the batch is full or after a short delay. Rows the
+ * batch call could not score are retried one by one through /predict.
+ * @param {Object} features - ML features for analysis
+ * @returns {Promise<Object>} - ML prediction result
+ */
+exports.enqueueFakeRequestAnalysis = (features) => {
+  return new Promise((resolve) => {
+    pendingAnalyses.push({ features, resolve });
+
+    if (pendingAnalyses.length >= ANALYSIS_BATCH_SIZE) {
+      flushFakeRequestAnalyses();
+    } else if (!analysisFlushTimer) {
+      analysisFlushTimer = setTimeout(flushFakeRequestAnalyses, ANALYSIS_FLUSH_DELAY_MS);
+    }
+  });
+};
+
+/**
+ * Score every queued analysis in one batch call
+ */
+async function flushFakeRequestAnalyses() {
+  if (analysisFlushTimer) {
+    clearTimeout(analysisFlushTimer);
+    analysisFlushTimer = null;
+  }
+
+  const queued = pendingAnalyses.splice(0);
+  if (queued.length === 0) return;
+
+  const results = await exports.analyzeFakeRequestsBatch(queued.map(item => item.features));
+
+  await Promise.all(queued.map(async (item, i) => {
+    // Per-request fallback when the batch call failed
+    item.resolve(results[i].success ? results[i] : await exports.analyzeFakeRequest(item.features));
+  }));
+}
+
 /**
  * Extract features from user data for ML analysis
  * @param {String} userId - User ID
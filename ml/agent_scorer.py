@@ -7,6 +7,75 @@ Part of the DECIDE layer in the agent loop
 import numpy as np
 from datetime import datetime, timedelta
 import math
+import time
+from collections.abc import Mapping
+
+from blood_compatibility import compatible_bits, group_bits, match_score, match_scores
+from geo_index import haversine_km, parse_location
+from learning_store import LearningStore
+
+_BREAKDOWN_KEYS = ('total', 'confidence', 'distance', 'reliability', 'eligibility',
+                   'response_history', 'blood_match', 'availability')
+
+# Per-donor fields used for scoring and the value assumed when one is missing
+DONOR_FIELD_DEFAULTS = {
+    'distance': 999,
+    'reliability_score': 50,
+    'can_donate': False,
+    'days_since_last_donation': 999,
+    'is_available': False,
+    'last_active_hours': 24
+}
+
+# Decimal places per output column (everything else rounds to 2)
+_ROUNDING = {'response_time_minutes': 1}
+
+
+def _round_column(values, ndigits):
+    """
+    Round an array exactly like Python's round(value, ndigits).
+    
+    np.round scales by 10**ndigits before rounding, so a value sitting right
+    on a half-way point can round the other way and reorder ties in the
+    ranking. Everywhere else both pick the same decimal, so only those
+    borderline entries are re-rounded in Python.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    scaled = values * (10 ** ndigits)
+    distance_to_half = np.abs(scaled - np.floor(scaled) - 0.5)
+    borderline = np.flatnonzero(distance_to_half <= 1e-6 * np.maximum(1.0, np.abs(scaled)))
+    for i in borderline.tolist():
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def _rank_order(totals, top_k=None):
+    """
+    Indices of the top_k totals, best first (all of them when top_k is None).
+    
+    Ties keep input order, matching list.sort(key=..., reverse=True). For a
+    top_k smaller than the pool, np.partition finds the k-th best total and
+    only the donors at or above it are sorted.
+    """
+    negated = -totals
+    if top_k is None or top_k >= len(totals):
+        return np.argsort(negated, kind='stable')
+    if top_k <= 0:
+        return np.array([], dtype=np.intp)
+    
+    kth = np.partition(negated, top_k - 1)[top_k - 1]
+    candidates = np.flatnonzero(negated <= kth)
+    order = candidates[np.argsort(negated[candidates], kind='stable')]
+    return order[:top_k]
+
+
+def _timed(result, timer, started, scored):
+    """Report (scoring seconds, ranking seconds) to an optional timer, pass result through"""
+    if timer is not None:
+        timer(scored - started, time.perf_counter() - scored)
+    return result
+
 
 class AgentScorer:
     """
@@ -14,8 +83,11 @@ class AgentScorer:
     and predicts donor behavior
     """
     
-    def __init__(self):
-        # Weights for different factors (tunable through learning)
+    def __init__(self, learning_store=None, geo_index=None):
+        # Weights for different factors (tunable through learning, see
+        # weight_learner.py). Replaced as a whole by set_weights(), never
+        # changed in place, so a scoring call reads one consistent set.
+        self.weights_version = 0
         self.weights = {
             'distance': 0.25,
             'reliability': 0.20,
@@ -26,42 +98,435 @@ class AgentScorer:
         }
         
         # Learned parameters (will be updated through feedback)
-        self.avg_response_times = {}  # donor_id -> avg minutes
-        self.success_rates = {}  # donor_id -> success percentage
+        self.learning_store = learning_store if learning_store is not None else LearningStore()
+        self.avg_response_times = self.learning_store.avg_response_times  # donor_id -> avg minutes
+        self.success_rates = self.learning_store.success_rates  # donor_id -> success percentage
+        
+        # Optional DonorGeoIndex: distances for donors sent without one
+        self.geo_index = geo_index
+        
+        # Optional callable given (donor_id column, returned row order, score
+        # arrays) after each scoring call; used by the weight learner
+        self.score_observer = None
+    
+    def set_weights(self, weights, version):
+        """Publish a new weight set (one reference assignment, safe while scoring)"""
+        self.weights = dict(weights)
+        self.weights_version = version
     
-    def score_donors(self, donors_data, request_context):
+    def score_donors(self, donors_data, request_context, timer=None):
         """
         Score and rank donors based on request context
         
         Args:
             donors_data: List of donor objects with their attributes
             request_context: Dictionary with request details (urgency, location, etc.)
+            timer: Optional callable, given the seconds spent scoring and the
+                seconds spent ranking and building the response
         
         Returns:
-            List of scored donors with predictions
+            List of scored donors with predictions. Donors who cannot give to
+            the recipient's blood group, or cannot donate and gave blood in the
+            last 60 days, are left out.
         """
-        scored_donors = []
+        if not donors_data:
+            return []
+        
+        started = time.perf_counter()
+        columns = self._donor_columns(donors_data, request_context)
+        scores = self._score_columns(columns, request_context)
+        scored = time.perf_counter()
+        order = _rank_order(scores['total'])
+        
+        return _timed(self._build_scored_donors(columns, scores, order), timer, started, scored)
+    
+    def rank_donors(self, donors_data, request_context, top_k=10, timer=None):
+        """
+        Score donors and return only the top_k, best first
+        
+        Same scores and order as score_donors()[:top_k], but the top_k are
+        picked with a partial selection and score_breakdown / reason are only
+        built for the returned donors.
+        
+        Returns:
+            Tuple of (scored donors, their positions in donors_data)
+        """
+        if not donors_data:
+            return [], []
+        
+        started = time.perf_counter()
+        columns = self._donor_columns(donors_data, request_context)
+        scores = self._score_columns(columns, request_context)
+        scored = time.perf_counter()
+        order = _rank_order(scores['total'], top_k)
+        
+        ranked = _timed(self._build_scored_donors(columns, scores, order), timer, started, scored)
+        return ranked, columns['position'][order].tolist()
+    
+    def score_donor_columns(self, donor_columns, request_context, top_k=None, timer=None):
+        """
+        Score donors supplied column-wise instead of as a list of dicts
+        
+        Args:
+            donor_columns: Mapping of donor field name (see DONOR_FIELD_DEFAULTS,
+                plus donor_id and blood_group) to an array with one entry per
+                donor. Missing columns take the per-donor defaults.
+            request_context: Same as score_donors
+            top_k: Optional number of donors to return
+            timer: Same as score_donors
+        
+        Returns:
+            List of scored donors, best first
+        """
+        if len(donor_columns['donor_id']) == 0:
+            return []
+        
+        started = time.perf_counter()
+        columns = self._table_columns(donor_columns, request_context)
+        scores = self._score_columns(columns, request_context)
+        scored = time.perf_counter()
+        order = _rank_order(scores['total'], top_k)
+        
+        return _timed(self._build_scored_donors(columns, scores, order), timer, started, scored)
+    
+    def match_donors(self, donors, request_context, top_k=None, timer=None):
+        """
+        Score, rank and recommend a strategy in one pass
+        
+        Equivalent to recommend_strategy(score_donors(...)), but the two
+        aggregates the strategy needs (donors scoring 60 or more, mean success
+        probability of the top 10) come straight from the score arrays.
+        
+        Args:
+            donors: List of donor dicts, or a column mapping as accepted by
+                score_donor_columns
+            request_context: Same as score_donors
+            top_k: Optional number of scored donors to return; the strategy
+                always considers the whole pool
+            timer: Same as score_donors (the strategy counts as ranking)
+        
+        Returns:
+            Tuple of (scored donors best first, strategy dict)
+        """
+        if isinstance(donors, Mapping):
+            empty = len(donors['donor_id']) == 0
+        else:
+            empty = not donors
+        if empty:
+            return [], self._strategy_for(request_context, 0, 0)
+        
+        started = time.perf_counter()
+        if isinstance(donors, Mapping):
+            columns = self._table_columns(donors, request_context)
+        else:
+            columns = self._donor_columns(donors, request_context)
+        if len(columns['position']) == 0:
+            return _timed([], timer, started, time.perf_counter()), self._strategy_for(request_context, 0, 0)
+        scores = self._score_columns(columns, request_context)
+        scored = time.perf_counter()
+        order = _rank_order(scores['total'], top_k)
+        
+        top_donors_count = int(np.count_nonzero(scores['total'] >= 60))
+        top_ten = order[:10] if len(order) >= 10 or top_k is None else _rank_order(scores['total'], 10)
+        avg_success_prob = np.mean(_round_column(scores['success_probability'][top_ten], 2))
+        strategy = self._strategy_for(request_context, top_donors_count, avg_success_prob)
+        
+        return _timed(self._build_scored_donors(columns, scores, order), timer, started, scored), strategy
+    
+    def _table_columns(self, donor_columns, request_context=None):
+        """Typed arrays from column-wise donor data, defaults for missing columns"""
+        
+        n = len(donor_columns['donor_id'])
+        columns = {
+            'donor_id': donor_columns['donor_id'],
+            'blood_bits': group_bits(donor_columns.get('blood_group', [None] * n))
+        }
+        for key, default in DONOR_FIELD_DEFAULTS.items():
+            dtype = bool if isinstance(default, bool) else float
+            if key in donor_columns:
+                columns[key] = np.asarray(donor_columns[key], dtype=dtype)
+            else:
+                columns[key] = np.full(n, default, dtype=dtype)
+        
+        rows = self._candidate_rows(columns['blood_bits'], columns['can_donate'],
+                                    columns['days_since_last_donation'], request_context)
+        if len(rows) < n:
+            columns['donor_id'] = [columns['donor_id'][i] for i in rows.tolist()]
+            for key in ('blood_bits', *DONOR_FIELD_DEFAULTS):
+                columns[key] = columns[key][rows]
+        columns['position'] = rows
+        
+        origin = parse_location((request_context or {}).get('location'))
+        if origin is not None and 'distance' not in donor_columns:
+            lats = donor_columns.get('lat', donor_columns.get('location.lat'))
+            lngs = donor_columns.get('lng', donor_columns.get('location.lng'))
+            if lats is not None and lngs is not None:
+                lats, lngs = np.asarray(lats, dtype=float)[rows], np.asarray(lngs, dtype=float)[rows]
+            self._fill_distances(columns, np.arange(len(rows)), origin, lats, lngs)
+        
+        return self._with_learned_state(columns)
+    
+    def _donor_columns(self, donors_data, request_context=None):
+        """Convert the donor list into typed arrays (one pass per field)"""
+        
+        # The fields deciding who is a candidate first, so the rest are only read for candidates
+        n = len(donors_data)
+        blood_bits = group_bits(donor.get('blood_group') for donor in donors_data)
+        can_donate = np.fromiter((bool(donor.get('can_donate', False)) for donor in donors_data), dtype=bool, count=n)
+        days = np.fromiter((donor.get('days_since_last_donation', 999) for donor in donors_data), dtype=float, count=n)
+        rows = self._candidate_rows(blood_bits, can_donate, days, request_context)
+        if len(rows) < n:
+            donors_data = [donors_data[i] for i in rows.tolist()]
+            blood_bits, can_donate, days = blood_bits[rows], can_donate[rows], days[rows]
+            n = len(rows)
+        
+        columns = {
+            'donor_id': [donor.get('donor_id') for donor in donors_data],
+            'blood_bits': blood_bits,
+            'can_donate': can_donate,
+            'days_since_last_donation': days,
+            'position': rows
+        }
+        for key, default in DONOR_FIELD_DEFAULTS.items():
+            if key in columns:
+                continue
+            if isinstance(default, bool):
+                values = (bool(donor.get(key, default)) for donor in donors_data)
+                columns[key] = np.fromiter(values, dtype=bool, count=n)
+            else:
+                values = (donor.get(key, default) for donor in donors_data)
+                columns[key] = np.fromiter(values, dtype=float, count=n)
+        
+        origin = parse_location((request_context or {}).get('location'))
+        if origin is not None:
+            rows = np.flatnonzero(np.fromiter(('distance' not in donor for donor in donors_data), dtype=bool, count=n))
+            if len(rows):
+                coordinates = [parse_location(donors_data[i].get('location')) or (np.nan, np.nan)
+                               for i in rows.tolist()]
+                lats, lngs = np.array(coordinates, dtype=float).reshape(-1, 2).T
+                self._fill_distances(columns, rows, origin, lats, lngs)
+        
+        return self._with_learned_state(columns)
+    
+    def _candidate_rows(self, blood_bits, can_donate, days_since_last_donation, request_context):
+        """
+        Indices of the donors worth scoring
+        
+        Drops donors whose blood group the recipient cannot receive (see
+        blood_compatibility.py) and donors who cannot donate and gave blood
+        less than 60 days ago (an eligibility score of 0).
+        """
+        eligible = can_donate | (days_since_last_donation >= 60)
+        compatible = compatible_bits(blood_bits, (request_context or {}).get('blood_group'))
+        return np.flatnonzero(eligible & compatible)
+    
+    def _fill_distances(self, columns, rows, origin, lats=None, lngs=None):
+        """
+        Distances (km) from the request location for donors sent without one
+        
+        Uses the donor's own coordinates where given (lats/lngs, NaN when
+        unknown), then the geo index; donors found in neither keep the
+        default distance.
+        """
+        distances = np.full(len(rows), np.nan)
+        if lats is not None:
+            distances = haversine_km(origin[0], origin[1], lats, lngs)
+        
+        unknown = np.flatnonzero(np.isnan(distances))
+        if len(unknown) and self.geo_index is not None:
+            donor_ids = columns['donor_id']
+            distances[unknown] = self.geo_index.distances(origin[0], origin[1],
+                                                          [donor_ids[i] for i in rows[unknown].tolist()])
+        
+        found = ~np.isnan(distances)
+        columns['distance'][rows[found]] = distances[found]
+    
+    def _with_learned_state(self, columns):
+        """Add the learned per-donor parameters, looked up once per donor"""
+        
+        avg_response_time, success_rate = self.learning_store.lookup(columns['donor_id'])
+        columns['avg_response_time'] = avg_response_time  # NaN = no history
+        columns['success_rate'] = np.where(np.isnan(success_rate), 0.5, success_rate)
+        return columns
+    
+    def _score_columns(self, columns, request_context):
+        """
+        Columnar equivalent of _calculate_score + _predict_donor_behavior.
+        
+        Every expression mirrors the per-donor arithmetic operation for
+        operation so the floating point results are bit-identical.
+        Returns arrays keyed like score_breakdown plus predictions.
+        """
+        
+        urgency = request_context.get('urgency', 'normal')
+        critical = urgency == 'critical'
+        weights = self.weights
+        
+        distance_km = columns['distance']
+        can_donate = columns['can_donate']
+        is_available = columns['is_available']
+        last_active_hours = columns['last_active_hours']
+        has_history = ~np.isnan(columns['avg_response_time'])
+        
+        # 1. Distance Score (0-100)
+        distance_score = np.maximum(0, 100 - (distance_km * 5))
         
-        for donor in donors_data:
-            score_breakdown = self._calculate_score(donor, request_context)
-            prediction = self._predict_donor_behavior(donor, request_context)
-            
-            scored_donor = {
-                'donor_id': donor.get('donor_id'),
+        # 2. Reliability Score (0-100)
+        reliability_score = columns['reliability_score']
+        
+        # 3. Eligibility Score (0-100)
+        eligibility_score = np.where(
+            can_donate, 100.0,
+            np.where(columns['days_since_last_donation'] >= 60, 50.0, 0.0))
+        
+        # 4. Response History Score (0-100)
+        avg_response_time = np.where(has_history, columns['avg_response_time'], 30.0)
+        response_score = np.maximum(0, 100 - (avg_response_time * 2))
+        
+        # 5. Blood Match Score (0-100)
+        blood_match_score = match_scores(columns['blood_bits'], request_context.get('blood_group'))
+        
+        # 6. Availability Score (0-100)
+        availability_score = np.select(
+            [is_available & (last_active_hours < 1),
+             is_available & (last_active_hours < 6),
+             is_available],
+            [100.0, 80.0, 50.0],
+            default=20.0)
+        
+        total_score = (
+            distance_score * weights['distance'] +
+            reliability_score * weights['reliability'] +
+            eligibility_score * weights['eligibility'] +
+            response_score * weights['response_history'] +
+            blood_match_score * weights['blood_match'] +
+            availability_score * weights['availability']
+        )
+        
+        # Urgency bonus
+        if critical:
+            total_score = np.where(distance_km < 5, total_score + 10, total_score)
+        
+        # Higher confidence if we have historical data
+        confidence = np.where(has_history, 0.9, 0.5)
+        
+        # Predictions
+        base_response_time = np.where(has_history, columns['avg_response_time'], 25.0)
+        response_time = base_response_time * self._time_of_day_factor()
+        if critical:
+            response_time = response_time * 0.7
+        
+        success_probability = columns['success_rate']
+        success_probability = np.where(can_donate, success_probability + 0.2, success_probability)
+        success_probability = np.where(distance_km < 5, success_probability + 0.15, success_probability)
+        success_probability = np.where(is_available, success_probability + 0.1, success_probability)
+        if critical:
+            success_probability = success_probability + 0.05
+        success_probability = np.minimum(0.95, np.maximum(0.05, success_probability))
+        
+        # Only the total is rounded here since it drives the ranking; the
+        # other columns are rounded for the donors actually returned.
+        return {
+            'total': _round_column(total_score, 2),
+            'confidence': confidence,
+            'distance': distance_score,
+            'reliability': reliability_score,
+            'eligibility': eligibility_score,
+            'response_history': response_score,
+            'blood_match': blood_match_score,
+            'availability': availability_score,
+            'response_time_minutes': response_time,
+            'success_probability': success_probability
+        }
+    
+    def _time_of_day_factor(self):
+        """Response time multiplier for the current hour"""
+        
+        hour = datetime.now().hour
+        if 22 <= hour or hour <= 6:  # Night time
+            return 2
+        elif 9 <= hour <= 17:  # Business hours
+            return 0.8
+        return 1
+    
+    def observe_cached(self, scored_donors):
+        """
+        Hand a cached scoring result to score_observer, as a fresh scoring
+        call would, so repeated payloads are observed like new ones
+        """
+        if self.score_observer is None or not scored_donors:
+            return
+        breakdowns = [donor['score_breakdown'] for donor in scored_donors]
+        scores = {key: np.fromiter((b[key] for b in breakdowns), dtype=float, count=len(breakdowns))
+                  for key in _BREAKDOWN_KEYS}
+        self.score_observer([donor['donor_id'] for donor in scored_donors], np.arange(len(scored_donors)), scores)
+    
+    def scoring_state(self):
+        """
+        Everything besides the inputs and learned data that changes scores:
+        the current time-of-day bucket and the weights. Used in cache keys.
+        """
+        return self._time_of_day_factor(), tuple(self.weights.items())
+    
+    def _build_scored_donors(self, columns, scores, order):
+        """Assemble response dicts for the donors at the given column indices"""
+        
+        if self.score_observer is not None and len(order):
+            self.score_observer(columns['donor_id'], order, scores)
+        
+        rounded = {key: _round_column(scores[key][order], _ROUNDING.get(key, 2))
+                   for key in scores}
+        reasons = self._reason_column(rounded)
+        donor_ids = columns['donor_id']
+        fields = [rounded[key].tolist() for key in _BREAKDOWN_KEYS]
+        response_times = rounded['response_time_minutes'].tolist()
+        success_probabilities = rounded['success_probability'].tolist()
+        
+        scored_donors = []
+        for rank, i in enumerate(order.tolist()):
+            score_breakdown = dict(zip(_BREAKDOWN_KEYS, (field[rank] for field in fields)))
+            scored_donors.append({
+                'donor_id': donor_ids[i],
                 'total_score': score_breakdown['total'],
                 'confidence': score_breakdown['confidence'],
                 'score_breakdown': score_breakdown,
-                'predictions': prediction,
-                'reason': self._generate_reason(score_breakdown, prediction)
-            }
-            
-            scored_donors.append(scored_donor)
-        
-        # Sort by score (descending)
-        scored_donors.sort(key=lambda x: x['total_score'], reverse=True)
+                'predictions': {
+                    'response_time_minutes': response_times[rank],
+                    'success_probability': success_probabilities[rank]
+                },
+                'reason': reasons[rank]
+            })
         
         return scored_donors
     
+    def _reason_column(self, scores):
+        """
+        Vectorized _generate_reason: encode the thresholds it checks as a small
+        integer per donor and render each distinct code through _generate_reason once.
+        """
+        
+        distance = scores['distance']
+        codes = (
+            np.where(distance >= 80, 2, np.where(distance >= 60, 1, 0)) * 16 +
+            (scores['reliability'] >= 80) * 8 +
+            (scores['eligibility'] >= 90) * 4 +
+            (scores['blood_match'] >= 90) * 2 +
+            (scores['success_probability'] >= 0.7) * 1
+        )
+        
+        rendered = {}
+        for code in np.unique(codes).tolist():
+            breakdown = {
+                'distance': (0, 70, 100)[code // 16],
+                'reliability': 100 if code & 8 else 0,
+                'eligibility': 100 if code & 4 else 0,
+                'blood_match': 100 if code & 2 else 0
+            }
+            prediction = {'success_probability': 1.0 if code & 1 else 0.0}
+            rendered[code] = self._generate_reason(breakdown, prediction)
+        
+        return [rendered[code] for code in codes.tolist()]
+    
     def _calculate_score(self, donor, request_context):
         """Calculate composite score with breakdown"""
         
@@ -91,8 +556,8 @@ class AgentScorer:
         response_score = max(0, 100 - (avg_response_time * 2))
         
         # 5. Blood Match Score (0-100)
-        exact_match = donor.get('blood_group') == request_context.get('blood_group')
-        blood_match_score = 100 if exact_match else 70  # Compatible but not exact
+        # Exact group, same ABO group, other compatible group (see blood_compatibility.py)
+        blood_match_score = match_score(donor.get('blood_group'), request_context.get('blood_group'))
         
         # 6. Availability Score (0-100)
         is_available = donor.get('is_available', False)
@@ -108,13 +573,14 @@ class AgentScorer:
             availability_score = 20
         
         # Calculate weighted total
+        weights = self.weights
         total_score = (
-            distance_score * self.weights['distance'] +
-            reliability_score * self.weights['reliability'] +
-            eligibility_score * self.weights['eligibility'] +
-            response_score * self.weights['response_history'] +
-            blood_match_score * self.weights['blood_match'] +
-            availability_score * self.weights['availability']
+            distance_score * weights['distance'] +
+            reliability_score * weights['reliability'] +
+            eligibility_score * weights['eligibility'] +
+            response_score * weights['response_history'] +
+            blood_match_score * weights['blood_match'] +
+            availability_score * weights['availability']
         )
         
         # Urgency bonus
@@ -220,11 +686,31 @@ class AgentScorer:
         Returns: dict with strategy type and parameters
         """
         
-        urgency = request_context.get('urgency', 'normal')
         top_donors_count = len([d for d in scored_donors if d['total_score'] >= 60])
         avg_success_prob = np.mean([d['predictions']['success_probability'] 
                                      for d in scored_donors[:10]]) if scored_donors else 0
         
+        return self._strategy_for(request_context, top_donors_count, avg_success_prob)
+    
+    def recommend_strategy_from_columns(self, total_scores, success_probabilities, request_context):
+        """
+        recommend_strategy for ranked donors supplied as two parallel arrays
+        (total_score and predicted success_probability, best donor first)
+        """
+        
+        total_scores = np.asarray(total_scores, dtype=float)
+        success_probabilities = np.asarray(success_probabilities, dtype=float)
+        
+        top_donors_count = int(np.count_nonzero(total_scores >= 60))
+        avg_success_prob = np.mean(success_probabilities[:10]) if len(success_probabilities) else 0
+        
+        return self._strategy_for(request_context, top_donors_count, avg_success_prob)
+    
+    def _strategy_for(self, request_context, top_donors_count, avg_success_prob):
+        """Pick a strategy from the two aggregates recommend_strategy needs"""
+        
+        urgency = request_context.get('urgency', 'normal')
+        
         # Decision logic for strategy
         if urgency == 'critical':
             if top_donors_count >= 5:
@@ -280,17 +766,14 @@ class AgentScorer:
     def update_learning_data(self, donor_id, response_time_minutes, success):
         """Update learned parameters from feedback"""
         
-        # Update average response time (exponential moving average)
-        if donor_id in self.avg_response_times:
-            current_avg = self.avg_response_times[donor_id]
-            self.avg_response_times[donor_id] = (current_avg * 0.7) + (response_time_minutes * 0.3)
-        else:
-            self.avg_response_times[donor_id] = response_time_minutes
+        # Exponential moving averages of response time and success rate,
+        # kept in the (possibly shared, persistent) learning store
+        self.learning_store.update(donor_id, response_time_minutes, success)
+    
+    def update_learning_batch(self, donor_ids, response_times, successes, timestamps=None):
+        """
+        Apply many feedback events at once (see LearningStore.update_many)
         
-        # Update success rate
-        if donor_id in self.success_rates:
-            current_rate = self.success_rates[donor_id]
-            new_value = 1.0 if success else 0.0
-            self.success_rates[donor_id] = (current_rate * 0.8) + (new_value * 0.2)
-        else:
-            self.success_rates[donor_id] = 1.0 if success else 0.5
+        Returns: number of distinct donors updated
+        """
+        return self.learning_store.update_many(donor_ids, response_times, successes, timestamps)
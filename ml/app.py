@@ -4,49 +4,431 @@ Provides /predict endpoint for fake blood request detection
 Extended with Agentic AI donor scoring and strategy recommendation
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+import hmac
 import joblib
 import numpy as np
 import os
-from agent_scorer import AgentScorer
+import random
+import threading
+import time
+from datetime import datetime
+from agent_scorer import AgentScorer, DONOR_FIELD_DEFAULTS
+from donor_table import DonorTable, StaleVersionError
+from geo_index import DonorGeoIndex, parse_location
+from learning_store import LearningStore, DEFAULT_CAPACITY
+from metrics import OTHER, MetricsRegistry
+from micro_batcher import MicroBatcher
+from model_registry import BASE_FEATURES, ENHANCED_FEATURES, ModelBundle, ModelRegistry, RegistryWatcher
+import process_stats
+import request_log
+from request_profiler import PhaseTimer, ProfileStore, StackSampler
+from result_cache import ResultCache, payload_digest
+from score_sketch import ScoreCalibration
+from shadow_scorer import ShadowScorer
+from weight_learner import WeightLearner
+import wire
 
 app = Flask(__name__)
 
 # Load model and scaler
 MODEL_PATH = 'models/fake_detector.pkl'
 SCALER_PATH = 'models/scaler.pkl'
+ENHANCED_MODEL_PATH = 'models/fake_detector_enhanced.pkl'
+ENHANCED_SCALER_PATH = 'models/scaler_enhanced.pkl'
 
-model = None
+# Score with the flat-array evaluator instead of sklearn (see flat_forest.py)
+FLAT_FOREST = os.environ.get('FLAT_FOREST', '1').lower() in ('1', 'true', 'yes')
+
+# Upper bound on rows accepted by /predict-batch in one call
+MAX_BATCH_ROWS = 10000
+
+# Versioned models (see model_registry.py). When the registry has no ACTIVE
+# version, the model at MODEL_PATH is served as version 'builtin'.
+MODEL_REGISTRY_PATH = os.environ.get('MODEL_REGISTRY_PATH', 'models/registry')
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', 5))  # 0 disables the watch
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1024))
+ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN')  # /admin/* endpoints are disabled without it
+
+# Moderator-labelled rows for scheduled retraining (see retrain.py)
+LABELS_DIR = os.environ.get('LABELS_DIR', 'data/labels')
+MAX_LABEL_ROWS = 10000
+
+# Production decision score distribution per model version (see score_sketch.py).
+# /predict confidence is the score's quantile rank once SKETCH_MIN_COUNT scores are in.
+SKETCH_DIR = os.environ.get('SKETCH_DIR', 'data/score_sketches')
+SKETCH_MIN_COUNT = int(os.environ.get('SKETCH_MIN_COUNT', 1000))
+
+active_model = None  # ModelBundle serving /predict; swapped by a single assignment
+model = None  # active_model.model / .scaler, kept for existing callers
 scaler = None
-agent_scorer = AgentScorer()  # Initialize agentic AI scorer
+model_version = 0  # Bumped on every swap; part of the /predict cache key
+enhanced_model = None  # Optional 8-feature ModelBundle from train_model_enhanced.py
+
+model_registry = ModelRegistry(MODEL_REGISTRY_PATH)
+shadow_scorer = ShadowScorer(SHADOW_QUEUE_SIZE)
+score_calibration = ScoreCalibration(SKETCH_DIR, min_count=SKETCH_MIN_COUNT)
+# Optional micro-batching of concurrent /predict calls (see micro_batcher.py)
+PREDICT_MICRO_BATCH = os.environ.get('PREDICT_MICRO_BATCH', '').lower() in ('1', 'true', 'yes')
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 2))
+PREDICT_MAX_BATCH = int(os.environ.get('PREDICT_MAX_BATCH', 64))
+
+# Learning store shared by all workers (see learning_store.py)
+LEARNING_STORE_PATH = os.environ.get('LEARNING_STORE_PATH', 'data/learning_store.bin')
+LEARNING_STORE_CAPACITY = int(os.environ.get('LEARNING_STORE_CAPACITY', DEFAULT_CAPACITY))
+LEARNING_STORE_TTL_DAYS = float(os.environ.get('LEARNING_STORE_TTL_DAYS', 90))
+
+learning_store = LearningStore(LEARNING_STORE_PATH,
+                               capacity=LEARNING_STORE_CAPACITY,
+                               ttl_seconds=LEARNING_STORE_TTL_DAYS * 24 * 3600)
+
+# Donor coordinates shared by all workers (see geo_index.py). Donors sent
+# without a distance get one from request_context.location.
+DONOR_LOCATIONS_PATH = os.environ.get('DONOR_LOCATIONS_PATH', 'data/donor_locations.npz')
+MAX_NEARBY_DONORS = 10000
+
+donor_index = DonorGeoIndex(DONOR_LOCATIONS_PATH)
+
+# Donor scoring features kept by the service (see donor_table.py), so
+# scoring requests can send "donor_ids" instead of full donor records
+DONOR_TABLE_PATH = os.environ.get('DONOR_TABLE_PATH', 'data/donor_table.npz')
+
+donor_table = DonorTable(DONOR_TABLE_PATH)
+agent_scorer = AgentScorer(learning_store, donor_index)  # Initialize agentic AI scorer
+
+# Online learning of the scoring weights from feedback (see weight_learner.py).
+# Off by default; workers share the latest weights through WEIGHTS_PATH.
+WEIGHT_LEARNING = os.environ.get('WEIGHT_LEARNING', '').lower() in ('1', 'true', 'yes')
+WEIGHTS_PATH = os.environ.get('WEIGHTS_PATH', 'data/scorer_weights.npz')
+WEIGHT_BATCH_SIZE = int(os.environ.get('WEIGHT_BATCH_SIZE', 64))
+WEIGHT_LEARNING_RATE = float(os.environ.get('WEIGHT_LEARNING_RATE', 0.05))
+
+# Result caches (see result_cache.py); RESULT_CACHE_SIZE=0 disables them
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 1024))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 300))
+RESULT_CACHE_MAX_DONORS = int(os.environ.get('RESULT_CACHE_MAX_DONORS', 200000))
+
+predict_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS, max_cost=RESULT_CACHE_SIZE)
+scoring_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS, max_cost=RESULT_CACHE_MAX_DONORS)
+
+# Prometheus metrics, summed over all gunicorn workers (see metrics.py)
+METRICS_DIR = os.environ.get('METRICS_DIR', 'data/metrics')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+INFERENCE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+DONOR_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+# Structured request logs (see request_log.py). Success lines are sampled per
+# route, e.g. LOG_SAMPLE_RATES="/predict=0.01,/score-donors=0.1"; errors always log.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json or text
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 0.1))
+LOG_SAMPLE_RATES = request_log.parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', '/predict=0.01'))
+
+log_handler = request_log.configure(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE)
+log = request_log.RequestLogger(LOG_SAMPLE_RATES, LOG_SAMPLE_RATE)
+
+# Every request gets phase timings in a Server-Timing header. A request is
+# also profiled (see request_profiler.py) when it sends "X-Profile: 1" with
+# the admin token, or at PROFILE_SAMPLE_RATE. (Not by client address: behind
+# Render's proxy every request comes from the proxy.)
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 1))
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', 15))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'data/profiles')
+
+profile_store = ProfileStore(PROFILE_DIR)
+
+def _route_labels():
+    return [rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != 'static']
+
+metrics = MetricsRegistry(METRICS_DIR)
+http_requests = metrics.counter(
+    'lifelink_http_requests_total', 'HTTP requests by route, method and status',
+    {'route': _route_labels, 'method': ('GET', 'POST'), 'status': (200, 400, 403, 404, 405, 409, 415, 500, 503)})
+http_latency = metrics.histogram(
+    'lifelink_http_request_duration_seconds', 'Request handling time', LATENCY_BUCKETS, {'route': _route_labels})
+request_bytes = metrics.histogram(
+    'lifelink_http_request_bytes', 'Request body size', BYTES_BUCKETS, {'route': _route_labels})
+response_bytes = metrics.histogram(
+    'lifelink_http_response_bytes', 'Response body size', BYTES_BUCKETS, {'route': _route_labels})
+donors_per_request = metrics.histogram(
+    'lifelink_donors_per_request', 'Donors in each scoring request', DONOR_BUCKETS, {'route': _route_labels})
+inference_seconds = metrics.histogram(
+    'lifelink_model_inference_seconds', 'Fake detector time by stage', INFERENCE_BUCKETS,
+    {'stage': ('scaler_transform', 'decision_function')})
+scoring_seconds = metrics.histogram(
+    'lifelink_scoring_seconds', 'AgentScorer time by operation', LATENCY_BUCKETS,
+    {'operation': ('score_donors', 'recommend_strategy', 'update_learning')})
+metrics.gauge('lifelink_learning_store_donors', 'Donors with learned history', lambda: len(learning_store))
+metrics.gauge('lifelink_learning_store_capacity', 'Learning store slots', lambda: learning_store.capacity)
+metrics.gauge('lifelink_model_info', 'Serving model version',
+              lambda: {(('version', active_model.version),): 1} if active_model is not None else {})
+
+# Weight learning (configured above); created here so it can count feedback in the shared metrics
+weight_learner = None
+if WEIGHT_LEARNING:
+    weight_learner = WeightLearner(agent_scorer, WEIGHTS_PATH, batch_size=WEIGHT_BATCH_SIZE,
+                                   learning_rate=WEIGHT_LEARNING_RATE, metrics=metrics)
+    agent_scorer.score_observer = weight_learner.record_scores
+
+def _record_inference(transform_seconds, forest_seconds):
+    inference_seconds.observe(transform_seconds, 'scaler_transform')
+    inference_seconds.observe(forest_seconds, 'decision_function')
+
+def _phase(name):
+    """End the current request phase (time since the previous one) as `name`"""
+    g.phases.mark(name)
+
+def _record_scoring(score_seconds, rank_seconds):
+    g.phases.add('score', score_seconds)
+    g.phases.add('rank', rank_seconds)
+
+def _score_features(bundle, X):
+    """Decision scores for a feature matrix with the model the rows were validated against"""
+    return bundle.decision_function(X, timer=_record_inference)
+
+predict_batcher = (MicroBatcher(_score_features, PREDICT_BATCH_WINDOW_MS, PREDICT_MAX_BATCH, metrics)
+                   if PREDICT_MICRO_BATCH else None)
+
+def _activate(bundle):
+    """Make `bundle` the serving model. Requests read active_model once, so none wait."""
+    global active_model, model, scaler, model_version
+    
+    model_version += 1
+    bundle.serial = model_version
+    active_model = bundle
+    model, scaler = bundle.model, bundle.scaler
+    score_calibration.pinned = bundle.calibration_key
+    predict_cache.clear()
+
+def _set_shadow(version):
+    if version == (shadow_scorer.candidate.version if shadow_scorer.candidate else None):
+        return
+    shadow_scorer.set_candidate(model_registry.load(version, flat=FLAT_FOREST)
+                                if version else None)
+    log.info(None, 'Shadow model: %s', version or 'off', shadow_version=version)
+
+def _builtin_model():
+    """The model at MODEL_PATH, or None when it has not been trained"""
+    if not os.path.exists(MODEL_PATH):
+        return None
+    return ModelBundle.from_files('builtin', MODEL_PATH, SCALER_PATH, BASE_FEATURES, flat=FLAT_FOREST)
+
+def _on_registry_change(active_version, shadow_version):
+    """
+    RegistryWatcher callback: load and swap on the watcher thread
+    
+    Clearing the ACTIVE pointer sends the service back to the MODEL_PATH
+    model, as a restart would; without one it keeps serving what it has.
+    """
+    serving = active_model.version if active_model is not None else None
+    if active_version and active_version != serving:
+        _activate(model_registry.load(active_version, flat=FLAT_FOREST))
+        log.info(None, 'Switched to model %s', active_version, model_version=active_version)
+    elif not active_version and serving != 'builtin':
+        bundle = _builtin_model()
+        if bundle is not None:
+            _activate(bundle)
+            log.info(None, 'ACTIVE pointer removed; switched to the model at %s', MODEL_PATH,
+                     model_version=bundle.version)
+        elif serving is not None:
+            log.warning(None, 'ACTIVE pointer removed but %s is missing; still serving model %s',
+                        MODEL_PATH, serving)
+    _set_shadow(shadow_version)
+
+registry_watcher = RegistryWatcher(model_registry, _on_registry_change, MODEL_WATCH_SECONDS)
 
 def load_model():
-    """Load the trained model and scaler"""
-    global model, scaler
+    """
+    Load the trained model and scaler
+    
+    Serves the registry's ACTIVE version if there is one, otherwise the
+    model at MODEL_PATH. The model is loaded onto this process's heap; under
+    gunicorn that happens once in the master, and workers share the pages
+    copy-on-write (see gunicorn.conf.py).
+    """
+    global enhanced_model
     
     try:
-        if not os.path.exists(MODEL_PATH):
-            print(f"❌ Model not found at {MODEL_PATH}")
-            print("   Please run: python train_model.py")
+        active_version, shadow_version = model_registry.pointers()
+        if active_version:
+            bundle = model_registry.load(active_version, flat=FLAT_FOREST)
+        else:
+            bundle = _builtin_model()
+        if bundle is None:
+            log.warning(None, 'Model not found at %s. Please run: python train_model.py', MODEL_PATH)
             return False
         
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        print("✅ Model and scaler loaded successfully")
+        _activate(bundle)
+        log.info(None, 'Model and scaler loaded successfully (version %s)', bundle.version,
+                 model_version=bundle.version)
+        
+        if os.path.exists(ENHANCED_MODEL_PATH) and os.path.exists(ENHANCED_SCALER_PATH):
+            enhanced_model = ModelBundle.from_files('enhanced', ENHANCED_MODEL_PATH, ENHANCED_SCALER_PATH,
+                                                    ENHANCED_FEATURES, flat=FLAT_FOREST)
+            log.info(None, 'Enhanced 8-feature model loaded')
+        
+        _set_shadow(shadow_version)
+        registry_watcher.seen = (active_version, shadow_version)
         return True
     except Exception as e:
-        print(f"❌ Error loading model: {e}")
+        log.error(None, 'Error loading model: %s', e)
         return False
 
+def create_app():
+    """
+    Application factory used by gunicorn (see gunicorn.conf.py)
+    
+    Loads the model before the app is returned. With preload_app this runs
+    once in the gunicorn master, and forked workers share the loaded model.
+    """
+    started = time.perf_counter()
+    metrics.remove_dead_files()
+    if model is None and not load_model():
+        raise RuntimeError(f'Model not found at {MODEL_PATH}. Run: python train_model.py')
+    score_calibration.absorb_dead_files()
+    
+    process_stats.startup.update({
+        'model_load_seconds': round(time.perf_counter() - started, 3),
+        'app_ready_seconds': round(time.time() - process_stats.PROCESS_STARTED, 3),
+        'loaded_in_pid': os.getpid()
+    })
+    return app
+
+def _prediction_result(score, features, calibration_key=None):
+    """
+    Build the /predict response body for one decision score.
+    
+    IsolationForest.predict() is just decision_function() < 0, so the label
+    is derived from the score instead of evaluating the forest a second time.
+    """
+    
+    # Convert to readable format
+    result = 'fake' if score < 0 else 'genuine'
+    
+    # Calculate confidence (0-1 scale): how far into its side of the 0
+    # threshold the score sits among this model's production scores
+    confidence = score_calibration.confidence(calibration_key, score)
+    method = 'quantile'
+    if confidence is None:
+        # Too few production scores yet. Score ranges roughly from -0.5 to 0.5
+        # More negative = more likely fake
+        # More positive = more likely genuine
+        confidence = abs(score)
+        confidence = min(confidence, 1.0)  # Cap at 1.0
+        method = 'raw'
+    
+    return {
+        'prediction': result,
+        'score': float(score),
+        'confidence': float(confidence),
+        'confidence_method': method,
+        'features_received': features
+    }
+
+def _profile_requested():
+    if request.headers.get('X-Profile') == '1':
+        return _admin_denied() is None
+    return request.method == 'POST' and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@app.before_request
+def _start_background_threads():
+    # Per process, so gunicorn workers forked after preload watch too
+    registry_watcher.ensure_running()
+
+@app.before_request
+def _start_request_timing():
+    g.request_started = time.perf_counter()
+    g.phases = PhaseTimer(g.request_started)
+    if _profile_requested():
+        g.profiler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0).start()
+
+@app.after_request
+def _record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else OTHER
+    http_requests.inc(1, route, request.method, response.status_code)
+    http_latency.observe(time.perf_counter() - g.get('request_started', time.perf_counter()), route)
+    request_bytes.observe(request.content_length or 0, route)
+    response_bytes.observe(response.calculate_content_length() or 0, route)
+    if 'donor_count' in g:
+        donors_per_request.observe(g.donor_count, route)
+    return response
+
+@app.after_request
+def _attach_timings(response):
+    phases = g.get('phases')
+    if phases is not None and phases.durations:
+        # Instrumented endpoints mark their phases up to scoring; what is
+        # left is building the response body
+        phases.mark('serialize')
+        response.headers['Server-Timing'] = phases.server_timing()
+    
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profile = profiler.stop().summary(PROFILE_TOP_N)
+        profile.update({
+            'created_at': datetime.now().isoformat(),
+            'route': request.url_rule.rule if request.url_rule is not None else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in phases.durations.items()}
+        })
+        response.headers['X-Profile-Id'] = profile_store.save(profile)
+    return response
+
+@app.teardown_request
+def _stop_profiler(exc):
+    # An unhandled error skips after_request; do not leave the sampler running
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+
+@app.errorhandler(wire.UnsupportedMediaType)
+def unsupported_media_type(e):
+    """Body format not understood (or its optional library not installed)"""
+    return jsonify({
+        'error': 'Unsupported media type',
+        'message': f'Send application/json, {wire.MSGPACK} or {wire.ARROW}'
+    }), 415
+
+@app.errorhandler(wire.MalformedPayload)
+def malformed_payload(e):
+    """MessagePack or Arrow body that does not decode"""
+    return jsonify({
+        'error': 'Invalid request',
+        'message': str(e)
+    }), 400
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'OK',
         'message': 'LifeLink ML API is running',
-        'model_loaded': model is not None
+        'model_loaded': model is not None,
+        'model_version': active_model.version if active_model is not None else None,
+        'flat_forest': active_model is not None and active_model.flat is not None,
+        'learning_store': learning_store.stats(),
+        'donor_index': donor_index.stats(),
+        'donor_table': donor_table.stats(),
+        'weights_version': agent_scorer.weights_version,
+        'score_sketch': score_calibration.stats(),
+        'micro_batching': predict_batcher.stats() if predict_batcher is not None else None,
+        'result_cache': {
+            'predict': predict_cache.stats(),
+            'score_donors': scoring_cache.stats()
+        },
+        'logging': dict(log_handler.stats(), sampled_out=log.sampled_out),
+        'process': process_stats.report()
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of all workers' metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
@@ -61,13 +443,15 @@ def predict():
     {
         "prediction": "fake" or "genuine",
         "score": float (negative = fake),
-        "confidence": float (0-1)
+        "confidence": float (0-1),
+        "confidence_method": "quantile" or "raw"
     }
     """
     
     try:
         # Check if model is loaded
-        if model is None or scaler is None:
+        bundle = active_model  # One read; a concurrent swap does not affect this request
+        if bundle is None:
             return jsonify({
                 'error': 'Model not loaded. Please train the model first.',
                 'message': 'Run: python train_model.py'
@@ -75,6 +459,7 @@ def predict():
         
         # Get request data
         data = request.get_json()
+        _phase('parse')
         
         if not data or 'features' not in data:
             return jsonify({
@@ -85,48 +470,163 @@ def predict():
         features = data['features']
         
         # Validate features
-        if not isinstance(features, list) or len(features) != 4:
+        if not isinstance(features, list) or len(features) != bundle.n_features:
             return jsonify({
                 'error': 'Invalid features',
-                'message': 'Features must be an array of 4 numbers: [requests_per_day, account_age_days, time_gap_hours, location_changes]'
+                'message': f"Features must be an array of {bundle.n_features} numbers: [{', '.join(bundle.feature_names)}]"
             }), 400
         
-        # Prepare features
-        X = np.array([features])
-        X_scaled = scaler.transform(X)
+        _phase('validate')
         
         # Make prediction
-        prediction = model.predict(X_scaled)[0]
-        score = model.decision_function(X_scaled)[0]
+        cache_key = (bundle.serial, tuple(features))
+        score = predict_cache.get(cache_key)
+        if score is None:
+            if predict_batcher is not None:
+                # Scored together with other in-flight /predict calls for the same model
+                score = predict_batcher.score(features, bundle)
+            else:
+                score = bundle.decision_function(np.array([features], dtype=float), timer=_record_inference)[0]
+            predict_cache.put(cache_key, score)
+            # Cache hits would count repeated requests again in the distribution
+            score_calibration.record(bundle.calibration_key, [score])
+        shadow_scorer.submit([features], [score])
+        _phase('score')
+        response = _prediction_result(score, features, bundle.calibration_key)
         
-        # Convert to readable format
-        result = 'fake' if prediction == -1 else 'genuine'
+        log.info('/predict', 'Prediction %s score=%.4f', response['prediction'], score,
+                 model_version=bundle.version)
         
-        # Calculate confidence (0-1 scale)
-        # Score ranges roughly from -0.5 to 0.5
-        # More negative = more likely fake
-        # More positive = more likely genuine
-        confidence = abs(score)
-        confidence = min(confidence, 1.0)  # Cap at 1.0
+        return jsonify(response), 200
         
-        response = {
-            'prediction': result,
-            'score': float(score),
-            'confidence': float(confidence),
-            'features_received': features
-        }
+    except Exception as e:
+        log.error('/predict', 'Prediction failed: %s', e)
+        return jsonify({
+            'error': 'Prediction failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Predict many blood requests in one call
+    
+    Expected JSON body:
+    {
+        "features": [
+            [requests_per_day, account_age_days, time_gap_hours, location_changes],
+            ...
+        ]
+    }
+    
+    Rows may instead carry the 8 enhanced features (see train_model_enhanced.py)
+    when the enhanced model is available. All rows must have the same width.
+    
+    Returns:
+    {
+        "success": true,
+        "results": [<same shape as /predict>, ...],
+        "count": int
+    }
+    """
+    
+    try:
+        bundle = active_model
+        if bundle is None:
+            return jsonify({
+                'error': 'Model not loaded. Please train the model first.',
+                'message': 'Run: python train_model.py'
+            }), 503
+        
+        data = request.get_json()
+        _phase('parse')
         
-        print(f"📊 Prediction: {result} | Score: {score:.4f} | Features: {features}")
+        if not data or 'features' not in data:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide features as an array of feature rows'
+            }), 400
         
-        return jsonify(response), 200
+        rows = data['features']
+        
+        if not isinstance(rows, list) or not rows or len(rows) > MAX_BATCH_ROWS:
+            return jsonify({
+                'error': 'Invalid features',
+                'message': f'Features must be a non-empty array of at most {MAX_BATCH_ROWS} rows'
+            }), 400
+        
+        try:
+            X = np.array(rows, dtype=float)
+        except (TypeError, ValueError):
+            X = None
+        
+        if X is None or X.ndim != 2 or X.shape[1] not in (bundle.n_features, len(ENHANCED_FEATURES)):
+            return jsonify({
+                'error': 'Invalid features',
+                'message': f'Every row must be an array of {bundle.n_features} numbers, or all rows 8 numbers for the enhanced model'
+            }), 400
+        
+        if X.shape[1] != bundle.n_features:
+            if enhanced_model is None:
+                return jsonify({
+                    'error': 'Enhanced model not loaded',
+                    'message': 'Run: python train_model_enhanced.py'
+                }), 503
+            bundle = enhanced_model
+        _phase('validate')
+        
+        # One transform and one forest evaluation for the whole batch
+        scores = bundle.decision_function(X, timer=_record_inference)
+        if bundle is not enhanced_model:
+            shadow_scorer.submit(X, scores)
+        score_calibration.record(bundle.calibration_key, scores.tolist())
+        _phase('score')
+        results = [_prediction_result(score, row, bundle.calibration_key) for score, row in zip(scores.tolist(), rows)]
+        
+        log.info('/predict-batch', 'Batch prediction: %d rows', len(results),
+                 rows=len(results), fake=int((scores < 0).sum()), model_version=bundle.version)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'count': len(results)
+        }), 200
         
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
+        log.error('/predict-batch', 'Batch prediction failed: %s', e)
         return jsonify({
-            'error': 'Prediction failed',
+            'error': 'Batch prediction failed',
             'message': str(e)
         }), 500
 
+@app.route('/score-sketch', methods=['GET'])
+def score_sketch():
+    """
+    Production decision score distribution per model, for drift monitoring
+    
+    Models are keyed by calibration key: the registry version, or for a model
+    loaded from MODEL_PATH "builtin@<file hash>", so a model retrained in
+    place starts a new distribution.
+    
+    Optional query parameter: ?version=<calibration key>. Each key has its
+    count, min, max, standard quantiles and the sketch itself (items and
+    weights; a weighted sample of the scores that can be merged or re-queried).
+    """
+    version = request.args.get('version')
+    versions = score_calibration.export(version)
+    if version is not None and not versions:
+        return jsonify({
+            'error': 'Unknown model version',
+            'message': f'No scores recorded for model version {version}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'active_version': active_model.version if active_model is not None else None,
+        'active_calibration_key': active_model.calibration_key if active_model is not None else None,
+        'versions': versions
+    }), 200
+
 @app.route('/info', methods=['GET'])
 def info():
     """API information"""
@@ -143,13 +643,53 @@ def info():
         'endpoints': {
             '/health': 'Health check',
             '/predict': 'Make prediction (POST)',
+            '/predict-batch': 'Make predictions for many feature rows (POST)',
             '/info': 'API information (GET)',
+            '/metrics': 'Prometheus metrics (GET)',
+            '/score-sketch': 'Decision score quantiles per model version, for drift monitoring (GET)',
             '/score-donors': 'Agentic AI donor scoring (POST)',
+            '/rank-donors': 'Agentic AI top-k donor ranking (POST)',
+            '/match': 'Score donors and recommend a strategy in one call (POST)',
             '/recommend-strategy': 'Get matching strategy recommendation (POST)',
-            '/update-learning': 'Update learning data from feedback (POST)'
+            '/update-learning': 'Update learning data from feedback (POST)',
+            '/update-learning-batch': 'Update learning data from many feedback events (POST)',
+            '/donor-locations': 'Add, move or remove donors in the location index (POST)',
+            '/nearby-donors': 'Donors within a radius or the k nearest to a location (POST)',
+            '/scorer-weights': 'Donor scoring weights, their versions and feedback quality (GET)',
+            '/donor-table': 'Resident donor feature table status (GET)',
+            '/donor-table/snapshot': 'Replace the resident donor feature table (POST)',
+            '/donor-table/delta': 'Apply changed and removed donors to the feature table (POST)',
+            '/admin/models': 'Model registry status and shadow agreement (GET, admin)',
+            '/admin/models/activate': 'Hot-swap the serving model version (POST, admin)',
+            '/admin/models/shadow': 'Set the shadow candidate model (POST, admin)',
+            '/admin/profiles': 'Recent request profiles; send X-Profile: 1 to capture one (GET, admin)',
+            '/admin/labels': 'Add moderator-labelled feature rows for retraining (POST, admin)',
+            '/admin/retrain': 'Outcome of the last scheduled retraining run (GET, admin)'
         }
     }), 200
 
+def _has_donors(data):
+    """True if a scoring body names its donors one of the accepted ways"""
+    if not data:
+        return False
+    if 'donor_ids' in data:
+        return data['donor_ids'] is None or isinstance(data['donor_ids'], list)
+    return 'donors' in data or 'donor_columns' in data
+
+def _table_donor_columns(data):
+    """Donor columns for "donor_ids" from the donor table (null: every eligible donor)"""
+    columns, g.unknown_donors = donor_table.columns(data['donor_ids'])
+    return columns
+
+def _donor_table_fields(data):
+    """Response fields telling a donor_ids caller which table version it was scored against"""
+    if 'donor_ids' not in data:
+        return {}
+    return {
+        'donor_table_version': donor_table.version,
+        'unknown_donors': g.unknown_donors if 'unknown_donors' in g else donor_table.missing(data['donor_ids'])
+    }
+
 @app.route('/score-donors', methods=['POST'])
 def score_donors():
     """
@@ -177,40 +717,206 @@ def score_donors():
         }
     }
     
+    The body may also be MessagePack, or an Arrow IPC stream with one row
+    per donor and request_context in the schema metadata (see wire.py).
+    The response format follows the Accept header.
+    
+    Once the donor table is loaded (/donor-table/snapshot), "donors" can be
+    replaced by "donor_ids": ["123", ...], or "donor_ids": null for every
+    donor who can donate. The response then also carries
+    donor_table_version and the number of unknown_donors (scored with
+    default features).
+    
     Returns: Scored and ranked donors with predictions
     """
     
     try:
-        data = request.get_json()
+        data = wire.read_payload(request, DONOR_FIELD_DEFAULTS)
+        _phase('parse')
         
-        if not data or 'donors' not in data or 'request_context' not in data:
+        if not _has_donors(data) or 'request_context' not in data:
             return jsonify({
                 'error': 'Invalid request',
-                'message': 'Please provide donors array and request_context object'
+                'message': 'Please provide donors array (or donor_ids) and request_context object'
             }), 400
         
-        donors_data = data['donors']
         request_context = data['request_context']
+        _phase('validate')
+        
+        # Same payload, same learned state, same time-of-day bucket -> same result
+        cache_key = (payload_digest(request.get_data()), request.mimetype, learning_store.version,
+                     donor_index.version, donor_table.version, agent_scorer.scoring_state())
+        scored_donors = scoring_cache.get(cache_key)
         
         # Score donors using agentic AI
-        scored_donors = agent_scorer.score_donors(donors_data, request_context)
+        if scored_donors is None:
+            with scoring_seconds.time('score_donors'):
+                if 'donor_ids' in data:
+                    scored_donors = agent_scorer.score_donor_columns(_table_donor_columns(data), request_context,
+                                                                     timer=_record_scoring)
+                elif 'donor_columns' in data:
+                    scored_donors = agent_scorer.score_donor_columns(data['donor_columns'], request_context,
+                                                                     timer=_record_scoring)
+                else:
+                    scored_donors = agent_scorer.score_donors(data['donors'], request_context, timer=_record_scoring)
+            scoring_cache.put(cache_key, scored_donors, cost=max(1, len(scored_donors)))
+        else:
+            agent_scorer.observe_cached(scored_donors)
+        _phase('score')
         
-        print(f"🤖 Scored {len(scored_donors)} donors for {request_context.get('urgency', 'normal')} request")
+        g.donor_count = len(scored_donors)
+        log.info('/score-donors', 'Scored %d donors for %s request', len(scored_donors),
+                 request_context.get('urgency', 'normal'))
         
-        return jsonify({
+        return wire.respond(request, {
             'success': True,
             'scored_donors': scored_donors,
             'total_donors': len(scored_donors),
-            'top_score': scored_donors[0]['total_score'] if scored_donors else 0
-        }), 200
+            'top_score': scored_donors[0]['total_score'] if scored_donors else 0,
+            'weights_version': agent_scorer.weights_version,
+            **_donor_table_fields(data)
+        }, rows_key='scored_donors')
         
+    except wire.PayloadError:
+        raise  # 400 / 415 from the error handlers
     except Exception as e:
-        print(f"❌ Scoring error: {e}")
+        log.error('/score-donors', 'Scoring failed: %s', e)
         return jsonify({
             'error': 'Scoring failed',
             'message': str(e)
         }), 500
 
+@app.route('/match', methods=['POST'])
+def match():
+    """
+    Agentic AI endpoint - Score, rank and recommend a strategy in one call
+    
+    Replaces /score-donors followed by /recommend-strategy: the strategy is
+    computed from the same score arrays, so the scored list never has to be
+    sent back.
+    
+    Expected JSON body: same as /score-donors, plus an optional "top_k" to
+    return only the best donors (the strategy still considers all of them).
+    Accepts the same MessagePack / Arrow bodies and "donor_ids" as /score-donors.
+    
+    Returns: /score-donors response plus "strategy"
+    """
+    
+    try:
+        data = wire.read_payload(request, DONOR_FIELD_DEFAULTS)
+        _phase('parse')
+        
+        if not _has_donors(data) or 'request_context' not in data:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide donors array (or donor_ids) and request_context object'
+            }), 400
+        
+        request_context = data['request_context']
+        if 'donor_ids' in data:
+            donors = _table_donor_columns(data)
+        else:
+            donors = data['donor_columns'] if 'donor_columns' in data else data['donors']
+        top_k = data.get('top_k')
+        
+        if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'top_k must be a positive integer'
+            }), 400
+        
+        _phase('validate')
+        
+        with scoring_seconds.time('score_donors'):
+            scored_donors, strategy = agent_scorer.match_donors(donors, request_context, top_k, timer=_record_scoring)
+        _phase('score')
+        total_donors = len(donors['donor_id']) if isinstance(donors, dict) else len(donors)
+        g.donor_count = total_donors
+        
+        log.info('/match', 'Matched %d donors for %s request: %s', total_donors,
+                 request_context.get('urgency', 'normal'), strategy['type'])
+        
+        return wire.respond(request, {
+            'success': True,
+            'scored_donors': scored_donors,
+            'total_donors': total_donors,
+            'top_score': scored_donors[0]['total_score'] if scored_donors else 0,
+            'strategy': strategy,
+            'weights_version': agent_scorer.weights_version,
+            **_donor_table_fields(data)
+        }, rows_key='scored_donors')
+        
+    except wire.PayloadError:
+        raise  # 400 / 415 from the error handlers
+    except Exception as e:
+        log.error('/match', 'Matching failed: %s', e)
+        return jsonify({
+            'error': 'Matching failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/rank-donors', methods=['POST'])
+def rank_donors():
+    """
+    Agentic AI endpoint - Return only the top_k donors
+    
+    Expected JSON body:
+    {
+        "donors": [...],            # Same donor shape as /score-donors
+        "request_context": {...},   # Same as /score-donors
+        "top_k": 10                 # Optional, defaults to 10
+    }
+    
+    Returns: The top_k scored donors, best first. Each ranking carries
+    "index", its position in the submitted donors array.
+    """
+    
+    try:
+        data = request.get_json()
+        _phase('parse')
+        
+        if not data or 'donors' not in data:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide donors array and request_context object'
+            }), 400
+        
+        donors_data = data['donors']
+        request_context = data.get('request_context') or {'urgency': data.get('request_urgency', 'normal')}
+        top_k = data.get('top_k', 10)
+        
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'top_k must be a positive integer'
+            }), 400
+        
+        _phase('validate')
+        
+        with scoring_seconds.time('score_donors'):
+            ranked, positions = agent_scorer.rank_donors(donors_data, request_context, top_k, timer=_record_scoring)
+        _phase('score')
+        g.donor_count = len(donors_data)
+        for donor, index in zip(ranked, positions):
+            donor['index'] = index
+        
+        log.info('/rank-donors', 'Ranked top %d of %d donors for %s request', len(ranked), len(donors_data),
+                 request_context.get('urgency', 'normal'))
+        
+        return jsonify({
+            'success': True,
+            'rankings': ranked,
+            'total_donors': len(donors_data),
+            'top_k': top_k
+        }), 200
+        
+    except Exception as e:
+        log.error('/rank-donors', 'Ranking failed: %s', e)
+        return jsonify({
+            'error': 'Ranking failed',
+            'message': str(e)
+        }), 500
+
 @app.route('/recommend-strategy', methods=['POST'])
 def recommend_strategy():
     """
@@ -226,33 +932,50 @@ def recommend_strategy():
         }
     }
     
+    The body may also be MessagePack, or an Arrow IPC stream of the ranked
+    donors (as returned by /score-donors with an Arrow Accept header); only
+    its total_score and success probability columns are read.
+    
     Returns: Recommended strategy (targeted, broadcast, escalation, hybrid)
     """
     
     try:
-        data = request.get_json()
+        data = wire.read_payload(request)
+        _phase('parse')
         
-        if not data or 'scored_donors' not in data or 'request_context' not in data:
+        if not data or ('scored_donors' not in data and 'donor_columns' not in data) or 'request_context' not in data:
             return jsonify({
                 'error': 'Invalid request',
                 'message': 'Please provide scored_donors and request_context'
             }), 400
         
-        scored_donors = data['scored_donors']
         request_context = data['request_context']
+        _phase('validate')
         
         # Get strategy recommendation
-        strategy = agent_scorer.recommend_strategy(scored_donors, request_context)
+        with scoring_seconds.time('recommend_strategy'):
+            if 'donor_columns' in data:
+                columns = data['donor_columns']
+                success_probabilities = columns.get('success_probability', columns.get('predictions.success_probability'))
+                strategy = agent_scorer.recommend_strategy_from_columns(
+                    columns['total_score'], success_probabilities, request_context)
+                g.donor_count = len(columns['total_score'])
+            else:
+                strategy = agent_scorer.recommend_strategy(data['scored_donors'], request_context)
+                g.donor_count = len(data['scored_donors'])
+        _phase('rank')
         
-        print(f"🎯 Strategy recommended: {strategy['type']} - {strategy['reasoning']}")
+        log.info('/recommend-strategy', 'Strategy recommended: %s - %s', strategy['type'], strategy['reasoning'])
         
-        return jsonify({
+        return wire.respond(request, {
             'success': True,
             'strategy': strategy
-        }), 200
+        })
         
+    except wire.PayloadError:
+        raise  # 400 / 415 from the error handlers
     except Exception as e:
-        print(f"❌ Strategy recommendation error: {e}")
+        log.error('/recommend-strategy', 'Strategy recommendation failed: %s', e)
         return jsonify({
             'error': 'Strategy recommendation failed',
             'message': str(e)
@@ -267,7 +990,8 @@ def update_learning():
     {
         "donor_id": "123",
         "response_time_minutes": 15,
-        "success": true
+        "success": true,
+        "score_breakdown": {...}   # Optional, from the scoring response; trains the weights
     }
     """
     
@@ -281,13 +1005,22 @@ def update_learning():
             }), 400
         
         donor_id = data['donor_id']
-        response_time = data.get('response_time_minutes', 0)
+        try:
+            response_time = float(data.get('response_time_minutes', 0))
+        except (TypeError, ValueError):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'response_time_minutes must be a number'
+            }), 400
         success = data.get('success', False)
         
         # Update learning data
-        agent_scorer.update_learning_data(donor_id, response_time, success)
+        with scoring_seconds.time('update_learning'):
+            agent_scorer.update_learning_data(donor_id, response_time, success)
+        if weight_learner is not None:
+            weight_learner.record_outcome(donor_id, success, data.get('score_breakdown'))
         
-        print(f"📚 Learning updated for donor {donor_id}: {response_time}min, success={success}")
+        log.info('/update-learning', 'Learning updated for donor %s: %smin, success=%s', donor_id, response_time, success)
         
         return jsonify({
             'success': True,
@@ -295,28 +1028,588 @@ def update_learning():
         }), 200
         
     except Exception as e:
-        print(f"❌ Learning update error: {e}")
+        log.error('/update-learning', 'Learning update failed: %s', e)
         return jsonify({
             'error': 'Learning update failed',
             'message': str(e)
         }), 500
 
+@app.route('/donor-locations', methods=['POST'])
+def donor_locations():
+    """
+    Maintain the donor location index
+    
+    Expected JSON body:
+    {
+        "donors": [
+            {"donor_id": "123", "location": {"type": "Point", "coordinates": [lng, lat]}}
+        ],
+        "remove": ["456"],     # Optional donor ids to drop
+        "replace": false       # true: "donors" is the complete set
+    }
+    
+    Locations may also be {"lat": .., "lng": ..}.
+    """
+    
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('donors', []), list) or not isinstance(data.get('remove', []), list):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide a donors array of {donor_id, location} and/or a remove array'
+            }), 400
+        
+        donors = data.get('donors', [])
+        coordinates = [parse_location(donor.get('location')) if isinstance(donor, dict) else None
+                       for donor in donors]
+        
+        if any(c is None or 'donor_id' not in d for c, d in zip(coordinates, donors)):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Every donor needs a donor_id and a location with valid coordinates'
+            }), 400
+        
+        donor_ids = [donor['donor_id'] for donor in donors]
+        lats = [c[0] for c in coordinates]
+        lngs = [c[1] for c in coordinates]
+        
+        if data.get('replace'):
+            written = donor_index.replace(donor_ids, lats, lngs)
+        else:
+            written = donor_index.upsert(donor_ids, lats, lngs)
+        removed = donor_index.remove(data.get('remove', [])) if data.get('remove') else 0
+        
+        log.info('/donor-locations', 'Donor locations: %d written, %d removed', written, removed)
+        
+        return jsonify({
+            'success': True,
+            'written': written,
+            'removed': removed,
+            **donor_index.stats()
+        }), 200
+        
+    except Exception as e:
+        log.error('/donor-locations', 'Donor location update failed: %s', e)
+        return jsonify({
+            'error': 'Donor location update failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/nearby-donors', methods=['POST'])
+def nearby_donors():
+    """
+    Donors near a location, nearest first
+    
+    Expected JSON body:
+    {
+        "location": {"lat": 12.97, "lng": 77.59},
+        "radius_km": 10,    # Donors within this distance, and/or
+        "k": 50             # the k nearest donors
+    }
+    
+    Returns: {"donors": [{"donor_id": "123", "distance": 1.24}, ...]}
+    """
+    
+    try:
+        data = request.get_json()
+        _phase('parse')
+        
+        origin = parse_location((data or {}).get('location'))
+        radius_km = (data or {}).get('radius_km')
+        k = (data or {}).get('k')
+        
+        if origin is None or (radius_km is None and k is None):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide a location and radius_km and/or k'
+            }), 400
+        
+        valid_radius = radius_km is None or (
+            isinstance(radius_km, (int, float)) and not isinstance(radius_km, bool) and radius_km > 0)
+        valid_k = k is None or (isinstance(k, int) and not isinstance(k, bool) and 1 <= k <= MAX_NEARBY_DONORS)
+        
+        if not (valid_radius and valid_k):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': f'radius_km must be a positive number and k an integer from 1 to {MAX_NEARBY_DONORS}'
+            }), 400
+        _phase('validate')
+        
+        if k is not None:
+            donor_ids, distances = donor_index.nearest(origin[0], origin[1], k, max_km=radius_km)
+        else:
+            donor_ids, distances = donor_index.radius(origin[0], origin[1], radius_km, limit=MAX_NEARBY_DONORS)
+        _phase('score')
+        
+        log.info('/nearby-donors', 'Found %d donors near (%.4f, %.4f)', len(donor_ids), origin[0], origin[1])
+        
+        return jsonify({
+            'success': True,
+            'donors': [{'donor_id': donor_id, 'distance': distance}
+                       for donor_id, distance in zip(donor_ids, np.round(distances, 2).tolist())],
+            'count': len(donor_ids)
+        }), 200
+        
+    except Exception as e:
+        log.error('/nearby-donors', 'Nearby donor search failed: %s', e)
+        return jsonify({
+            'error': 'Nearby donor search failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/scorer-weights', methods=['GET'])
+def scorer_weights():
+    """
+    Weights the donor scorer is using and their version
+    
+    With WEIGHT_LEARNING on, "learning" lists recent weight versions with
+    the log loss and AUC of the feedback received while each was serving,
+    to compare ranking quality across versions.
+    """
+    return jsonify({
+        'success': True,
+        'version': agent_scorer.weights_version,
+        'weights': agent_scorer.weights,
+        'learning': weight_learner.stats() if weight_learner is not None else None
+    }), 200
+
+def _donor_locations(donors):
+    """(ids, lats, lngs) of the donors sent with a valid location"""
+    located = [(donor['donor_id'], parse_location(donor.get('location'))) for donor in donors]
+    located = [(donor_id, c) for donor_id, c in located if c is not None]
+    return ([donor_id for donor_id, _ in located], [c[0] for _, c in located], [c[1] for _, c in located])
+
+@app.route('/donor-table', methods=['GET'])
+def donor_table_status():
+    """Size, version and snapshot_id of the resident donor feature table"""
+    return jsonify({'success': True, **donor_table.stats()}), 200
+
+@app.route('/donor-table/snapshot', methods=['POST'])
+def donor_table_snapshot():
+    """
+    Replace the resident donor feature table
+    
+    Expected JSON body:
+    {
+        "donors": [...]   # Same donor shape as /score-donors
+    }
+    
+    Donors sent with a location are also added to the location index.
+    
+    Returns: The new version and snapshot_id; send deltas against them.
+    """
+    
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('donors'), list):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide a donors array'
+            }), 400
+        
+        try:
+            donor_table.load_snapshot(data['donors'])
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': str(e)
+            }), 400
+        
+        donor_ids, lats, lngs = _donor_locations(data['donors'])
+        if donor_ids:
+            donor_index.upsert(donor_ids, lats, lngs)
+        
+        stats = donor_table.stats()
+        log.info('/donor-table/snapshot', 'Donor table snapshot: %d donors, version %d',
+                 stats['donors'], stats['version'])
+        
+        return jsonify({'success': True, **stats}), 200
+        
+    except Exception as e:
+        log.error('/donor-table/snapshot', 'Donor table snapshot failed: %s', e)
+        return jsonify({
+            'error': 'Donor table snapshot failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/donor-table/delta', methods=['POST'])
+def donor_table_delta():
+    """
+    Apply donor changes to the resident feature table
+    
+    Expected JSON body:
+    {
+        "base_version": 41,                              # Version the delta was computed against
+        "upsert": [{"donor_id": "123", "is_available": false}],  # Changed fields only
+        "remove": ["456"]
+    }
+    
+    Returns 409 with the table's current version when base_version is
+    stale; the caller should then send a full snapshot.
+    """
+    
+    try:
+        data = request.get_json()
+        
+        valid = (data and isinstance(data.get('base_version'), int) and not isinstance(data['base_version'], bool)
+                 and isinstance(data.get('upsert', []), list) and isinstance(data.get('remove', []), list))
+        if not valid:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide an integer base_version and upsert and/or remove arrays'
+            }), 400
+        
+        upserts, removals = data.get('upsert', []), data.get('remove', [])
+        try:
+            version = donor_table.apply_delta(upserts, removals, base_version=data['base_version'])
+        except StaleVersionError as e:
+            return jsonify({
+                'error': 'Stale version',
+                'message': str(e),
+                **donor_table.stats()
+            }), 409
+        except ValueError as e:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': str(e)
+            }), 400
+        
+        donor_ids, lats, lngs = _donor_locations(upserts)
+        if donor_ids:
+            donor_index.upsert(donor_ids, lats, lngs)
+        if removals:
+            donor_index.remove(removals)
+        
+        log.info('/donor-table/delta', 'Donor table delta: %d upserted, %d removed, version %d',
+                 len(upserts), len(removals), version)
+        
+        return jsonify({'success': True, **donor_table.stats(), 'version': version}), 200
+        
+    except Exception as e:
+        log.error('/donor-table/delta', 'Donor table delta failed: %s', e)
+        return jsonify({
+            'error': 'Donor table delta failed',
+            'message': str(e)
+        }), 500
+
+def _event_timestamp(value):
+    """Epoch seconds from a number, an ISO 8601 string, or None (now); ValueError/TypeError otherwise"""
+    if value is None:
+        return time.time()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    return float(value)
+
+@app.route('/update-learning-batch', methods=['POST'])
+def update_learning_batch():
+    """
+    Update learning data from many feedback events in one call
+    
+    Expected JSON body:
+    {
+        "events": [
+            {
+                "donor_id": "123",
+                "response_time_minutes": 15,
+                "success": true,
+                "timestamp": "2024-01-01T10:00:00Z",  # or epoch seconds; optional
+                "score_breakdown": {...}              # Optional, as for /update-learning
+            }
+        ]
+    }
+    
+    Events for the same donor are applied in timestamp order.
+    """
+    
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('events'), list):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Please provide an events array of {donor_id, response_time_minutes, success, timestamp}'
+            }), 400
+        
+        events = data['events']
+        
+        if any(not isinstance(event, dict) or 'donor_id' not in event for event in events):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'Every event needs a donor_id'
+            }), 400
+        
+        # Validated up front, so a bad event rejects the batch before anything is applied
+        timestamps, response_times = [], []
+        for i, event in enumerate(events):
+            try:
+                timestamps.append(_event_timestamp(event.get('timestamp')))
+                response_times.append(float(event.get('response_time_minutes', 0)))
+            except (TypeError, ValueError):
+                return jsonify({
+                    'error': 'Invalid request',
+                    'message': f'Event {i} needs a numeric response_time_minutes and an ISO 8601 or epoch timestamp'
+                }), 400
+        
+        with scoring_seconds.time('update_learning'):
+            donors_updated = agent_scorer.update_learning_batch(
+                [event['donor_id'] for event in events],
+                response_times,
+                [bool(event.get('success', False)) for event in events],
+                timestamps
+            )
+        if weight_learner is not None:
+            for event in events:
+                weight_learner.record_outcome(event['donor_id'], bool(event.get('success', False)),
+                                              event.get('score_breakdown'))
+        
+        log.info('/update-learning-batch', 'Learning updated from %d events for %d donors', len(events), donors_updated)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Learning data updated',
+            'events_applied': len(events),
+            'donors_updated': donors_updated
+        }), 200
+        
+    except Exception as e:
+        log.error('/update-learning-batch', 'Batch learning update failed: %s', e)
+        return jsonify({
+            'error': 'Learning update failed',
+            'message': str(e)
+        }), 500
+
+def _admin_denied():
+    """403 response unless the request carries the configured admin token"""
+    token = request.headers.get('X-Admin-Token', '')
+    if ADMIN_TOKEN and hmac.compare_digest(token, ADMIN_TOKEN):
+        return None
+    return jsonify({
+        'error': 'Forbidden',
+        'message': 'Admin endpoints need a valid X-Admin-Token (set ML_ADMIN_TOKEN to enable them)'
+    }), 403
+
+def _models_status():
+    return {
+        'active': active_model.describe() if active_model is not None else None,
+        'shadow': shadow_scorer.stats(),
+        'registry': {
+            'path': MODEL_REGISTRY_PATH,
+            'active_version': model_registry.active_version(),
+            'shadow_version': model_registry.shadow_version(),
+            'versions': model_registry.versions()
+        }
+    }
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """Registry versions, the serving model and shadow agreement stats"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify(_models_status()), 200
+
+@app.route('/admin/models/activate', methods=['POST'])
+def admin_activate_model():
+    """
+    Hot-swap the serving model
+    
+    Expected JSON body: {"version": "v0002"}
+    
+    Moves the registry's ACTIVE pointer and swaps this process right away;
+    other workers follow through the registry watch.
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        
+        if not model_registry.exists(version):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': f'Unknown model version: {version}'
+            }), 400
+        
+        bundle = model_registry.load(version, flat=FLAT_FOREST)
+        model_registry.set_active(version)
+        _activate(bundle)
+        
+        log.info('/admin/models/activate', 'Switched to model %s', version, model_version=version)
+        
+        return jsonify({'success': True, **_models_status()}), 200
+        
+    except Exception as e:
+        log.error('/admin/models/activate', 'Model activation failed: %s', e)
+        return jsonify({
+            'error': 'Model activation failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/admin/models/shadow', methods=['POST'])
+def admin_shadow_model():
+    """
+    Start or stop shadow scoring of a candidate model
+    
+    Expected JSON body: {"version": "v0003"}  (null turns shadow mode off)
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        
+        if version is not None and not model_registry.exists(version):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': f'Unknown model version: {version}'
+            }), 400
+        
+        model_registry.set_shadow(version)
+        _set_shadow(version)
+        
+        return jsonify({'success': True, **_models_status()}), 200
+        
+    except Exception as e:
+        log.error('/admin/models/shadow', 'Shadow model update failed: %s', e)
+        return jsonify({
+            'error': 'Shadow model update failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/admin/profiles', methods=['GET'])
+def admin_profiles():
+    """Most recent request profiles from all workers (?limit=20)"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'profiles': profile_store.recent(max(1, min(limit, 200)))}), 200
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def admin_profile(profile_id):
+    """One request profile, by the X-Profile-Id the request was answered with"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({
+            'error': 'Not found',
+            'message': f'No profile {profile_id}'
+        }), 404
+    return jsonify(profile), 200
+
+@app.route('/admin/labels', methods=['POST'])
+def admin_labels():
+    """
+    Add moderator-labelled requests to the retraining drop directory
+    
+    Expected JSON body:
+    {
+        "rows": [
+            {"requests_per_day": 8, "account_age_days": 2, "time_gap_hours": 0.5,
+             "location_changes": 6, "label": "fake"}
+        ]
+    }
+    
+    Rows need the serving model's features and a label of "fake" or
+    "genuine". They are written as one JSONL file that the next
+    retraining run (retrain.py) picks up; serving is not affected.
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    import retrain  # Training dependencies stay out of the serving workers until needed
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        rows = data.get('rows')
+        features = active_model.feature_names if active_model is not None else BASE_FEATURES
+        
+        if not isinstance(rows, list) or not 0 < len(rows) <= MAX_LABEL_ROWS:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': f'Please provide a rows array of 1 to {MAX_LABEL_ROWS} labelled feature rows'
+            }), 400
+        
+        valid = all(
+            isinstance(row, dict) and row.get('label') in ('fake', 'genuine') and
+            all(isinstance(row.get(name), (int, float)) and not isinstance(row.get(name), bool) for name in features)
+            for row in rows
+        )
+        if not valid:
+            return jsonify({
+                'error': 'Invalid request',
+                'message': f'Every row needs numeric {", ".join(features)} and a label of "fake" or "genuine"'
+            }), 400
+        
+        path = retrain.write_label_file(LABELS_DIR, [dict({name: row[name] for name in features}, label=row['label'])
+                                                     for row in rows])
+        log.info('/admin/labels', 'Stored %d labelled rows in %s', len(rows), path)
+        
+        return jsonify({'success': True, 'rows': len(rows), 'file': os.path.basename(path)}), 200
+        
+    except Exception as e:
+        log.error('/admin/labels', 'Storing labels failed: %s', e)
+        return jsonify({
+            'error': 'Storing labels failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/admin/retrain', methods=['GET'])
+def admin_retrain():
+    """Last retraining run and last run that trained a candidate (see retrain.py)"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    
+    import retrain
+    
+    state = retrain.read_state(LABELS_DIR)
+    return jsonify({
+        'labels_dir': LABELS_DIR,
+        'last_run': state.get('last_run'),
+        'last_trained': state.get('last_trained')
+    }), 200
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🩸 LifeLink - ML Inference API")
     print("=" * 60)
     
     # Load model
+    metrics.remove_dead_files()
     if load_model():
+        score_calibration.absorb_dead_files()
         print("\n🚀 Starting Flask server...")
         print("   URL: http://localhost:5001")
         print("   Endpoints:")
         print("   - GET  /health")
         print("   - POST /predict (Fake detection)")
+        print("   - POST /predict-batch (Batch fake detection)")
         print("   - POST /score-donors (Agentic AI)")
+        print("   - POST /rank-donors (Agentic AI)")
+        print("   - POST /match (Agentic AI)")
         print("   - POST /recommend-strategy (Agentic AI)")
         print("   - POST /update-learning (Agentic AI)")
+        print("   - POST /update-learning-batch (Agentic AI)")
+        print("   - POST /donor-locations (Geo index)")
+        print("   - POST /nearby-donors (Geo index)")
+        print("   - GET  /donor-table, POST /donor-table/snapshot|delta (Donor features)")
+        print("   - GET  /scorer-weights (Agentic AI)")
+        print("   - GET  /admin/models, POST /admin/models/activate|shadow (Admin)")
+        print("   - GET  /admin/profiles (Admin)")
+        print("   - POST /admin/labels, GET /admin/retrain (Admin)")
         print("   - GET  /info")
+        print("   - GET  /metrics")
+        print("   - GET  /score-sketch (Drift monitoring)")
         print("=" * 60)
         
         app.run(host='0.0.0.0', port=5001, debug=False)
@@ -0,0 +1,315 @@
+"""
+LifeLink - Benchmark suite for the ML service hot paths
+Repeatable timings for the agentic scorer and the Flask request cycle
+
+Cases (pool size = number of donors per call):
+    score_donors           AgentScorer.score_donors
+    recommend_strategy     AgentScorer.recommend_strategy on scored donors
+    update_learning_data   one AgentScorer.update_learning_data call per donor
+    flask_predict          POST /predict through the Flask test client
+    flask_score_donors     POST /score-donors through the Flask test client
+
+Each case is timed call by call until it has run for --min-seconds (at
+least 3 calls). Peak memory is measured on a separate call under
+tracemalloc, so tracing does not slow down the timed calls. Result
+caches are disabled, so every request does the full work.
+
+Results are written as JSON. With a baseline (benchmarks/baseline.json
+by default) the run fails when any case's p50 latency is more than
+--margin slower than the baseline. Timings depend on the machine, so
+refresh the baseline with --update-baseline when the hardware changes.
+
+Usage:
+    python benchmark.py                      # all pool sizes, 10 .. 100k
+    python benchmark.py --quick              # 10 .. 1k, for CI
+    python benchmark.py --cases score_donors --sizes 1000,10000
+    python benchmark.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(ML_DIR, 'benchmarks', 'baseline.json')
+
+SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_SIZES = (10, 100, 1000)
+CASES = ('score_donors', 'recommend_strategy', 'update_learning_data', 'flask_predict', 'flask_score_donors')
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+REQUEST_CONTEXT = {
+    'blood_group': 'A+',
+    'urgency': 'critical',
+    'location': {'lat': 12.97, 'lng': 77.59},
+    'units_required': 2
+}
+
+
+def make_donors(n, seed=0):
+    """Donor dicts in the shape the backend sends to /score-donors"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'blood_group': rng.choice(BLOOD_GROUPS, n).tolist(),
+        'distance': np.round(rng.uniform(0, 30, n), 1).tolist(),
+        'reliability_score': rng.integers(0, 101, n).tolist(),
+        'can_donate': (rng.random(n) < 0.6).tolist(),
+        'days_since_last_donation': rng.integers(0, 400, n).tolist(),
+        'is_available': (rng.random(n) < 0.7).tolist(),
+        'last_active_hours': rng.choice([0.5, 2, 6, 12, 48], n).tolist()
+    }
+    return [dict({'donor_id': f'donor-{i}'}, **{key: values[i] for key, values in columns.items()})
+            for i in range(n)]
+
+
+def _quiet():
+    # Model loading prints status lines; keep them off the report
+    return contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+
+def time_calls(fn, min_seconds=1.0, min_calls=3, max_calls=2000):
+    """Per-call latencies (seconds) after one warm-up call"""
+    fn()
+    latencies = []
+    deadline = time.perf_counter() + min_seconds
+    while len(latencies) < min_calls or (time.perf_counter() < deadline and len(latencies) < max_calls):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def peak_memory_mb(fn):
+    """Peak traced allocation of one call, in MB"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 3)
+
+
+def summarize(name, size, latencies, items_per_call, peak_mb=None):
+    latencies_ms = np.asarray(latencies) * 1000.0
+    total = float(np.sum(latencies))
+    return {
+        'case': name,
+        'size': size,
+        'calls': len(latencies),
+        'calls_per_s': round(len(latencies) / total, 2),
+        'items_per_s': round(len(latencies) * items_per_call / total, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 4),
+        'max_ms': round(float(latencies_ms.max()), 4),
+        'peak_memory_mb': peak_mb
+    }
+
+
+class Suite:
+    """Builds the callables for each (case, size) pair"""
+
+    def __init__(self):
+        # Configure the app before it is imported: no result caches, no
+        # registry watch, and a throwaway learning store
+        scratch = tempfile.mkdtemp(prefix='lifelink-bench-')
+        os.environ['RESULT_CACHE_SIZE'] = '0'
+        os.environ['MODEL_WATCH_SECONDS'] = '0'
+        os.environ.setdefault('LEARNING_STORE_PATH', os.path.join(scratch, 'learning_store.bin'))
+        os.environ.setdefault('MODEL_REGISTRY_PATH', os.path.join(scratch, 'registry'))
+        os.environ.setdefault('METRICS_DIR', os.path.join(scratch, 'metrics'))
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        os.environ.setdefault('PROFILE_DIR', os.path.join(scratch, 'profiles'))
+        os.environ.setdefault('DONOR_LOCATIONS_PATH', os.path.join(scratch, 'donor_locations.npz'))
+        os.environ.setdefault('DONOR_TABLE_PATH', os.path.join(scratch, 'donor_table.npz'))
+        os.environ.setdefault('WEIGHTS_PATH', os.path.join(scratch, 'scorer_weights.npz'))
+        os.environ.setdefault('SKETCH_DIR', os.path.join(scratch, 'score_sketches'))
+        os.chdir(ML_DIR)
+        sys.path.insert(0, ML_DIR)
+
+        from agent_scorer import AgentScorer
+        from learning_store import LearningStore
+
+        self.AgentScorer = AgentScorer
+        self.LearningStore = LearningStore
+        self._app = None
+
+    def _scorer(self, donors):
+        """Scorer with learned history for every other donor"""
+        scorer = self.AgentScorer(self.LearningStore(capacity=max(2 * len(donors), 1000)))
+        history = donors[::2]
+        scorer.update_learning_batch(
+            [d['donor_id'] for d in history],
+            [float(10 + i % 50) for i in range(len(history))],
+            [i % 3 != 0 for i in range(len(history))],
+            [time.time()] * len(history))
+        return scorer
+
+    def _client(self):
+        if self._app is None:
+            with _quiet():
+                import app as ml_app
+                if not ml_app.load_model():
+                    raise RuntimeError('Model not found. Run: python train_model.py')
+            self._app = ml_app
+        return self._app.app.test_client()
+
+    def case(self, name, size):
+        """(callable, items per call) for one case and pool size"""
+        donors = make_donors(size)
+
+        if name == 'score_donors':
+            scorer = self._scorer(donors)
+            return (lambda: scorer.score_donors(donors, REQUEST_CONTEXT)), size
+
+        if name == 'recommend_strategy':
+            scorer = self._scorer(donors)
+            scored = scorer.score_donors(donors, REQUEST_CONTEXT)
+            return (lambda: scorer.recommend_strategy(scored, REQUEST_CONTEXT)), size
+
+        if name == 'update_learning_data':
+            scorer = self.AgentScorer(self.LearningStore(capacity=max(2 * size, 1000)))
+            ids = [d['donor_id'] for d in donors]
+
+            def update_all():
+                for i, donor_id in enumerate(ids):
+                    scorer.update_learning_data(donor_id, 10 + i % 50, i % 3 != 0)
+            return update_all, size
+
+        client = self._client()
+
+        if name == 'flask_predict':
+            rows = iter(make_feature_rows())
+
+            def predict():
+                with _quiet():
+                    response = client.post('/predict', json={'features': next(rows)})
+                assert response.status_code == 200, response.data
+            return predict, 1
+
+        if name == 'flask_score_donors':
+            body = json.dumps({'donors': donors, 'request_context': REQUEST_CONTEXT})
+
+            def score():
+                with _quiet():
+                    response = client.post('/score-donors', data=body, content_type='application/json')
+                assert response.status_code == 200, response.data
+            return score, size
+
+        raise ValueError(f'Unknown case: {name}')
+
+
+def make_feature_rows(seed=0):
+    """Endless varied /predict feature vectors"""
+    rng = np.random.default_rng(seed)
+    while True:
+        for row in np.column_stack([rng.integers(0, 10, 1000), rng.integers(0, 365, 1000),
+                                    rng.integers(0, 8760, 1000), rng.integers(0, 10, 1000)]).tolist():
+            yield row
+
+
+def run_suite(cases=CASES, sizes=SIZES, min_seconds=1.0, memory=True, log=print):
+    suite = Suite()
+    results = []
+    for name in cases:
+        for size in ((1,) if name == 'flask_predict' else sizes):
+            fn, items = suite.case(name, size)
+            latencies = time_calls(fn, min_seconds)
+            peak = peak_memory_mb(fn) if memory else None
+            result = summarize(name, size, latencies, items, peak)
+            results.append(result)
+            log(f"   {name:<22} {size:>7} | {result['calls']:>5} calls | {result['items_per_s']:>12,.0f} items/s | "
+                f"p50 {result['p50_ms']:>9.3f} p95 {result['p95_ms']:>9.3f} p99 {result['p99_ms']:>9.3f} ms | "
+                f"peak {peak if peak is not None else '-':>8} MB")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'min_seconds': min_seconds
+        },
+        'results': results
+    }
+
+
+def find_regressions(results, baseline, margin=0.25, metric='p50_ms'):
+    """Cases whose metric is more than `margin` (fraction) above the baseline"""
+    previous = {(r['case'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result['case'], result['size']))
+        if before is None or not before.get(metric):
+            continue
+        change = result[metric] / before[metric] - 1.0
+        if change > margin:
+            regressions.append({'case': result['case'], 'size': result['size'], 'metric': metric,
+                                'baseline': before[metric], 'current': result[metric],
+                                'change': round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ML service hot paths')
+    parser.add_argument('--cases', default=','.join(CASES), help='Comma-separated cases')
+    parser.add_argument('--sizes', help='Comma-separated donor pool sizes (default 10..100000)')
+    parser.add_argument('--quick', action='store_true', help='Pool sizes up to 1000 only')
+    parser.add_argument('--min-seconds', type=float, default=1.0, help='Timed duration per case')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--margin', type=float, default=0.25, help='Allowed p50 slowdown (0.25 = 25%%)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the baseline')
+    args = parser.parse_args()
+
+    sizes = ([int(s) for s in args.sizes.split(',')] if args.sizes
+             else QUICK_SIZES if args.quick else SIZES)
+
+    print("=" * 100)
+    print("⏱️  LifeLink - ML service benchmarks")
+    print("=" * 100)
+
+    report = run_suite(args.cases.split(','), sizes, args.min_seconds, memory=not args.no_memory)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️  No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = find_regressions(report['results'], json.load(f), args.margin)
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.margin:.0%}:")
+        for r in regressions:
+            print(f"   {r['case']} ({r['size']}): p50 {r['baseline']:.3f} -> {r['current']:.3f} ms "
+                  f"(+{r['change']:.0%})")
+        return 1
+
+    print(f"\n✅ No regressions beyond {args.margin:.0%} of the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+LifeLink - ABO/Rh red cell compatibility
+Which donor blood groups a recipient can receive, as bitmasks
+
+Each of the eight groups is one bit. A recipient can receive from a donor
+whose red cells carry no antigen (A, B, RhD) the recipient lacks, so the
+compatible donors of every recipient group are precomputed as one mask and
+a donor pool is checked with a single vectorized AND.
+
+Unrecognized or missing groups on either side are treated as compatible:
+the backend may not know a group yet, and dropping those donors would be
+worse than scoring them.
+
+Groups are compared after normalizing case and spaces (' o+' is O+), once
+per donor: callers convert a pool with group_bits() and reuse the bits for
+both the compatibility mask and the blood match sub-score.
+"""
+
+import numpy as np
+
+BLOOD_GROUPS = ('O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+')
+
+_ANTIGENS = {group: ({'A', 'B'} & set(group[:-1])) | ({'D'} if group.endswith('+') else set())
+             for group in BLOOD_GROUPS}
+_BITS = {group: 1 << i for i, group in enumerate(BLOOD_GROUPS)}
+
+# Recipient group -> bitmask of the donor groups it can receive
+COMPATIBLE_DONORS = {
+    recipient: sum(_BITS[donor] for donor in BLOOD_GROUPS if _ANTIGENS[donor] <= _ANTIGENS[recipient])
+    for recipient in BLOOD_GROUPS
+}
+_ANY = (1 << len(BLOOD_GROUPS)) - 1
+
+# Recipient group -> bits of the compatible donor groups with the same ABO
+# group (an RhD-negative donor for an RhD-positive recipient): ABO-identical
+# blood is preferred over other compatible groups
+_ABO_IDENTICAL = {
+    recipient: sum(_BITS[donor] for donor in BLOOD_GROUPS if donor[:-1] == recipient[:-1]) & COMPATIBLE_DONORS[recipient]
+    for recipient in BLOOD_GROUPS
+}
+
+# Blood match sub-score (0-100) of a donor
+EXACT_MATCH_SCORE = 100.0
+ABO_MATCH_SCORE = 85.0
+COMPATIBLE_SCORE = 70.0  # Also when either group is unknown
+
+
+def _normalize(group):
+    return group.strip().upper().replace(' ', '') if isinstance(group, str) else None
+
+
+def group_bits(groups):
+    """One bit per donor for its group, 0 where the group is not recognized"""
+    groups = list(groups)
+    return np.fromiter((_BITS.get(_normalize(group), 0) for group in groups), dtype=np.uint8, count=len(groups))
+
+
+def compatible_bits(bits, recipient_group):
+    """compatible_mask for donor groups already converted with group_bits"""
+    accepts = COMPATIBLE_DONORS.get(_normalize(recipient_group), _ANY)
+    return (bits == 0) | ((bits & accepts) != 0)
+
+
+def compatible_mask(donor_groups, recipient_group):
+    """Boolean array: donor can give to the recipient (or either group is unknown)"""
+    return compatible_bits(group_bits(donor_groups), recipient_group)
+
+
+def match_scores(bits, recipient_group):
+    """
+    Blood match sub-score per donor, from group_bits: EXACT_MATCH_SCORE for
+    the recipient's group, ABO_MATCH_SCORE for the same ABO group,
+    COMPATIBLE_SCORE for any other compatible or unknown group, else 0
+
+    A request without a group matches donors without a (recognized) group
+    exactly, as the original equality check did.
+    """
+    scores = np.where(compatible_bits(bits, recipient_group), COMPATIBLE_SCORE, 0.0)
+    recipient = _normalize(recipient_group)
+    if recipient is None:
+        scores[bits == 0] = EXACT_MATCH_SCORE
+    elif recipient in _BITS:
+        scores[(bits & _ABO_IDENTICAL[recipient]) != 0] = ABO_MATCH_SCORE
+        scores[bits == _BITS[recipient]] = EXACT_MATCH_SCORE
+    return scores
+
+
+def match_score(donor_group, recipient_group):
+    """Single-donor match_scores"""
+    return float(match_scores(group_bits([donor_group]), recipient_group)[0])
+
+
+def is_compatible(donor_group, recipient_group):
+    """Single-donor compatible_mask"""
+    bits = _BITS.get(_normalize(donor_group), 0)
+    return bits == 0 or bool(bits & COMPATIBLE_DONORS.get(_normalize(recipient_group), _ANY))
@@ -0,0 +1,318 @@
+"""
+LifeLink - Resident donor feature table
+Donor scoring features held by the ML service, kept current by deltas
+
+Instead of sending every donor's full record with each /score-donors
+call, the backend loads the table once with a snapshot and then sends
+only the donors that changed. Scoring requests can then name donors by id
+or ask for every eligible donor.
+
+Every change bumps `version`. A delta names the version it was computed
+against (base_version) and is rejected with StaleVersionError if the
+table has moved on, e.g. a delta was lost or another writer got in
+first. A snapshot also starts a new `snapshot_id`. A backend that sees
+an unexpected version or snapshot_id (an ML worker restarted without a
+table file, say) sends a fresh snapshot.
+
+Columns are numpy arrays, one row per donor. Writers build new arrays
+(a delta that neither adds nor drops donors copies only the columns it
+touches) and swap them in with one reference assignment, so readers never
+see a half-applied delta. With a path, the table is an .npz snapshot shared
+by every worker (see snapshot_file.py). As in geo_index.py, writes only
+change this process's copy and queue the change; a background thread
+merges the queued changes into the file every flush_seconds (and at exit).
+Until then other workers are a version behind, and a delta sent to one of
+them is rejected as stale.
+"""
+
+import atexit
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from agent_scorer import DONOR_FIELD_DEFAULTS
+from snapshot_file import SnapshotFile
+
+# Stored per donor. distance is per request (see geo_index.py), so it is not a table column.
+FEATURES = {key: default for key, default in DONOR_FIELD_DEFAULTS.items() if key != 'distance'}
+
+
+class StaleVersionError(Exception):
+    """A delta was computed against a version the table is no longer at"""
+
+    def __init__(self, base_version, version):
+        super().__init__(f'Delta is based on version {base_version} but the table is at version {version}')
+        self.base_version = base_version
+        self.version = version
+
+
+class _Table:
+    """One immutable version of the table"""
+
+    def __init__(self, columns, version, snapshot_id):
+        self.columns = columns
+        self.version = version
+        self.snapshot_id = snapshot_id
+        self.positions = {donor_id: i for i, donor_id in enumerate(columns['donor_id'].tolist())}
+
+    def __len__(self):
+        return len(self.columns['donor_id'])
+
+
+def _empty_columns(n=0):
+    columns = {'donor_id': np.full(n, '', dtype=object), 'blood_group': np.full(n, '', dtype=object)}
+    for key, default in FEATURES.items():
+        columns[key] = np.full(n, default, dtype=bool if isinstance(default, bool) else float)
+    return columns
+
+
+def _column_values(donors, key, default, dtype):
+    values = (donor.get(key, default) for donor in donors)
+    if dtype is bool:
+        values = (bool(value) for value in values)
+    return np.fromiter(values, dtype=dtype, count=len(donors))
+
+
+def _valid_value(key, value):
+    if key == 'blood_group':
+        return value is None or isinstance(value, str)
+    if isinstance(FEATURES[key], bool):
+        return isinstance(value, bool) or (isinstance(value, (int, float)) and value in (0, 1))
+    return isinstance(value, (int, float)) and np.isfinite(value)
+
+
+def _snapshot_columns(table, donors, snapshot_id):
+    """Change: the table holds exactly `donors`"""
+    columns = {
+        'donor_id': np.array([str(donor['donor_id']) for donor in donors], dtype=object),
+        'blood_group': np.array([donor.get('blood_group') or '' for donor in donors], dtype=object)
+    }
+    for key, default in FEATURES.items():
+        columns[key] = _column_values(donors, key, default, bool if isinstance(default, bool) else float)
+    return columns, snapshot_id
+
+
+def _delta_columns(table, upserts, removals):
+    """Change: upsert and remove donors, sharing the columns no upsert touches"""
+    columns, positions = dict(table.columns), table.positions
+
+    drop = {str(donor_id) for donor_id in removals} & positions.keys()
+    if drop:
+        keep = np.fromiter((donor_id not in drop for donor_id in columns['donor_id'].tolist()),
+                           dtype=bool, count=len(table))
+        columns = {key: values[keep] for key, values in columns.items()}
+        positions = {donor_id: i for i, donor_id in enumerate(columns['donor_id'].tolist())}
+
+    new_ids = [str(donor['donor_id']) for donor in upserts if str(donor['donor_id']) not in positions]
+    if new_ids:
+        added = _empty_columns(len(new_ids))
+        added['donor_id'][:] = new_ids
+        columns = {key: np.concatenate([columns[key], added[key]]) for key in columns}
+        positions = dict(positions)
+        positions.update((donor_id, row) for row, donor_id in enumerate(new_ids, start=len(positions)))
+
+    # Columns still shared with `table` are copied before their first write
+    copied = set() if not (drop or new_ids) else set(columns)
+    for donor in upserts:
+        row = positions[str(donor['donor_id'])]
+        for key in donor.keys() & columns.keys() - {'donor_id'}:
+            if key not in copied:
+                columns[key] = columns[key].copy()
+                copied.add(key)
+            value = donor[key]
+            if key == 'blood_group':
+                columns[key][row] = value or ''
+            else:
+                columns[key][row] = bool(value) if columns[key].dtype == bool else float(value)
+    return columns, table.snapshot_id
+
+
+def _validated(donors):
+    """
+    Check every donor before anything is written, so a bad record fails the
+    whole request with a ValueError naming the donor and field
+    """
+    if any(not isinstance(donor, dict) or donor.get('donor_id') is None for donor in donors):
+        raise ValueError('Every donor needs a donor_id')
+    for donor in donors:
+        for key in donor.keys() & (FEATURES.keys() | {'blood_group'}):
+            if not _valid_value(key, donor[key]):
+                expected = ('a string' if key == 'blood_group'
+                            else 'true or false' if isinstance(FEATURES[key], bool) else 'a number')
+                raise ValueError(f"Donor {donor['donor_id']}: {key} must be {expected}, got {donor[key]!r}")
+    # Last record wins for duplicate ids
+    return list({str(donor['donor_id']): donor for donor in donors}.values())
+
+
+class DonorTable:
+    """Resident per-donor scoring features (see module docstring)"""
+
+    def __init__(self, path=None, flush_seconds=1.0):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._table = _Table(_empty_columns(), 0, None)
+        self._file = SnapshotFile(path) if path is not None else None
+        self._pending = []  # (change, args) made here and not yet in the file, oldest first
+        self._thread_lock = threading.RLock()
+        self._thread = None
+        self._pid = None
+        self._refresh()
+
+    # ------------------------------------------------------------------
+    # Snapshot file
+    # ------------------------------------------------------------------
+
+    def _refresh(self):
+        """Reload the table if another process replaced it, keeping this process's pending changes"""
+        if self._file is None or not self._file.changed():
+            return
+        with self._thread_lock:
+            arrays = self._file.load_if_changed()
+            if arrays is not None:
+                columns = {key: arrays[key] for key in _empty_columns()}
+                columns['donor_id'] = columns['donor_id'].astype(object)
+                columns['blood_group'] = columns['blood_group'].astype(object)
+                table = _Table(columns, int(arrays['version']), str(arrays['snapshot_id']) or None)
+                for change, args in self._pending:
+                    columns, snapshot_id = change(table, *args)
+                    table = _Table(columns, table.version, snapshot_id)
+                # Never reuse a version this process has served (it keys cached results)
+                table.version = max(table.version, self._table.version + 1)
+                self._table = table
+
+    def _current(self):
+        self._refresh()
+        return self._table
+
+    def _ensure_worker(self):
+        # Threads do not survive fork; each worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    # Changes a forked worker inherited are flushed by its parent
+                    self._pending = []
+                else:
+                    atexit.register(self.flush)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='donor-table-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                pass  # The changes stay pending; retried next round
+
+    def flush(self):
+        """Merge this process's pending changes into the snapshot file"""
+        if self._file is None or not self._pending:
+            return
+        with self._file.lock():
+            with self._thread_lock:
+                self._refresh()
+                table, flushed = self._table, len(self._pending)
+            arrays = {key: values.astype(str) if values.dtype == object else values
+                      for key, values in table.columns.items()}
+            self._file.save(dict(arrays, version=table.version, snapshot_id=table.snapshot_id or ''))
+            with self._thread_lock:
+                del self._pending[:flushed]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _apply(self, change, *args):
+        """Swap in a new table in memory and queue the change for the file; returns the new version"""
+        with self._thread_lock:
+            current = self._current()
+            columns, snapshot_id = change(current, *args)
+            self._table = _Table(columns, current.version + 1, snapshot_id)
+            if self._file is not None:
+                self._ensure_worker()
+                self._pending.append((change, args))
+            return self._table.version
+
+    def load_snapshot(self, donors):
+        """Replace the whole table; returns the new version"""
+        return self._apply(_snapshot_columns, _validated(donors), uuid.uuid4().hex)
+
+    def apply_delta(self, upserts=(), removals=(), base_version=None):
+        """
+        Add or change donors and drop others; returns the new version
+
+        An upserted donor only needs the fields that changed; the others keep
+        their current value (or the default, for a new donor).
+        """
+        upserts = _validated(list(upserts))
+        with self._thread_lock:
+            current = self._current()
+            if base_version is not None and base_version != current.version:
+                raise StaleVersionError(base_version, current.version)
+            return self._apply(_delta_columns, upserts, list(removals))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self):
+        return self._current().version
+
+    def __len__(self):
+        return len(self._current())
+
+    def columns(self, donor_ids=None):
+        """
+        Donor columns as accepted by AgentScorer.score_donor_columns
+
+        With donor_ids, one row per listed id, in order; ids not in the table
+        get default features (and the count of them is returned as well).
+        Without, every donor who can donate.
+
+        Returns:
+            Tuple of (columns, number of unknown ids)
+        """
+        table = self._current()
+        if donor_ids is None:
+            rows = np.flatnonzero(table.columns['can_donate'])
+            columns = {key: values[rows] for key, values in table.columns.items()}
+            columns['donor_id'] = columns['donor_id'].tolist()
+            columns['blood_group'] = [group or None for group in columns['blood_group'].tolist()]
+            return columns, 0
+
+        donor_ids = list(donor_ids)
+        rows = np.fromiter((table.positions.get(str(donor_id), -1) for donor_id in donor_ids),
+                           dtype=np.intp, count=len(donor_ids))
+        known = rows >= 0
+        blood_groups = np.full(len(donor_ids), '', dtype=object)
+        blood_groups[known] = table.columns['blood_group'][rows[known]]
+        columns = {'donor_id': donor_ids, 'blood_group': [group or None for group in blood_groups.tolist()]}
+        for key, default in FEATURES.items():
+            values = np.full(len(donor_ids), default, dtype=table.columns[key].dtype)
+            values[known] = table.columns[key][rows[known]]
+            columns[key] = values
+        return columns, int(np.count_nonzero(~known))
+
+    def missing(self, donor_ids):
+        """How many of donor_ids are not in the table (0 for None, meaning all eligible)"""
+        if donor_ids is None:
+            return 0
+        positions = self._current().positions
+        return sum(1 for donor_id in donor_ids if str(donor_id) not in positions)
+
+    def stats(self):
+        table = self._current()
+        return {
+            'donors': len(table),
+            'version': table.version,
+            'snapshot_id': table.snapshot_id,
+            'persistent': self.path is not None,
+            'pending_changes': len(self._pending)
+        }
@@ -0,0 +1,208 @@
+"""
+LifeLink - Flat-array IsolationForest evaluator
+Low-latency scoring for the fake request detector
+
+sklearn's IsolationForest.decision_function validates its input, then
+walks each of the n_estimators trees in a Python-level loop. For the one
+row /predict scores, that fixed overhead is most of the latency.
+
+FlatForest copies the trained forest and its StandardScaler into a few
+contiguous arrays:
+    feature, threshold, left, right  - every tree's nodes back to back
+                                       (leaves point to themselves)
+    leaf_value                       - depth + average path length
+                                       correction of each node
+    roots                            - index of each tree's root node
+
+and scores rows by advancing every (row, tree) pair one level per step
+with array operations, for max_depth steps. The arithmetic mirrors
+sklearn's (scaled rows compared as float32 against the thresholds, the
+same path length formula), so scores agree to floating point rounding.
+The arrays are built from the pickled model whenever a ModelBundle loads
+(see model_registry.py), so they are never stored separately.
+
+Usage:
+    python flat_forest.py benchmark    # latency vs sklearn
+"""
+
+import sys
+import time
+
+import numpy as np
+
+MODEL_PATH = 'models/fake_detector.pkl'
+SCALER_PATH = 'models/scaler.pkl'
+
+
+def _average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search (same as sklearn)"""
+    n_samples = np.asarray(n_samples, dtype=float)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    larger = n_samples > 2
+    result[larger] = (2.0 * (np.log(n_samples[larger] - 1.0) + np.euler_gamma)
+                      - 2.0 * (n_samples[larger] - 1.0) / n_samples[larger])
+    return result
+
+
+class FlatForest:
+    """IsolationForest + StandardScaler flattened into contiguous arrays"""
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'leaf_value', 'roots',
+              'scaler_mean', 'scaler_scale')
+
+    def __init__(self, feature, threshold, left, right, leaf_value, roots,
+                 scaler_mean, scaler_scale, max_depth, denominator, offset):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.max_depth = int(max_depth)
+        self.denominator = float(denominator)
+        self.offset = float(offset)
+        self.n_features = len(scaler_mean)
+        # Interleaved (left, right) pairs, indexed by node * 2 + go_right
+        self._children = np.stack([left, right], axis=1).ravel()
+        self._split_feature = np.maximum(feature, 0)
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        """Flatten a fitted IsolationForest and the StandardScaler in front of it"""
+
+        subsample_features = model._max_features != model.n_features_in_
+        features, thresholds, lefts, rights, leaf_values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator, estimator_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            is_leaf = left < 0
+
+            # Node depth with the root at 1, as in Tree.compute_node_depths().
+            # Children always have larger indices than their parent.
+            depth = np.ones(n_nodes)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[left[node]] = depth[node] + 1
+                    depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            # With max_features < 1.0 each tree sees its own column subset
+            feature = np.maximum(tree.feature.astype(np.int64), 0)
+            if subsample_features:
+                feature = np.asarray(estimator_features)[feature]
+            feature = np.where(is_leaf, -1, feature)
+
+            own = np.arange(n_nodes)
+            features.append(feature)
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, own, left) + offset)
+            rights.append(np.where(is_leaf, own, right) + offset)
+            leaf_values.append(depth + _average_path_length(tree.n_node_samples) - 1.0)
+            roots.append(offset)
+            offset += n_nodes
+
+        denominator = len(model.estimators_) * _average_path_length([model._max_samples])[0]
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            leaf_value=np.concatenate(leaf_values),
+            roots=np.asarray(roots, dtype=np.int32),
+            scaler_mean=np.asarray(scaler.mean_, dtype=np.float64),
+            scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+            max_depth=max_depth,
+            denominator=denominator,
+            offset=model.offset_
+        )
+
+    def transform(self, X):
+        """Same as scaler.transform(X), as the float32 rows the trees compare"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return ((X - self.scaler_mean) / self.scaler_scale).astype(np.float32)
+
+    def score_samples(self, X):
+        """Same as IsolationForest.score_samples(scaler.transform(X))"""
+        return self.score_transformed(self.transform(X))
+
+    def score_transformed(self, X_scaled):
+        """score_samples() for rows already passed through transform()"""
+
+        n_rows, n_features = X_scaled.shape
+        values = X_scaled.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+
+        # One level of every tree for every row per step; np.take on flat
+        # arrays is much cheaper than 2-D fancy indexing
+        for _ in range(self.max_depth - 1):
+            go_right = ~(values.take(row_offsets + self._split_feature.take(nodes))
+                         <= self.threshold.take(nodes))
+            nodes = self._children.take(nodes * 2 + go_right)
+
+        depths = self.leaf_value.take(nodes).sum(axis=1)
+        if self.denominator == 0:
+            return -np.ones(n_rows)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X):
+        """Same as IsolationForest.decision_function(scaler.transform(X))"""
+        return self.score_samples(X) - self.offset
+
+
+def benchmark(model_path=MODEL_PATH, scaler_path=SCALER_PATH, repeats=200):
+    """Compare single-row and batch latency against sklearn"""
+    import joblib
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    flat = FlatForest.from_sklearn(model, scaler)
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(0, 10, 1000), rng.integers(0, 365, 1000),
+        rng.integers(0, 8760, 1000), rng.integers(0, 10, 1000)
+    ]).astype(float)
+
+    expected = model.decision_function(scaler.transform(X))
+    max_error = float(np.max(np.abs(flat.decision_function(X) - expected)))
+
+    def timed(fn, rows, n):
+        fn(rows)
+        started = time.perf_counter()
+        for _ in range(n):
+            fn(rows)
+        return (time.perf_counter() - started) / n * 1000.0
+
+    print("=" * 60)
+    print(f"🌲 Flat forest vs sklearn ({len(model.estimators_)} trees)")
+    print(f"   Max |score difference| over {len(X)} rows: {max_error:.2e}")
+    for n_rows in (1, 10, 100, 1000):
+        rows = X[:n_rows]
+        sklearn_ms = timed(lambda r: model.decision_function(scaler.transform(r)), rows,
+                           max(5, repeats // n_rows))
+        flat_ms = timed(flat.decision_function, rows, max(5, repeats // n_rows))
+        print(f"   {n_rows:>5} rows: sklearn {sklearn_ms:8.3f} ms | flat {flat_ms:8.3f} ms | "
+              f"{sklearn_ms / flat_ms:6.1f}x")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+    if command == 'benchmark':
+        benchmark(*sys.argv[2:])
+    else:
+        print("Usage: python flat_forest.py benchmark [model_path scaler_path]")
+        sys.exit(1)
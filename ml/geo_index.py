@@ -0,0 +1,297 @@
+"""
+LifeLink - Geospatial donor index
+Donor coordinates with radius and k-nearest queries around a request
+
+The index keeps every donor's last known position (latitude, longitude in
+degrees). Queries answer "donors within r km" and "the k closest donors"
+with great-circle (haversine) distances:
+    - up to BRUTE_FORCE_MAX donors, distances to all of them are computed
+      in one vectorized pass;
+    - above that, a scikit-learn BallTree with the haversine metric is
+      built once after each change and queried.
+
+With a path, the coordinates live in an .npz snapshot shared by every
+worker (see snapshot_file.py). Writes only change this process's copy and
+queue the change; a background thread merges the queued changes into the
+file every flush_seconds (and at exit), so the request path never rewrites
+the file. Other workers see a change on their first query after the flush.
+"""
+
+import atexit
+import os
+import threading
+import time
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from snapshot_file import SnapshotFile
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Below this many donors a full vectorized scan beats building a tree
+BRUTE_FORCE_MAX = 4096
+
+
+def parse_location(location):
+    """
+    (lat, lng) in degrees from the shapes the backend sends, or None
+
+    Accepts {"lat": .., "lng": ..} (also "latitude"/"longitude") and
+    GeoJSON points {"type": "Point", "coordinates": [lng, lat]}.
+    """
+    if not isinstance(location, dict):
+        return None
+    try:
+        if 'coordinates' in location:
+            lng, lat = location['coordinates'][:2]
+        elif 'lat' in location:
+            lat, lng = location['lat'], location.get('lng', location.get('lon'))
+        else:
+            lat, lng = location['latitude'], location['longitude']
+        lat, lng = float(lat), float(lng)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distances (km) from one point to arrays of points, all in degrees"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs, dtype=float) - lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class _Snapshot:
+    """One immutable set of locations; queries read a single snapshot reference"""
+
+    def __init__(self, ids, lats, lngs, version):
+        self.ids = np.asarray(ids, dtype=str)
+        self.lat = np.asarray(lats, dtype=float)
+        self.lng = np.asarray(lngs, dtype=float)
+        self.version = version
+        self.positions = {donor_id: i for i, donor_id in enumerate(self.ids.tolist())}
+        self._tree = None
+
+    def ball_tree(self):
+        if self._tree is None:
+            self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lng])), metric='haversine')
+        return self._tree
+
+
+def _replaced(snapshot, ids, lats, lngs):
+    # Last entry wins for duplicate ids
+    last = {donor_id: i for i, donor_id in enumerate(ids)}
+    keep = np.fromiter(last.values(), dtype=np.intp, count=len(last))
+    return np.asarray(ids, dtype=str)[keep], lats[keep], lngs[keep]
+
+
+def _upserted(snapshot, ids, lats, lngs):
+    all_ids = np.concatenate([snapshot.ids, np.asarray(ids, dtype=str)])
+    all_lat = np.concatenate([snapshot.lat, lats])
+    all_lng = np.concatenate([snapshot.lng, lngs])
+    last = {donor_id: i for i, donor_id in enumerate(all_ids.tolist())}
+    keep = np.sort(np.fromiter(last.values(), dtype=np.intp, count=len(last)))
+    return all_ids[keep], all_lat[keep], all_lng[keep]
+
+
+def _removed(snapshot, drop):
+    keep = np.fromiter((donor_id not in drop for donor_id in snapshot.ids.tolist()),
+                       dtype=bool, count=len(snapshot.ids))
+    return snapshot.ids[keep], snapshot.lat[keep], snapshot.lng[keep]
+
+
+class DonorGeoIndex:
+    """Donor id -> coordinates, with radius and nearest-neighbour queries"""
+
+    def __init__(self, path=None, brute_force_max=BRUTE_FORCE_MAX, flush_seconds=1.0):
+        self.path = path
+        self.brute_force_max = brute_force_max
+        self.flush_seconds = flush_seconds
+        self._snapshot = _Snapshot([], [], [], 0)
+        self._file = SnapshotFile(path) if path is not None else None
+        self._pending = []  # (change, args) made here and not yet in the file, oldest first
+        self._thread_lock = threading.RLock()
+        self._thread = None
+        self._pid = None
+        self._refresh()
+
+    def _refresh(self):
+        """Reload the snapshot if another process replaced it, keeping this process's pending changes"""
+        if self._file is None or not self._file.changed():
+            return
+        with self._thread_lock:
+            arrays = self._file.load_if_changed()
+            if arrays is not None:
+                snapshot = _Snapshot(arrays['donor_id'], arrays['lat'], arrays['lng'], int(arrays['version']))
+                for change, args in self._pending:
+                    snapshot = _Snapshot(*change(snapshot, *args), snapshot.version)
+                # Never reuse a version this process has served (it keys cached results)
+                snapshot.version = max(snapshot.version, self._snapshot.version + 1)
+                self._snapshot = snapshot
+
+    @property
+    def version(self):
+        """Bumped by every change; other workers' changes count once flushed"""
+        self._refresh()
+        return self._snapshot.version
+
+    # ------------------------------------------------------------------
+    # Snapshot file
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        # Threads do not survive fork; each worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    # Changes a forked worker inherited are flushed by its parent
+                    self._pending = []
+                else:
+                    atexit.register(self.flush)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='geo-index-flush', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                pass  # The changes stay pending; retried next round
+
+    def flush(self):
+        """Merge this process's pending changes into the snapshot file"""
+        if self._file is None or not self._pending:
+            return
+        with self._file.lock():
+            with self._thread_lock:
+                self._refresh()
+                snapshot, flushed = self._snapshot, len(self._pending)
+            self._file.save({'donor_id': snapshot.ids, 'lat': snapshot.lat, 'lng': snapshot.lng,
+                             'version': snapshot.version})
+            with self._thread_lock:
+                del self._pending[:flushed]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _apply(self, change, *args):
+        """Swap in a new snapshot in memory and queue the change for the file"""
+        with self._thread_lock:
+            current = self._current()
+            self._snapshot = _Snapshot(*change(current, *args), current.version + 1)
+            if self._file is not None:
+                self._ensure_worker()
+                self._pending.append((change, args))
+
+    def _validated(self, donor_ids, lats, lngs):
+        ids = [str(donor_id) for donor_id in donor_ids]
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        if not (len(ids) == len(lats) == len(lngs)):
+            raise ValueError('donor_ids, lats and lngs must have the same length')
+        if np.any(np.abs(lats) > 90) or np.any(np.abs(lngs) > 180) or not np.all(np.isfinite(lats + lngs)):
+            raise ValueError('Coordinates must be latitude -90..90 and longitude -180..180 degrees')
+        return ids, lats, lngs
+
+    def replace(self, donor_ids, lats, lngs):
+        """Replace every location with a full snapshot"""
+        ids, lats, lngs = self._validated(donor_ids, lats, lngs)
+        self._apply(_replaced, ids, lats, lngs)
+        return len(set(ids))
+
+    def upsert(self, donor_ids, lats, lngs):
+        """Add donors or move existing ones; returns the number of donors written"""
+        ids, lats, lngs = self._validated(donor_ids, lats, lngs)
+        if not ids:
+            return 0
+        self._apply(_upserted, ids, lats, lngs)
+        return len(ids)
+
+    def remove(self, donor_ids):
+        """Drop donors; returns how many were present"""
+        with self._thread_lock:
+            drop = {str(donor_id) for donor_id in donor_ids} & self._current().positions.keys()
+            if drop:
+                self._apply(_removed, drop)
+        return len(drop)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _current(self):
+        self._refresh()
+        return self._snapshot
+
+    def __len__(self):
+        return len(self._current().ids)
+
+    def _result(self, ids, positions, distances, limit=None):
+        order = np.argsort(distances, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+        return ids[positions[order]].tolist(), distances[order]
+
+    def radius(self, lat, lng, radius_km, limit=None):
+        """(donor ids, distances in km) within radius_km, nearest first"""
+        snapshot = self._current()
+        ids = snapshot.ids
+        if len(ids) == 0:
+            return [], np.array([])
+        if len(ids) <= self.brute_force_max:
+            distances = haversine_km(lat, lng, snapshot.lat, snapshot.lng)
+            positions = np.flatnonzero(distances <= radius_km)
+            return self._result(ids, positions, distances[positions], limit)
+        positions, distances = snapshot.ball_tree().query_radius(
+            np.radians([[lat, lng]]), r=radius_km / EARTH_RADIUS_KM, return_distance=True)
+        return self._result(ids, positions[0], distances[0] * EARTH_RADIUS_KM, limit)
+
+    def nearest(self, lat, lng, k, max_km=None):
+        """(donor ids, distances in km) of the k closest donors, optionally within max_km"""
+        snapshot = self._current()
+        ids = snapshot.ids
+        k = min(int(k), len(ids))
+        if k <= 0:
+            return [], np.array([])
+        if len(ids) <= self.brute_force_max:
+            distances = haversine_km(lat, lng, snapshot.lat, snapshot.lng)
+            positions = np.argpartition(distances, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+            distances = distances[positions]
+        else:
+            distances, positions = snapshot.ball_tree().query(np.radians([[lat, lng]]), k=k)
+            positions, distances = positions[0], distances[0] * EARTH_RADIUS_KM
+        if max_km is not None:
+            within = distances <= max_km
+            positions, distances = positions[within], distances[within]
+        return self._result(ids, positions, distances)
+
+    def distances(self, lat, lng, donor_ids):
+        """Distance (km) from a point to each listed donor; NaN where a donor is not indexed"""
+        snapshot = self._current()
+        positions = snapshot.positions
+        found = np.fromiter((positions.get(str(donor_id), -1) for donor_id in donor_ids),
+                            dtype=np.intp, count=len(donor_ids))
+        result = np.full(len(found), np.nan)
+        known = found >= 0
+        result[known] = haversine_km(lat, lng, snapshot.lat[found[known]], snapshot.lng[found[known]])
+        return result
+
+    def stats(self):
+        snapshot = self._current()
+        return {
+            'donors': len(snapshot.ids),
+            'version': snapshot.version,
+            'persistent': self.path is not None,
+            'pending_changes': len(self._pending)
+        }
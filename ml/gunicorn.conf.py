@@ -0,0 +1,59 @@
+"""
+LifeLink - gunicorn configuration for the ML Inference API
+
+    cd ml && gunicorn 'app:create_app()'
+
+preload_app makes the master import the app and load the model once,
+before forking. Workers then share the model's pages copy-on-write
+instead of each unpickling its own copy. gc.freeze() moves everything
+loaded so far out of the garbage collector's reach, so collections in the
+workers do not write to (and thereby un-share) those pages.
+
+Each worker logs its memory after start; compare the summed PSS against
+the machine to size WEB_CONCURRENCY.
+
+With RETRAIN_INTERVAL_SECONDS set, the master also starts the retraining
+scheduler (retrain.py --every) as a separate process, once, so training
+never runs inside a worker. It is stopped with the server.
+"""
+
+import gc
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# More than one thread switches to the gthread worker (useful with PREDICT_MICRO_BATCH)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = 120
+preload_app = True
+wsgi_app = 'app:create_app()'
+
+RETRAIN_INTERVAL_SECONDS = float(os.environ.get('RETRAIN_INTERVAL_SECONDS', 0))
+_retrainer = None
+
+
+def when_ready(server):
+    import process_stats
+
+    gc.freeze()
+    server.log.info('Master ready: startup %s, memory %s',
+                    process_stats.startup, process_stats.memory_usage())
+
+    global _retrainer
+    if RETRAIN_INTERVAL_SECONDS > 0 and _retrainer is None:
+        _retrainer = subprocess.Popen([sys.executable, 'retrain.py', '--every', str(RETRAIN_INTERVAL_SECONDS)],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)))
+        server.log.info('Retraining every %ss (pid %s)', RETRAIN_INTERVAL_SECONDS, _retrainer.pid)
+
+
+def on_exit(server):
+    if _retrainer is not None:
+        _retrainer.terminate()
+
+
+def post_worker_init(worker):
+    import process_stats
+
+    worker.log.info('Worker %s ready: memory %s', worker.pid, process_stats.memory_usage())
@@ -0,0 +1,418 @@
+"""
+LifeLink - Persistent learning store for the Agentic AI scorer
+Fixed-width, memory-mapped per-donor feedback shared by every worker
+
+Layout of the store file:
+    header   - magic, capacity, a generation counter (donors added or
+               evicted) and a version counter (any learned value changed)
+    records  - `capacity` fixed-width slots: donor id, average response
+               time, success rate, last feedback time, feedback count
+
+Every process maps the same file (MAP_SHARED), so feedback written by one
+gunicorn worker is visible to the others immediately and survives restarts.
+Each process keeps its own donor-id -> slot dict and rebuilds it only when
+the generation counter moves, i.e. when a donor was added or evicted.
+Value updates happen in place and need no rebuild.
+
+Writers serialize on an flock()ed lock file next to the store. Readers never
+lock. Donors with no feedback for `ttl_seconds` are evicted; when the store
+is full, the donor with the oldest feedback makes room for a new one.
+
+With path=None the same structure lives in anonymous memory, which is what
+AgentScorer uses when no store is configured.
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+MAGIC = b'LLSTORE1'
+DONOR_ID_BYTES = 32
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<u8'),
+    ('generation', '<u8'),
+    ('version', '<u8'),
+    ('reserved', '<u8', 4)
+])
+
+RECORD_DTYPE = np.dtype([
+    ('donor_id', f'S{DONOR_ID_BYTES}'),
+    ('avg_response_time', '<f8'),
+    ('success_rate', '<f8'),
+    ('last_feedback', '<f8'),
+    ('feedback_count', '<u4'),
+    ('used', '?'),
+    ('padding', 'V3')
+])
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_TTL_SECONDS = 90 * 24 * 3600
+
+# Expired donors are swept at most this often on the write path
+EVICTION_INTERVAL_SECONDS = 60
+
+
+def encode_donor_id(donor_id):
+    """
+    Fixed-width key for a donor id.
+
+    Mongo ObjectIds (24 hex chars) are stored as-is; anything longer than
+    DONOR_ID_BYTES is replaced by a stable hash so it still fits the slot.
+    """
+    key = str(donor_id).encode('utf-8')
+    if len(key) > DONOR_ID_BYTES:
+        key = b'#' + hashlib.blake2b(key, digest_size=(DONOR_ID_BYTES - 1) // 2).hexdigest().encode()
+    return key
+
+
+class LearningStore:
+    """Array-backed per-donor learning parameters (see module docstring)"""
+
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._thread_lock = threading.RLock()
+        self._lock_file = None
+        self._index = {}
+        self._index_generation = None
+        self._last_eviction = 0.0
+
+        if path is None:
+            self._header = np.zeros(1, dtype=HEADER_DTYPE)
+            self._header['magic'] = MAGIC
+            self._header['capacity'] = capacity
+            self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        else:
+            self._open(path, capacity)
+
+        self.capacity = int(self._header['capacity'][0])
+
+        # Read-only dict-style views used by the per-donor scoring path
+        self.avg_response_times = _ColumnView(self, 'avg_response_time')
+        self.success_rates = _ColumnView(self, 'success_rate')
+
+    def _open(self, path, capacity):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._open_lock_file()
+
+        with self._write_lock():
+            records_offset = HEADER_DTYPE.itemsize
+            if os.path.exists(path) and os.path.getsize(path) >= records_offset:
+                header = np.memmap(path, dtype=HEADER_DTYPE, mode='r', shape=(1,))
+                if header['magic'][0] != MAGIC:
+                    raise ValueError(f'{path} is not a LifeLink learning store')
+                capacity = int(header['capacity'][0])
+                del header
+            else:
+                header = np.memmap(path, dtype=HEADER_DTYPE, mode='w+', shape=(1,))
+                header['magic'] = MAGIC
+                header['capacity'] = capacity
+                header.flush()
+                del header
+
+            expected_size = records_offset + capacity * RECORD_DTYPE.itemsize
+            if os.path.getsize(path) < expected_size:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected_size)
+
+            self._header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r+',
+                                     offset=records_offset, shape=(capacity,))
+
+    # ------------------------------------------------------------------
+    # Locking and index maintenance
+    # ------------------------------------------------------------------
+
+    def _open_lock_file(self):
+        # flock() locks belong to the open file, which forked workers would
+        # share with the master, so every process opens its own
+        self._lock_file = open(self.path + '.lock', 'a+b')
+        self._lock_pid = os.getpid()
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """Exclusive across threads of this process and, for files, across processes"""
+        with self._thread_lock:
+            if self._lock_file is not None and self._lock_pid != os.getpid():
+                self._open_lock_file()
+            if self._lock_file is not None and fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if self._lock_file is not None and fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @property
+    def generation(self):
+        return int(self._header['generation'][0])
+
+    @property
+    def version(self):
+        """Changes whenever any donor's learned values change (shared by all processes)"""
+        return int(self._header['version'][0])
+
+    def _bump_version(self):
+        self._header['version'] += 1
+
+    def _bump_generation(self):
+        """Signal other processes to rebuild their index. Caller holds the write lock."""
+        current = self._index_generation == self.generation
+        self._header['generation'] += 1
+        if current:
+            # Our own index was already patched by the caller
+            self._index_generation = self.generation
+
+    def _slot_index(self):
+        """donor key -> slot, rebuilt when another process added or evicted donors"""
+        generation = self.generation
+        if generation != self._index_generation:
+            used = np.flatnonzero(self.records['used'])
+            keys = self.records['donor_id'][used].tolist()
+            self._index = dict(zip(keys, used.tolist()))
+            self._index_generation = generation
+        return self._index
+
+    def slot(self, donor_id):
+        """Slot holding a donor, or None"""
+        return self._slot_index().get(encode_donor_id(donor_id))
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self._slot_index())
+
+    def __contains__(self, donor_id):
+        return self.slot(donor_id) is not None
+
+    def lookup(self, donor_ids):
+        """
+        Learned parameters for many donors at once.
+
+        Returns:
+            (avg_response_time, success_rate) float arrays aligned with
+            donor_ids, NaN where a donor has no feedback yet
+        """
+        index = self._slot_index()
+        slots = np.fromiter((index.get(encode_donor_id(donor_id), -1) for donor_id in donor_ids),
+                            dtype=np.int64, count=len(donor_ids))
+        known = slots >= 0
+        avg_response_time = np.full(len(slots), np.nan)
+        success_rate = np.full(len(slots), np.nan)
+        avg_response_time[known] = self.records['avg_response_time'][slots[known]]
+        success_rate[known] = self.records['success_rate'][slots[known]]
+        return avg_response_time, success_rate
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def update(self, donor_id, response_time_minutes, success, timestamp=None):
+        """Apply one feedback event (same EMA rules as before the store existed)"""
+
+        timestamp = time.time() if timestamp is None else timestamp
+        key = encode_donor_id(donor_id)
+        new_value = 1.0 if success else 0.0
+
+        with self._write_lock():
+            slot = self._slot_index().get(key)
+            record = self.records
+            if slot is None:
+                slot = self._allocate(key, timestamp)
+                record['avg_response_time'][slot] = response_time_minutes
+                record['success_rate'][slot] = 1.0 if success else 0.5
+            else:
+                record['avg_response_time'][slot] = (
+                    record['avg_response_time'][slot] * 0.7 + response_time_minutes * 0.3)
+                record['success_rate'][slot] = record['success_rate'][slot] * 0.8 + new_value * 0.2
+            record['last_feedback'][slot] = max(record['last_feedback'][slot], timestamp)
+            record['feedback_count'][slot] += 1
+            self._bump_version()
+
+    def update_many(self, donor_ids, response_times, successes, timestamps=None):
+        """
+        Apply a batch of feedback events with array operations.
+
+        Events for the same donor are applied in timestamp order (input order
+        for equal timestamps), so the result matches calling update() once
+        per event in that order. A run of m EMA steps on one donor collapses
+        to prior * decay**m + sum(weight * value_j * decay**(m - 1 - j)).
+
+        Returns:
+            Number of distinct donors updated
+        """
+        n = len(donor_ids)
+        if n == 0:
+            return 0
+
+        response_times = np.asarray(response_times, dtype=float)
+        successes = np.asarray(successes, dtype=bool)
+        timestamps = np.full(n, time.time()) if timestamps is None else np.asarray(timestamps, dtype=float)
+
+        keys = np.array([encode_donor_id(donor_id) for donor_id in donor_ids], dtype=f'S{DONOR_ID_BYTES}')
+        unique_keys, key_codes = np.unique(keys, return_inverse=True)
+
+        # Group events by donor, oldest first within a donor
+        order = np.lexsort((timestamps, key_codes))
+        codes = key_codes[order]
+        response_times = response_times[order]
+        success_values = successes[order].astype(float)
+        timestamps = timestamps[order]
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        group_sizes = np.diff(np.r_[starts, n])
+        position = np.arange(n) - np.repeat(starts, group_sizes)
+        steps_after = np.repeat(group_sizes, group_sizes) - 1 - position
+
+        with self._write_lock():
+            # One TTL sweep up front, so donors allocated by this batch are
+            # never swept by a later allocation in the same batch
+            self._evict_expired(time.time())
+            index = self._slot_index()
+            newest = np.maximum.reduceat(timestamps, starts)
+            for code, key in enumerate(unique_keys.tolist()):
+                if key not in index:
+                    self._allocate(key, newest[code], sweep=False)
+            index = self._slot_index()
+            slots = np.array([index.get(key, -1) for key in unique_keys.tolist()], dtype=np.int64)
+
+            records = self.records
+            has_prior = records['feedback_count'][np.maximum(slots, 0)] > 0
+            has_prior &= slots >= 0
+
+            # A donor's very first event initializes instead of averaging
+            initializer = np.zeros(n, dtype=bool)
+            initializer[starts[~has_prior]] = True
+            ema_steps = group_sizes - (~has_prior)
+
+            prior_rt = np.where(has_prior, records['avg_response_time'][np.maximum(slots, 0)],
+                                response_times[starts])
+            prior_sr = np.where(has_prior, records['success_rate'][np.maximum(slots, 0)],
+                                np.where(success_values[starts] > 0, 1.0, 0.5))
+
+            rt_terms = np.where(initializer, 0.0, response_times * 0.3 * 0.7 ** steps_after)
+            sr_terms = np.where(initializer, 0.0, success_values * 0.2 * 0.8 ** steps_after)
+
+            new_rt = prior_rt * 0.7 ** ema_steps + np.add.reduceat(rt_terms, starts)
+            new_sr = prior_sr * 0.8 ** ema_steps + np.add.reduceat(sr_terms, starts)
+
+            # Donors squeezed out by capacity eviction within this batch are dropped
+            kept = slots >= 0
+            target = slots[kept]
+            records['avg_response_time'][target] = new_rt[kept]
+            records['success_rate'][target] = new_sr[kept]
+            records['last_feedback'][target] = np.maximum(records['last_feedback'][target], newest[kept])
+            records['feedback_count'][target] += group_sizes[kept].astype(np.uint32)
+            self._bump_version()
+
+        return int(kept.sum())
+
+    def _allocate(self, key, now, sweep=True):
+        """
+        Claim a slot for a new donor. Caller holds the write lock.
+
+        `now` is the donor's feedback time; the TTL sweep always uses the
+        wall clock so back-dated events cannot evict live donors.
+        """
+
+        wall_clock = time.time()
+        if sweep and wall_clock - self._last_eviction >= EVICTION_INTERVAL_SECONDS:
+            self._evict_expired(wall_clock)
+
+        free = np.flatnonzero(~self.records['used'])
+        if len(free) == 0 and sweep:
+            self._evict_expired(wall_clock)
+            free = np.flatnonzero(~self.records['used'])
+        if len(free) == 0:
+            # Full of live donors: drop the one with the oldest feedback
+            oldest = int(np.argmin(self.records['last_feedback']))
+            self._clear(np.array([oldest]))
+            free = np.array([oldest])
+
+        slot = int(free[0])
+        self.records[slot] = np.zeros((), dtype=RECORD_DTYPE)
+        self.records['donor_id'][slot] = key
+        # Counts as recent so a batch allocating several donors cannot evict it
+        self.records['last_feedback'][slot] = now
+        self.records['used'][slot] = True
+        self._index[key] = slot
+        self._bump_generation()
+        return slot
+
+    def _clear(self, slots):
+        for key in self.records['donor_id'][slots].tolist():
+            self._index.pop(key, None)
+        self.records['used'][slots] = False
+        self.records['donor_id'][slots] = b''
+        self._bump_generation()
+        self._bump_version()
+
+    def _evict_expired(self, now):
+        self._slot_index()
+        self._last_eviction = now
+        if self.ttl_seconds is None:
+            return 0
+        expired = np.flatnonzero(self.records['used'] &
+                                 (self.records['last_feedback'] < now - self.ttl_seconds))
+        if len(expired):
+            self._clear(expired)
+        return len(expired)
+
+    def evict_expired(self, now=None):
+        """Drop donors with no feedback within ttl_seconds; returns how many"""
+        with self._write_lock():
+            return self._evict_expired(time.time() if now is None else now)
+
+    def flush(self):
+        """Force dirty pages of a file-backed store to disk"""
+        if isinstance(self.records, np.memmap):
+            self._header.flush()
+            self.records.flush()
+
+    def stats(self):
+        return {
+            'donors': len(self),
+            'capacity': self.capacity,
+            'generation': self.generation,
+            'version': self.version,
+            'persistent': self.path is not None,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+
+class _ColumnView(Mapping):
+    """Read-only donor_id -> value mapping over one column of the store"""
+
+    def __init__(self, store, field):
+        self._store = store
+        self._field = field
+
+    def __getitem__(self, donor_id):
+        slot = self._store.slot(donor_id)
+        if slot is None:
+            raise KeyError(donor_id)
+        return float(self._store.records[self._field][slot])
+
+    def __contains__(self, donor_id):
+        return self._store.slot(donor_id) is not None
+
+    def __iter__(self):
+        return (key.decode('utf-8') for key in self._store._slot_index())
+
+    def __len__(self):
+        return len(self._store)
@@ -0,0 +1,406 @@
+"""
+LifeLink - Traffic-replay load harness for the ML Inference API
+Open-loop load at a target request rate, with latency histograms
+
+Traffic is either synthetic or replayed from a JSONL file of
+{"path": "/predict", "body": {...}} records (--save-traffic writes the
+synthetic mix in that format). Synthetic payloads have the shapes the
+Node backend sends:
+    /predict              ml.service.js         4 feature counters
+    /score-donors         agent.controller.js   observer donor dicts + request_context
+    /recommend-strategy   agent.controller.js   scored donors from /score-donors
+    /update-learning      learning.service.js   one feedback event
+
+Requests are sent on a fixed schedule (open loop), and latency is
+measured from each request's scheduled time. When the service falls
+behind, its queueing delay is included instead of hidden, the way the
+backend experiences it. Each route uses the backend's client timeout
+(5 s for /predict and /recommend-strategy, 10 s for /score-donors), and
+the report counts errors, timeouts and responses slower than 5 s and 10 s.
+
+Saturation mode starts gunicorn once per worker configuration
+(WEB_CONCURRENCY x GUNICORN_THREADS) and steps the request rate up until
+the service stops keeping up. The highest rate that still met the
+targets is that configuration's saturation throughput.
+
+Usage:
+    python load_test.py --url http://localhost:5001 --rps 50 --duration 30
+    python load_test.py --mix predict=8,score-donors=1,recommend-strategy=1 --donors 20-500
+    python load_test.py --replay traffic.jsonl --rps 100
+    python load_test.py --saturate --configs 1x1,2x1,2x4 --ramp 25,50,100,200,400
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Client timeouts the backend uses for each route (seconds)
+ROUTE_TIMEOUTS = {
+    '/predict': 5.0,
+    '/score-donors': 10.0,
+    '/recommend-strategy': 5.0,
+    '/update-learning': 10.0  # No explicit timeout in the backend; capped here
+}
+DEFAULT_MIX = {'predict': 6, 'score-donors': 2, 'recommend-strategy': 1, 'update-learning': 1}
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+CITIES = [('Bengaluru', 'Karnataka'), ('Chennai', 'Tamil Nadu'), ('Hyderabad', 'Telangana'),
+          ('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra')]
+
+
+class TrafficGenerator:
+    """Synthetic request bodies in the backend's shapes"""
+
+    def __init__(self, mix=None, donors=(20, 200), seed=0):
+        self.rng = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.donors = donors
+        self._scored = []
+
+    def _donor(self):
+        rng = self.rng
+        city, state = rng.choice(CITIES)
+        return {
+            'donor_id': f'{rng.getrandbits(96):024x}',  # Mongo ObjectId shaped
+            'blood_group': rng.choice(BLOOD_GROUPS),
+            'distance': round(rng.uniform(0, 50), 2),
+            'reliability_score': rng.choice([50, rng.randint(0, 100)]),
+            'can_donate': rng.random() < 0.6,
+            'days_since_last_donation': rng.choice([999, rng.randint(0, 400)]),
+            'is_available': rng.random() < 0.7,
+            'last_active_hours': min(rng.randint(0, 2000), 72),
+            'total_donations': rng.randint(0, 20),
+            'city': city,
+            'state': state
+        }
+
+    def _request_context(self, full=True):
+        rng = self.rng
+        context = {
+            'blood_group': rng.choice(BLOOD_GROUPS),
+            'urgency': rng.choice(['critical', 'urgent', 'normal']),
+            'units_required': rng.randint(1, 4)
+        }
+        if full:
+            context['location'] = {'type': 'Point',
+                                   'coordinates': [round(rng.uniform(72, 88), 5), round(rng.uniform(8, 28), 5)]}
+        return context
+
+    def _pool(self):
+        return [self._donor() for _ in range(self.rng.randint(*self.donors))]
+
+    def _scored_donors(self):
+        # Scored donors the way /score-donors returns them, for /recommend-strategy
+        if not self._scored:
+            from agent_scorer import AgentScorer
+            scorer = AgentScorer()
+            self._scored = [scorer.score_donors(self._pool(), self._request_context()) for _ in range(20)]
+        return self.rng.choice(self._scored)
+
+    def make(self, route):
+        rng = self.rng
+        if route == 'predict':
+            body = {'features': [rng.choice([0, 0, 1, rng.randint(0, 10)]), rng.randint(0, 365),
+                                 rng.randint(0, 8760), rng.choice([0, 0, 1, rng.randint(0, 10)])]}
+        elif route == 'score-donors':
+            body = {'donors': self._pool(), 'request_context': self._request_context()}
+        elif route == 'recommend-strategy':
+            body = {'scored_donors': self._scored_donors(), 'request_context': self._request_context(False)}
+        elif route == 'update-learning':
+            body = {'donor_id': f'{rng.getrandbits(96):024x}',
+                    'response_time_minutes': rng.randint(1, 120), 'success': rng.random() < 0.6}
+        else:
+            raise ValueError(f'Unknown route: {route}')
+        return {'path': '/' + route, 'body': body}
+
+    def records(self, n):
+        routes = list(self.mix)
+        weights = [self.mix[r] for r in routes]
+        return [self.make(route) for route in self.rng.choices(routes, weights=weights, k=n)]
+
+
+def load_replay(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram plus the raw samples for percentiles"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples = []
+
+    def observe(self, ms):
+        self.counts[int(np.searchsorted(LATENCY_BUCKETS_MS, ms))] += 1
+        self.samples.append(ms)
+
+    def summary(self):
+        samples = np.asarray(self.samples) if self.samples else np.zeros(1)
+        labels = [f'<={b}' for b in LATENCY_BUCKETS_MS] + ['+Inf']
+        return {
+            'buckets_ms': dict(zip(labels, self.counts)),
+            'p50_ms': round(float(np.percentile(samples, 50)), 2),
+            'p95_ms': round(float(np.percentile(samples, 95)), 2),
+            'p99_ms': round(float(np.percentile(samples, 99)), 2),
+            'max_ms': round(float(samples.max()), 2)
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.histogram = Histogram()
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.over_5s = 0
+        self.over_10s = 0
+
+    def record(self, ms, ok, timed_out):
+        self.requests += 1
+        self.histogram.observe(ms)
+        self.errors += 0 if ok or timed_out else 1
+        self.timeouts += 1 if timed_out else 0
+        self.over_5s += 1 if ms > 5000 else 0
+        self.over_10s += 1 if ms > 10000 else 0
+
+    def summary(self):
+        n = max(self.requests, 1)
+        return dict(self.histogram.summary(), requests=self.requests, errors=self.errors,
+                    timeouts=self.timeouts, error_rate=round(self.errors / n, 4),
+                    timeout_rate=round(self.timeouts / n, 4),
+                    over_5s_rate=round(self.over_5s / n, 4), over_10s_rate=round(self.over_10s / n, 4))
+
+
+class LoadRunner:
+    """Send records at a fixed rate from a thread pool, one keep-alive connection per thread"""
+
+    def __init__(self, url, max_in_flight=256):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.max_in_flight = max_in_flight
+        self._local = threading.local()
+
+    def _connection(self, timeout):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+            self._local.connection = connection
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _send(self, path, payload, scheduled):
+        timeout = ROUTE_TIMEOUTS.get(path, 10.0)
+        remaining = max(timeout - (time.perf_counter() - scheduled), 0.001)
+        ok = timed_out = False
+        for attempt in range(2):
+            connection = self._connection(remaining)
+            try:
+                connection.request('POST', path, body=payload, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                break
+            except (socket.timeout, TimeoutError):
+                connection.close()
+                timed_out = True
+                break
+            except (ConnectionError, http.client.HTTPException, OSError):
+                # Stale keep-alive connection; retry once on a fresh one
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    break
+        return (time.perf_counter() - scheduled) * 1000.0, ok, timed_out
+
+    def run(self, records, rps, duration):
+        """Replay records (cycled) at rps for duration seconds; returns the report"""
+        payloads = [(r['path'], json.dumps(r['body']).encode()) for r in records]
+        n_requests = max(int(rps * duration), 1)
+        stats = {}
+        lock = threading.Lock()
+
+        def task(path, payload, scheduled):
+            ms, ok, timed_out = self._send(path, payload, scheduled)
+            with lock:
+                stats.setdefault(path, RouteStats()).record(ms, ok, timed_out)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for i in range(n_requests):
+                scheduled = started + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                path, payload = payloads[i % len(payloads)]
+                pool.submit(task, path, payload, scheduled)
+        elapsed = time.perf_counter() - started
+
+        overall = RouteStats()
+        for route_stats in stats.values():
+            for ms in route_stats.histogram.samples:
+                overall.histogram.observe(ms)
+            for field in ('requests', 'errors', 'timeouts', 'over_5s', 'over_10s'):
+                setattr(overall, field, getattr(overall, field) + getattr(route_stats, field))
+
+        return {
+            'target_rps': rps,
+            'achieved_rps': round(overall.requests / elapsed, 2),
+            'duration_s': round(elapsed, 2),
+            'overall': overall.summary(),
+            'routes': {path: s.summary() for path, s in sorted(stats.items())}
+        }
+
+
+def meets_targets(report, max_error_rate=0.01, max_p99_ms=5000, min_throughput=0.9):
+    overall = report['overall']
+    return (overall['error_rate'] + overall['timeout_rate'] <= max_error_rate
+            and overall['p99_ms'] <= max_p99_ms
+            and report['achieved_rps'] >= min_throughput * report['target_rps'])
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, threads, port):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads))
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=ML_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f'gunicorn ({workers}x{threads}) did not become healthy on port {port}')
+
+
+def saturate(records, configs, ramp, duration, **targets):
+    """Saturation throughput for each WORKERSxTHREADS configuration"""
+    results = []
+    for config in configs:
+        workers, threads = (int(v) for v in config.split('x'))
+        port = _free_port()
+        process = start_gunicorn(workers, threads, port)
+        try:
+            runner = LoadRunner(f'http://127.0.0.1:{port}')
+            steps = []
+            for rps in ramp:
+                report = runner.run(records, rps, duration)
+                report['meets_targets'] = meets_targets(report, **targets)
+                steps.append(report)
+                _print_step(config, report)
+                if not report['meets_targets']:
+                    break
+            passing = [s['achieved_rps'] for s in steps if s['meets_targets']]
+            results.append({'config': config, 'workers': workers, 'threads': threads,
+                            'saturation_rps': max(passing) if passing else 0.0, 'steps': steps})
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return results
+
+
+def _print_step(label, report):
+    overall = report['overall']
+    status = '✅' if report.get('meets_targets', True) else '❌'
+    print(f"   {status} {label:<6} target {report['target_rps']:>7.1f} rps | achieved {report['achieved_rps']:>7.1f} | "
+          f"p50 {overall['p50_ms']:>8.1f} p95 {overall['p95_ms']:>8.1f} p99 {overall['p99_ms']:>8.1f} ms | "
+          f"errors {overall['error_rate']:.2%} timeouts {overall['timeout_rate']:.2%}")
+
+
+def print_report(report):
+    _print_step('all', report)
+    for path, route in report['routes'].items():
+        print(f"\n   {path}  ({route['requests']} requests, p50 {route['p50_ms']} / p95 {route['p95_ms']} / "
+              f"p99 {route['p99_ms']} ms, >5s {route['over_5s_rate']:.2%}, >10s {route['over_10s_rate']:.2%}, "
+              f"errors {route['error_rate']:.2%}, timeouts {route['timeout_rate']:.2%})")
+        peak = max(route['buckets_ms'].values()) or 1
+        for bucket, count in route['buckets_ms'].items():
+            if count:
+                print(f"      {bucket:>8} ms | {'█' * max(1, round(40 * count / peak)):<40} {count}")
+
+
+def _parse_mix(value):
+    return {name: float(weight) for name, weight in (part.split('=') for part in value.split(','))}
+
+
+def _parse_range(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ML Inference API')
+    parser.add_argument('--url', default='http://localhost:5001')
+    parser.add_argument('--rps', type=float, default=20.0, help='Target request rate')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per run (or per ramp step)')
+    parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX, help='route=weight,...')
+    parser.add_argument('--donors', type=_parse_range, default=(20, 200), help='Donor pool size or range, e.g. 20-200')
+    parser.add_argument('--replay', help='JSONL file of {"path", "body"} records to replay')
+    parser.add_argument('--save-traffic', help='Write the synthetic records to this JSONL file')
+    parser.add_argument('--records', type=int, default=2000, help='Distinct synthetic records to cycle through')
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--saturate', action='store_true', help='Find saturation throughput per worker config')
+    parser.add_argument('--configs', default='1x1,2x1,2x4', help='WORKERSxTHREADS,... for --saturate')
+    parser.add_argument('--ramp', default='10,25,50,100,200,400,800', help='Request rates for --saturate')
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args()
+
+    if args.replay:
+        records = load_replay(args.replay)
+    else:
+        sys.path.insert(0, ML_DIR)
+        records = TrafficGenerator(args.mix, args.donors).records(args.records)
+        if args.save_traffic:
+            with open(args.save_traffic, 'w') as f:
+                f.writelines(json.dumps(r) + '\n' for r in records)
+
+    print("=" * 100)
+    print(f"🚦 LifeLink - ML API load test ({len(records)} records)")
+    print("=" * 100)
+
+    if args.saturate:
+        report = saturate(records, args.configs.split(','), [float(r) for r in args.ramp.split(',')],
+                          args.duration)
+        print("\n📈 Saturation throughput:")
+        for result in report:
+            print(f"   {result['config']:<6} {result['saturation_rps']:>8.1f} rps")
+    else:
+        report = LoadRunner(args.url, args.max_in_flight).run(records, args.rps, args.duration)
+        print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
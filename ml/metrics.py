@@ -0,0 +1,254 @@
+"""
+LifeLink - Prometheus metrics for the ML Inference API
+Multi-process counters and histograms in memory-mapped files
+
+Every process (each gunicorn worker) writes its own pair of files in the
+metrics directory:
+    metrics-<pid>.json   - series layout: name, labels, kind, slot offset
+    metrics-<pid>.bin    - float64 slots, memory-mapped
+
+Recording is a dict lookup, a bisect and a few in-place additions on the
+process's own mapping, under a lock that only that process's threads
+share, so it is cheap enough to leave on. A scrape of /metrics reads every
+file in the directory and sums series with the same name and labels. So
+whichever worker answers, it reports the whole service, including workers
+that have since exited (files of dead processes are only removed by
+remove_dead_files() at startup).
+
+The layout is fixed the first time a process records something. Label
+values are declared up front (a callable is resolved at that point, e.g.
+the app's routes), and anything undeclared is counted under 'other'.
+Gauges are callbacks evaluated by the scraping process.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+OTHER = 'other'
+
+
+class _Metric:
+    def __init__(self, registry, name, help_text, kind, labels, buckets=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_spec = labels or {}
+        self.labelnames = tuple(self.label_spec)
+        self.buckets = tuple(buckets) if buckets else None
+        self.width = len(self.buckets) + 3 if buckets else 1  # buckets + +Inf, sum, count
+        self._offsets = {}
+        self._known = ()
+
+    def _label_values(self):
+        values = []
+        for name in self.labelnames:
+            spec = self.label_spec[name]
+            spec = spec() if callable(spec) else spec
+            values.append([str(v) for v in spec] + [OTHER])
+        return values
+
+    def _series(self, offset):
+        """Assign slots for every label combination; returns the layout entries"""
+        self._offsets = {}
+        entries = []
+        combinations = [()]
+        for values in self._label_values():
+            combinations = [c + (v,) for c in combinations for v in values]
+        self._known = tuple(set(c[i] for c in combinations) for i in range(len(self.labelnames)))
+        for combination in combinations:
+            self._offsets[combination] = offset
+            entries.append([self.name, dict(zip(self.labelnames, combination)), self.kind, offset,
+                            list(self.buckets) if self.buckets else None])
+            offset += self.width
+        return entries, offset
+
+    def _offset(self, label_values):
+        offset = self._offsets.get(label_values)
+        if offset is None:
+            label_values = tuple(v if v in known else OTHER for v, known in zip(label_values, self._known))
+            offset = self._offsets[label_values]
+        return offset
+
+
+class Counter(_Metric):
+    def inc(self, amount=1.0, *label_values):
+        values = self.registry._values()
+        offset = self._offset(tuple(str(v) for v in label_values))
+        with self.registry._lock:
+            values[offset] += amount
+
+
+class Histogram(_Metric):
+    def observe(self, value, *label_values):
+        values = self.registry._values()
+        offset = self._offset(tuple(str(v) for v in label_values))
+        position = bisect.bisect_left(self.buckets, value)
+        with self.registry._lock:
+            values[offset + position] += 1
+            values[offset + len(self.buckets) + 1] += value
+            values[offset + len(self.buckets) + 2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+
+class MetricsRegistry:
+    """Metric definitions plus this process's memory-mapped values"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.metrics = []
+        self.gauges = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._array = None
+        os.makedirs(directory, exist_ok=True)
+
+    def counter(self, name, help_text, labels=None):
+        metric = Counter(self, name, help_text, 'counter', labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets, labels=None):
+        metric = Histogram(self, name, help_text, 'histogram', labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, collect):
+        """collect() returns a number, or a {labels dict as tuple of pairs: value} mapping"""
+        self.gauges.append((name, help_text, collect))
+
+    def remove_dead_files(self):
+        """
+        Drop files of processes that are gone (call once at startup).
+
+        With gunicorn's preload_app this runs once in the master, so files of
+        workers that exit later keep counting until the next restart.
+        """
+        for filename in os.listdir(self.directory):
+            if not filename.startswith('metrics-'):
+                continue
+            pid = filename[len('metrics-'):].split('.')[0]
+            if pid.isdigit() and not _alive(int(pid)):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+
+    def _values(self):
+        if self._pid == os.getpid():
+            return self._array
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open_process_file()
+        return self._array
+
+    def _open_process_file(self):
+        # A fork inherits the parent's mapping; every process gets its own file
+        pid = os.getpid()
+        entries, size = [], 0
+        for metric in self.metrics:
+            series, size = metric._series(size)
+            entries.extend(series)
+
+        base = os.path.join(self.directory, f'metrics-{pid}')
+        with open(base + '.bin', 'wb') as f:
+            f.truncate(max(size, 1) * 8)
+        with open(base + '.bin', 'r+b') as f:
+            buffer = mmap.mmap(f.fileno(), max(size, 1) * 8)
+        tmp = base + '.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'size': size, 'series': entries}, f)
+        os.replace(tmp, base + '.json')
+
+        self._array = np.frombuffer(buffer, dtype=np.float64)
+        self._pid = pid
+
+    def collect(self):
+        """Sum every process's values: {(name, labels tuple): (kind, buckets, values)}"""
+        totals = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            base = os.path.join(self.directory, filename[:-len('.json')])
+            try:
+                with open(base + '.json') as f:
+                    layout = json.load(f)
+                values = np.fromfile(base + '.bin', dtype=np.float64)
+            except (FileNotFoundError, ValueError):
+                continue
+            for name, labels, kind, offset, buckets in layout['series']:
+                width = len(buckets) + 3 if buckets else 1
+                chunk = values[offset:offset + width]
+                if len(chunk) != width:
+                    continue
+                key = (name, tuple(sorted(labels.items())))
+                if key in totals:
+                    totals[key][2] += chunk
+                else:
+                    totals[key] = [kind, buckets, chunk.copy()]
+        return totals
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            series = sorted((labels, entry) for (name, labels), entry in totals.items()
+                            if name == metric.name and entry[2][-1] > 0)
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for labels, (kind, buckets, values) in series:
+                if kind == 'counter':
+                    lines.append(f'{metric.name}{_labels(labels)} {_number(values[0])}')
+                    continue
+                cumulative = np.cumsum(values[:len(buckets) + 1])
+                for bound, count in zip(list(buckets) + ['+Inf'], cumulative):
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{metric.name}_bucket{_labels(labels + (("le", le),))} {_number(count)}')
+                lines.append(f'{metric.name}_sum{_labels(labels)} {_number(values[-2])}')
+                lines.append(f'{metric.name}_count{_labels(labels)} {_number(values[-1])}')
+
+        for name, help_text, collect in self.gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            value = collect()
+            for labels, v in (value.items() if isinstance(value, dict) else [((), value)]):
+                lines.append(f'{name}{_labels(labels)} {_number(v)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (k + '="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
@@ -0,0 +1,135 @@
+"""
+LifeLink - Micro-batching for single-row model calls
+Coalesces concurrent /predict requests into one matrix evaluation
+
+Each request thread submits its feature row, with the model it was
+validated against, and blocks on a future. A single background thread
+takes the first waiting row, keeps collecting until `window_ms` has passed
+or `max_batch` rows are queued, scores the stacked rows of each model with
+one call and hands every caller its own result. A row is always scored by
+the model it was submitted with, even if the serving model is swapped
+while it waits.
+
+Only useful when requests are served concurrently (threaded dev server or
+gunicorn's gthread worker); with one request at a time every batch is a
+single row and the only cost is the wait for the window.
+
+Batch sizes and queue waits are recorded as histograms in the app's
+MetricsRegistry (see metrics.py), so they appear on /metrics summed over
+all workers.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Histogram bucket upper bounds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05)
+
+
+class MicroBatcher:
+    """
+    Batch concurrent single-row calls to `score_batch`
+
+    Args:
+        score_batch: Callable taking a model and an (n, d) float array and returning n scores
+        window_ms: Longest time the first row of a batch waits for company
+        max_batch: Flush as soon as this many rows are waiting
+        metrics: Optional MetricsRegistry for the batch size and queue wait histograms
+    """
+
+    def __init__(self, score_batch, window_ms=2.0, max_batch=64, metrics=None):
+        self.score_batch = score_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.metrics = metrics
+        self.batch_sizes = self.queue_delays = None
+        if metrics is not None:
+            self.batch_sizes = metrics.histogram(
+                'lifelink_micro_batch_size', 'Rows per micro-batched model call', BATCH_SIZE_BUCKETS)
+            self.queue_delays = metrics.histogram(
+                'lifelink_micro_batch_queue_seconds', 'Time a row waited for its micro-batch', QUEUE_DELAY_BUCKETS)
+
+    def submit(self, row, model=None):
+        """Queue one feature row for `model`; returns a Future resolving to its score"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=float), model, time.perf_counter(), future))
+        return future
+
+    def score(self, row, model=None, timeout=5.0):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(row, model).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a gunicorn worker forked from a
+        # preloaded master starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='predict-micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            # One call per model, in order of first arrival
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(id(item[1]), []).append(item)
+            for items in by_model.values():
+                self._score(items, started)
+
+    def _score(self, items, started):
+        if self.metrics is not None:
+            self.batch_sizes.observe(len(items))
+            for _, _, submitted, _ in items:
+                self.queue_delays.observe(started - submitted)
+        futures = [future for _, _, _, future in items]
+        try:
+            scores = self.score_batch(items[0][1], np.vstack([row for row, _, _, _ in items]))
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for future, score in zip(futures, scores.tolist()):
+                future.set_result(score)
+
+    def stats(self):
+        """Settings plus count, sum and mean of both histograms, over all workers"""
+        stats = {'window_ms': self.window * 1000.0, 'max_batch': self.max_batch}
+        if self.metrics is None:
+            return stats
+        totals = self.metrics.collect()
+        for key, histogram in (('batch_size', self.batch_sizes), ('queue_delay_seconds', self.queue_delays)):
+            entry = totals.get((histogram.name, ()))
+            total, count = (float(entry[2][-2]), int(entry[2][-1])) if entry is not None else (0.0, 0)
+            stats[key] = {'count': count, 'sum': round(total, 6), 'mean': round(total / count, 6) if count else 0}
+        return stats
@@ -0,0 +1,332 @@
+"""
+LifeLink - Versioned model registry for the fake request detector
+Immutable model versions plus ACTIVE / SHADOW pointers
+
+Layout:
+    models/registry/
+        v0001/model.pkl, scaler.pkl, metadata.json
+        v0002/...
+        ACTIVE       - name of the version /predict serves
+        SHADOW       - optional candidate scored off the request path
+
+A version directory is written under a temporary name and renamed into
+place, and pointers are replaced with os.replace(), so readers never see
+a half-written version. Serving processes watch the pointer files
+(RegistryWatcher) and swap in a freshly loaded ModelBundle. The swap is a
+single reference assignment, so requests never wait on a lock.
+
+Usage:
+    python model_registry.py list
+    python model_registry.py publish <model.pkl> <scaler.pkl> <feature,names> [--activate]
+    python model_registry.py activate <version>
+    python model_registry.py shadow <version|none>
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from flat_forest import FlatForest
+
+REGISTRY_PATH = 'models/registry'
+
+# A child of the app's 'lifelink' logger (see request_log.py)
+log = logging.getLogger('lifelink.model_registry')
+
+BASE_FEATURES = ['requests_per_day', 'account_age_days', 'time_gap_hours', 'location_changes']
+ENHANCED_FEATURES = BASE_FEATURES + ['unusual_hour_requests', 'device_changes',
+                                     'ip_changes', 'weekend_requests']
+
+
+def save_model_files(model, scaler, model_path, scaler_path):
+    """
+    Write a model + scaler pair to fixed paths, replacing any existing files
+
+    Both are written to temporary files first and then os.replace()d into
+    place, so a process loading the paths never reads a partly written file.
+    """
+    directory = os.path.dirname(model_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    staged = []
+    try:
+        for obj, path in ((model, model_path), (scaler, scaler_path)):
+            fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '-', dir=os.path.dirname(path) or '.')
+            os.close(fd)
+            staged.append(tmp)
+            joblib.dump(obj, tmp)
+        for tmp, path in zip(staged, (model_path, scaler_path)):
+            os.replace(tmp, path)
+    finally:
+        for tmp in staged:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def files_digest(*paths):
+    """Short hash of the files' contents"""
+    digest = hashlib.blake2b(digest_size=6)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """A loaded model + scaler pair with its metadata"""
+
+    def __init__(self, version, model, scaler, metadata=None, flat=True, calibration_key=None):
+        self.version = version
+        # Names this model's score distribution (see score_sketch.py). Registry
+        # versions are immutable; files loaded by path add a hash of their content.
+        self.calibration_key = calibration_key or version
+        self.model = model
+        self.scaler = scaler
+        self.metadata = metadata or {}
+        self.feature_names = list(self.metadata.get('features') or BASE_FEATURES[:model.n_features_in_])
+        self.n_features = len(self.feature_names)
+        self.flat = FlatForest.from_sklearn(model, scaler) if flat else None
+        self.serial = 0  # Set by the server on activation; part of result cache keys
+
+    @classmethod
+    def from_files(cls, version, model_path, scaler_path, features, flat=True):
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+        # Retraining rewrites the same paths; the hash keeps the old model's scores apart
+        return cls(version, model, scaler, {'version': version, 'features': features}, flat=flat,
+                   calibration_key=f'{version}@{files_digest(model_path, scaler_path)}')
+
+    def decision_function(self, X, timer=None):
+        """
+        Decision scores for raw feature rows.
+
+        timer, if given, is called with the seconds spent scaling and the
+        seconds spent in the forest.
+        """
+        started = time.perf_counter()
+        if self.flat is not None:
+            X_scaled = self.flat.transform(X)
+            scaled = time.perf_counter()
+            scores = self.flat.score_transformed(X_scaled) - self.flat.offset
+        else:
+            X_scaled = self.scaler.transform(X)
+            scaled = time.perf_counter()
+            scores = self.model.decision_function(X_scaled)
+        if timer is not None:
+            timer(scaled - started, time.perf_counter() - scaled)
+        return scores
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'features': self.feature_names,
+            'created_at': self.metadata.get('created_at'),
+            'calibration_key': self.calibration_key,
+            'evaluator': 'flat' if self.flat is not None else 'sklearn'
+        }
+
+
+class ModelRegistry:
+    """Directory of immutable model versions"""
+
+    def __init__(self, root=REGISTRY_PATH):
+        self.root = root
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def versions(self):
+        """Metadata of every published version, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return [self.metadata(name) for name in sorted(os.listdir(self.root))
+                if os.path.isfile(self._path(name, 'metadata.json'))]
+
+    def metadata(self, version):
+        with open(self._path(version, 'metadata.json')) as f:
+            return json.load(f)
+
+    def exists(self, version):
+        return bool(version) and os.path.isfile(self._path(version, 'metadata.json'))
+
+    def _next_version(self):
+        numbers = [int(name[1:]) for name in os.listdir(self.root)
+                   if name.startswith('v') and name[1:].isdigit()]
+        return f"v{max(numbers, default=0) + 1:04d}"
+
+    def publish(self, model, scaler, features, training_stats=None, version=None):
+        """
+        Store a trained model + scaler as a new immutable version.
+
+        Returns the version name. Publishing does not activate it.
+        """
+        if len(features) != model.n_features_in_:
+            raise ValueError(f'{len(features)} feature names for a model with {model.n_features_in_} features')
+
+        os.makedirs(self.root, exist_ok=True)
+        version = version or self._next_version()
+        if os.path.exists(self._path(version)):
+            raise ValueError(f'Version {version} already exists')
+
+        metadata = {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'features': list(features),
+            'model': {
+                'type': type(model).__name__,
+                'n_estimators': len(model.estimators_),
+                'max_samples': int(model.max_samples_),
+                'contamination': model.contamination,
+                'offset': float(model.offset_)
+            },
+            'scaler': {
+                'mean': np.asarray(scaler.mean_).tolist(),
+                'scale': np.asarray(scaler.scale_).tolist()
+            },
+            'training': training_stats or {}
+        }
+
+        staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=self.root)
+        try:
+            joblib.dump(model, os.path.join(staging, 'model.pkl'))
+            joblib.dump(scaler, os.path.join(staging, 'scaler.pkl'))
+            with open(os.path.join(staging, 'metadata.json'), 'w') as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(staging, self._path(version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return version
+
+    def load(self, version, flat=True):
+        if not self.exists(version):
+            raise KeyError(f'Unknown model version: {version}')
+        metadata = self.metadata(version)
+        model = joblib.load(self._path(version, 'model.pkl'))
+        scaler = joblib.load(self._path(version, 'scaler.pkl'))
+        return ModelBundle(version, model, scaler, metadata, flat=flat)
+
+    def _read_pointer(self, name):
+        try:
+            with open(self._path(name)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_pointer(self, name, version):
+        if version is not None and not self.exists(version):
+            raise KeyError(f'Unknown model version: {version}')
+        os.makedirs(self.root, exist_ok=True)
+        if version is None:
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+            return
+        fd, tmp = tempfile.mkstemp(prefix=f'.{name}-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp, self._path(name))
+
+    def active_version(self):
+        return self._read_pointer('ACTIVE')
+
+    def shadow_version(self):
+        return self._read_pointer('SHADOW')
+
+    def set_active(self, version):
+        self._write_pointer('ACTIVE', version)
+
+    def set_shadow(self, version):
+        """Point SHADOW at a version, or clear it with None"""
+        self._write_pointer('SHADOW', version)
+
+    def pointers(self):
+        return self.active_version(), self.shadow_version()
+
+
+class RegistryWatcher:
+    """
+    Poll the registry pointers and call on_change(active, shadow) when they move
+
+    The callback runs on the watcher thread, so loading a new version never
+    happens on a request thread. Like MicroBatcher, the thread is started
+    lazily per process so gunicorn workers forked after preload get their own.
+    """
+
+    def __init__(self, registry, on_change, interval_seconds=5.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval = interval_seconds
+        self.seen = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        if self.interval <= 0 or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+                self._thread.start()
+
+    def check(self):
+        """Compare pointers once; returns True if on_change was called"""
+        pointers = self.registry.pointers()
+        if pointers == self.seen:
+            return False
+        self.on_change(*pointers)
+        self.seen = pointers
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                log.exception('Model registry watch error')
+
+
+def main(argv):
+    registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_PATH', REGISTRY_PATH))
+    command = argv[0] if argv else 'list'
+
+    if command == 'list':
+        active, shadow = registry.pointers()
+        for metadata in registry.versions():
+            version = metadata['version']
+            marker = ' (active)' if version == active else ' (shadow)' if version == shadow else ''
+            print(f"{version}{marker}  {metadata['created_at']}  {len(metadata['features'])} features")
+    elif command == 'publish' and len(argv) >= 4:
+        model = joblib.load(argv[1])
+        scaler = joblib.load(argv[2])
+        version = registry.publish(model, scaler, argv[3].split(','))
+        print(f"✅ Published {version}")
+        if '--activate' in argv:
+            registry.set_active(version)
+            print(f"✅ {version} is now active")
+    elif command == 'activate' and len(argv) == 2:
+        registry.set_active(argv[1])
+        print(f"✅ {argv[1]} is now active")
+    elif command == 'shadow' and len(argv) == 2:
+        registry.set_shadow(None if argv[1] == 'none' else argv[1])
+        print(f"✅ Shadow model: {argv[1]}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""
+LifeLink - Process memory and startup report for the ML Inference API
+Used to size gunicorn worker counts
+
+RSS counts every resident page, including pages shared copy-on-write with
+the gunicorn master, so summing worker RSS overstates real usage. PSS
+splits each shared page between the processes mapping it; the sum of PSS
+over the master and all workers is the real memory footprint.
+"""
+
+import os
+import resource
+import sys
+import time
+
+PROCESS_STARTED = time.time()
+
+# Filled in by app.create_app()
+startup = {}
+
+
+def memory_usage():
+    """Memory of this process in MB (RSS, PSS and shared/private split on Linux)"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    usage[parts[0].rstrip(':')] = int(parts[1]) / 1024.0
+    except OSError:
+        usage = {}
+
+    if not usage:
+        # maxrss is bytes on macOS, kilobytes elsewhere
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+        return {'max_rss_mb': round(max_rss / divisor, 1)}
+
+    return {
+        'rss_mb': round(usage.get('Rss', 0), 1),
+        'pss_mb': round(usage.get('Pss', 0), 1),
+        'shared_mb': round(usage.get('Shared_Clean', 0) + usage.get('Shared_Dirty', 0), 1),
+        'private_mb': round(usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0), 1)
+    }
+
+
+def report():
+    return {
+        'pid': os.getpid(),
+        'parent_pid': os.getppid(),
+        'uptime_seconds': round(time.time() - PROCESS_STARTED, 1),
+        'startup': dict(startup),
+        'memory': memory_usage()
+    }
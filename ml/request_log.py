@@ -0,0 +1,195 @@
+"""
+LifeLink - Structured request logging for the ML Inference API
+Sampled, non-blocking log lines off the request path
+
+Request threads never write to stdout themselves. A record goes onto a
+bounded queue and a background writer thread formats it (JSON lines by
+default) and writes it out. When the writer falls behind, new records are
+dropped and counted instead of blocking requests.
+
+Success lines are sampled per route: with a rate of 0.01 only one /predict
+call in a hundred creates a record at all, and the message arguments of
+the others are never formatted. Warnings are always logged, and errors
+always with their traceback. Service events outside a request (model
+loads and swaps) are logged with route None and are never sampled.
+
+Configure once per process with configure(); like MicroBatcher, the writer
+thread is started lazily per process so gunicorn workers forked after
+preload get their own.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'lifelink'
+
+
+def parse_sample_rates(spec):
+    """'/predict=0.01,/score-donors=0.1' -> {'/predict': 0.01, '/score-donors': 0.1}"""
+    rates = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            route, _, rate = item.partition('=')
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, route, message and fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'route', None):
+            entry['route'] = record.route
+        if getattr(record, 'sample_rate', 1.0) < 1.0:
+            entry['sample_rate'] = record.sample_rate
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local runs"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' | ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class AsyncHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for a writer thread that passes them to `target`
+
+    Records are queued unformatted, so message formatting happens on the
+    writer thread. Only a traceback is rendered up front, while it still
+    refers to live frames.
+    """
+
+    def __init__(self, target, max_queue=10000):
+        super().__init__(queue.Queue(max_queue))
+        self.target = target
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                # A fork copies the parent's queue but not its writer thread
+                self.queue = queue.Queue(self.max_queue)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._write, name='request-log-writer', daemon=True)
+                self._thread.start()
+
+    def _write(self):
+        records = self.queue
+        while True:
+            record = records.get()
+            try:
+                self.target.handle(record)
+            except Exception:
+                pass
+            finally:
+                records.task_done()
+
+    def flush(self, timeout=1.0):
+        """Wait (up to `timeout` seconds) for queued records to be written"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.target.flush()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'max_queue': self.max_queue,
+            'dropped': self.dropped
+        }
+
+
+class RequestLogger:
+    """
+    Route-aware front end to the 'lifelink' logger
+
+    info() is sampled by route (route None is never sampled); warning()
+    and error() always log. Extra keyword arguments become fields of the
+    structured record.
+    """
+
+    def __init__(self, sample_rates=None, default_rate=1.0, logger=None):
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+        self.sample_rates = dict(sample_rates or {})
+        self.default_rate = default_rate
+        self.sampled_out = 0
+
+    def info(self, route, msg, *args, **fields):
+        rate = self.sample_rates.get(route, self.default_rate) if route is not None else 1.0
+        if rate < 1.0 and random.random() >= rate:
+            self.sampled_out += 1
+            return
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(msg, *args, extra={'route': route, 'sample_rate': rate, 'fields': fields})
+
+    def warning(self, route, msg, *args, **fields):
+        self.logger.warning(msg, *args, extra={'route': route, 'sample_rate': 1.0, 'fields': fields})
+
+    def error(self, route, msg, *args, **fields):
+        self.logger.error(msg, *args, exc_info=True, extra={'route': route, 'sample_rate': 1.0, 'fields': fields})
+
+
+def configure(level='INFO', fmt='json', max_queue=10000, stream=None, name=LOGGER_NAME):
+    """
+    (Re)configure the `name` logger with a single AsyncHandler
+
+    Returns the handler; its stats() report queue depth and drops.
+    """
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(TextFormatter() if fmt == 'text' else JsonFormatter())
+    handler = AsyncHandler(target, max_queue)
+
+    logger = logging.getLogger(name)
+    for previous in [h for h in logger.handlers if isinstance(h, AsyncHandler)]:
+        previous.flush()
+        logger.removeHandler(previous)
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return handler
@@ -0,0 +1,170 @@
+"""
+LifeLink - Per-request phase timing and opt-in profiling
+Where a slow request spends its time, without profiling every request
+
+PhaseTimer splits one request into named phases (parse, validate, score,
+rank, serialize). The server sends them back as a Server-Timing header,
+e.g. "parse;dur=12.31, score;dur=40.02, rank;dur=8.77, serialize;dur=21.4".
+
+StackSampler is a sampling profiler for one request thread. A background
+thread reads the request thread's stack every `interval` seconds, so the
+request itself runs unmodified (unlike cProfile, which hooks every
+function call). Time spent inside numpy shows up under the Python
+function that called it. The summary lists the top-N functions by own
+samples and by samples including callees.
+
+ProfileStore keeps the newest summaries as JSON files, so any worker can
+serve profiles captured by the others.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+
+class PhaseTimer:
+    """Named durations for one request, in the order first recorded"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.durations = {}
+        self._last = self.started
+        self._added = 0.0
+
+    def add(self, name, seconds):
+        """Record a duration measured elsewhere (e.g. by a scorer timer callback)"""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self._added += seconds
+
+    def mark(self, name):
+        """Close a phase: time since the previous mark, less anything add()ed since, goes to `name`"""
+        now = time.perf_counter()
+        self.add(name, max(0.0, now - self._last - self._added))
+        self._last = now
+        self._added = 0.0
+
+    def server_timing(self):
+        """Server-Timing header value (milliseconds), with the total so far"""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.durations.items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(parts)
+
+
+class StackSampler:
+    """Sample the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id, interval=0.001, max_depth=64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.own = Counter()
+        self.total = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.duration = 0.0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f'{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})')
+            frame = frame.f_back
+        self.samples += 1
+        self.own[stack[0]] += 1
+        self.total.update(set(stack))
+
+    def summary(self, top_n=15):
+        def rows(counter):
+            return [{'function': function, 'samples': samples,
+                     'percent': round(100.0 * samples / self.samples, 1)}
+                    for function, samples in counter.most_common(top_n)]
+
+        return {
+            'samples': self.samples,
+            'interval_ms': self.interval * 1000,
+            'duration_ms': round(self.duration * 1000, 3),
+            'self': rows(self.own),
+            'cumulative': rows(self.total)
+        }
+
+
+class ProfileStore:
+    """Newest `keep` profile summaries, one JSON file each"""
+
+    _ids = count()
+
+    def __init__(self, directory, keep=200):
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, profile):
+        """Store a summary; returns its id"""
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f'{time.time_ns()}-{os.getpid()}-{next(self._ids)}'
+        profile = dict(profile, id=profile_id)
+        fd, tmp = tempfile.mkstemp(prefix='.profile-', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp, os.path.join(self.directory, f'profile-{profile_id}.json'))
+        self._prune()
+        return profile_id
+
+    def _names(self):
+        try:
+            names = [name for name in os.listdir(self.directory)
+                     if name.startswith('profile-') and name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+        # Ids start with a nanosecond timestamp: sort numerically, newest first
+        return sorted(names, key=lambda name: int(name[len('profile-'):].split('-')[0]), reverse=True)
+
+    def _prune(self):
+        for name in self._names()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def get(self, profile_id):
+        if not profile_id or profile_id.strip('0123456789-'):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'profile-{profile_id}.json')) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def recent(self, limit=20):
+        profiles = []
+        for name in self._names()[:limit]:
+            profile = self.get(name[len('profile-'):-len('.json')])
+            if profile is not None:
+                profiles.append(profile)
+        return profiles
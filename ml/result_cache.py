@@ -0,0 +1,100 @@
+"""
+LifeLink - In-process result cache for the ML Inference API
+Bounded LRU + TTL cache for /predict and /score-donors results
+
+Keys are built by the caller from everything the result depends on:
+the input (feature vector, or a hash of the raw donor payload), the model
+version, and for donor scoring the learning-store version and the current
+time-of-day bucket. When the learning store or the model changes, the old
+keys simply stop matching and age out through LRU/TTL eviction; clear()
+drops everything at once (used on model reload).
+
+Memory is bounded both by entry count and by a caller-supplied cost per
+entry (the number of donors for scoring results), so a few huge donor
+pools cannot crowd out the cache's memory budget.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def payload_digest(data):
+    """Short stable hash of a request body (bytes)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and a total cost budget"""
+
+    def __init__(self, max_entries=1024, ttl_seconds=300, max_cost=200000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_cost = max_cost
+        self._entries = OrderedDict()  # key -> (expires_at, cost, value)
+        self._cost = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, cost, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._cost -= cost
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, cost=1):
+        if not self.enabled or cost > self.max_cost:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._cost -= previous[1]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, cost, value)
+            self._cost += cost
+            while len(self._entries) > self.max_entries or self._cost > self.max_cost:
+                _, (_, evicted_cost, _) = self._entries.popitem(last=False)
+                self._cost -= evicted_cost
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cost = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'cost': self._cost,
+                'max_entries': self.max_entries,
+                'max_cost': self.max_cost,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
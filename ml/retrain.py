@@ -0,0 +1,233 @@
+"""
+LifeLink - Scheduled retraining of the fake request detector from moderator labels
+Retrains on the base training data plus moderator labels and promotes the result only if it is better
+
+Labelled rows arrive in a drop directory (data/labels by default): CSV,
+JSONL or Parquet exports from the backend's moderator reviews, or the JSONL
+files POST /admin/labels writes. Every row has the serving model's feature
+columns and a 'label' ('fake' or 'genuine', as in the log exports).
+
+One run:
+    1. Reads the labelled rows (a reservoir sample of at most max_rows,
+       see sweep_model.load_labelled_rows) and skips the run when the drop
+       directory has not changed since the last one.
+    2. Splits off a stratified held-out set of the labelled rows
+       (sweep_model.split). Held-out rows are never trained on.
+    3. Fits a candidate on the base training data (the synthetic data of
+       the serving feature set's training script, or --base-data exports)
+       plus the rest of the labelled rows. The labels add to the data the
+       serving model was built from rather than replacing it, so a small
+       label set cannot become the whole model. The candidate keeps the
+       serving model's feature set and forest size; contamination is the
+       fake ratio of its training rows.
+    4. Scores the candidate and the serving model on the held-out rows.
+    5. Publishes the candidate to the model registry and moves ACTIVE to it
+       only if its F1 beats the serving model's by min_improvement.
+       Serving processes pick the new version up through their registry
+       watch (see model_registry.py) and swap it in atomically.
+
+The outcome of each run is kept in <labels dir>/.retrain-state (JSON).
+
+Runs are never executed in the serving process: --every starts a
+scheduler that trains in a fresh child process each time, and
+gunicorn.conf.py starts that scheduler next to the workers when
+RETRAIN_INTERVAL_SECONDS is set.
+
+Usage:
+    python retrain.py                      # one run now
+    python retrain.py --every 3600         # hourly, until stopped
+    python retrain.py --labels exports/reviews --min-improvement 0.01
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from model_registry import BASE_FEATURES, REGISTRY_PATH, ModelBundle, ModelRegistry
+from sweep_model import classification_stats, load_labelled_rows, split, train_candidate
+from train_from_logs import expand_paths
+
+LABELS_DIR = 'data/labels'
+STATE_FILE = '.retrain-state'  # JSON, but no label-file extension
+BUILTIN_MODEL = ('models/fake_detector.pkl', 'models/scaler.pkl')
+
+# Retraining is skipped below these, since the held-out comparison would be noise
+MIN_ROWS = 200
+MIN_PER_CLASS = 20
+
+
+def labels_signature(labels_dir):
+    """Names, sizes and mtimes of the label files; changes when labels are added"""
+    signature = []
+    for path in expand_paths([labels_dir]):
+        stat = os.stat(path)
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def read_state(labels_dir):
+    try:
+        with open(os.path.join(labels_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_state(labels_dir, state):
+    os.makedirs(labels_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.retrain-', dir=labels_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(labels_dir, STATE_FILE))
+
+
+def write_label_file(labels_dir, rows):
+    """Drop rows (dicts of features + label) into labels_dir as a new JSONL file; returns its path"""
+    os.makedirs(labels_dir, exist_ok=True)
+    name = f"labels-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+    # Written under a name without a label extension, so a run never reads half a file
+    fd, tmp = tempfile.mkstemp(prefix='.labels-', dir=labels_dir)
+    with os.fdopen(fd, 'w') as f:
+        f.writelines(json.dumps(row) + '\n' for row in rows)
+    os.replace(tmp, os.path.join(labels_dir, name))
+    return os.path.join(labels_dir, name)
+
+
+def serving_model(registry):
+    """The ModelBundle /predict serves: the registry's ACTIVE version, else the builtin files"""
+    version = registry.active_version()
+    if registry.exists(version):
+        return registry.load(version, flat=False)
+    return ModelBundle.from_files('builtin', *BUILTIN_MODEL, BASE_FEATURES, flat=False)
+
+
+def base_rows(features, base_paths=None, max_rows=200000, seed=42):
+    """The data a retrain starts from: exports under base_paths, else the synthetic training data"""
+    if not base_paths:
+        np.random.seed(seed)  # The generators draw from the global state
+    return load_labelled_rows(features, base_paths, max_rows=max_rows, seed=seed)
+
+
+def retrain(labels_dir=LABELS_DIR, registry_path=REGISTRY_PATH, min_improvement=0.0, holdout=0.3,
+            max_rows=200000, force=False, seed=42, base_paths=None):
+    """
+    One retraining run (see module docstring)
+
+    Returns the run report; its 'outcome' is 'promoted', 'rejected' or
+    'skipped' (with a 'reason').
+    """
+    report = {'started_at': datetime.now().isoformat(), 'labels_dir': labels_dir}
+    state = read_state(labels_dir)
+    signature = labels_signature(labels_dir) if os.path.isdir(labels_dir) else []
+
+    def finish(outcome, **fields):
+        report.update(fields, outcome=outcome, finished_at=datetime.now().isoformat())
+        trained = outcome != 'skipped'
+        write_state(labels_dir, {
+            'signature': signature if trained else state.get('signature'),
+            'last_run': report,
+            'last_trained': report if trained else state.get('last_trained')
+        })
+        return report
+
+    if not signature:
+        return finish('skipped', reason='no label files')
+    if signature == state.get('signature') and not force:
+        return finish('skipped', reason='labels unchanged since the last run')
+
+    registry = ModelRegistry(registry_path)
+    serving = serving_model(registry)
+    features = serving.feature_names
+    X, y = load_labelled_rows(features, [labels_dir], max_rows=max_rows, seed=seed)
+    report.update(rows=len(y), fake=int(y.sum()), serving_version=serving.version)
+    if len(y) < MIN_ROWS or min(y.sum(), (~y).sum()) < MIN_PER_CLASS:
+        return finish('skipped', reason=f'need {MIN_ROWS} labelled rows with {MIN_PER_CLASS} of each class')
+
+    X_train, y_train, X_test, y_test = split(X, y, holdout, seed)
+    X_base, y_base = base_rows(features, base_paths, max_rows=max_rows, seed=seed)
+    X_train, y_train = np.vstack([X_base, X_train]), np.concatenate([y_base, y_train])
+    report.update(base_rows=len(y_base), training_rows=len(y_train))
+    params = {
+        'n_estimators': len(serving.model.estimators_),
+        'max_samples': int(serving.model.max_samples_),
+        'contamination': float(np.clip(y_train.mean(), 0.01, 0.5))
+    }
+    candidate, model, scaler = train_candidate(params, X_train, X_test, y_test, seed)
+    current = classification_stats(y_test, serving.decision_function(X_test) < 0)
+    report.update(holdout_rows=len(y_test), candidate=candidate, serving=current)
+
+    if candidate['f1'] <= current['f1'] + min_improvement:
+        return finish('rejected', reason=f"candidate F1 {candidate['f1']} does not beat {current['f1']}"
+                                         f" by more than {min_improvement}")
+
+    version = registry.publish(model, scaler, features, training_stats=dict(
+        candidate, source='retrain', labelled_rows=len(y), base_rows=len(y_base), training_rows=len(y_train),
+        replaced=serving.version, serving_holdout=current))
+    registry.set_active(version)
+    return finish('promoted', version=version)
+
+
+def _run_in_child(kwargs):
+    return retrain(**kwargs)
+
+
+def run_scheduled(every_seconds, log=print, **kwargs):
+    """Retrain every every_seconds, each run in a fresh process, until interrupted"""
+    context = multiprocessing.get_context('spawn')
+    while True:
+        started = time.monotonic()
+        try:
+            with context.Pool(1) as pool:
+                report = pool.apply(_run_in_child, (kwargs,))
+            log(f"🔁 Retrain {report['outcome']}: {report.get('reason') or report.get('version')}")
+        except Exception as e:
+            log(f"❌ Retrain failed: {e}")
+        time.sleep(max(0.0, every_seconds - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrain the fake request detector from moderator labels')
+    parser.add_argument('--labels', default=os.environ.get('LABELS_DIR', LABELS_DIR), help='Label drop directory')
+    parser.add_argument('--registry', default=os.environ.get('MODEL_REGISTRY_PATH', REGISTRY_PATH))
+    parser.add_argument('--min-improvement', type=float, default=0.0, help='Required F1 gain over the serving model')
+    parser.add_argument('--holdout', type=float, default=0.3, help='Share of the labelled rows held out')
+    parser.add_argument('--base-data', nargs='+', help='Labelled exports to train on with the labels '
+                                                       '(default: the synthetic training data)')
+    parser.add_argument('--every', type=float, help='Seconds between runs; without it, run once')
+    parser.add_argument('--force', action='store_true', help='Retrain even if the labels have not changed')
+    args = parser.parse_args()
+
+    kwargs = {'labels_dir': args.labels, 'registry_path': args.registry,
+              'min_improvement': args.min_improvement, 'holdout': args.holdout, 'force': args.force,
+              'base_paths': args.base_data}
+
+    print("=" * 60)
+    print("🩸 LifeLink - Fake Request Detection Retraining (moderator labels)")
+    print("=" * 60)
+
+    if args.every:
+        run_scheduled(args.every, **dict(kwargs, force=False))
+        return
+
+    report = retrain(**kwargs)
+    if report['outcome'] == 'skipped':
+        print(f"⏭️  Skipped: {report['reason']}")
+        return
+    print(f"   Trained on {report['base_rows']} base + {report['training_rows'] - report['base_rows']} labelled rows")
+    print(f"   Held-out F1 ({report['holdout_rows']} labelled rows): candidate {report['candidate']['f1']:.4f}, "
+          f"serving {report['serving_version']} {report['serving']['f1']:.4f}")
+    if report['outcome'] == 'promoted':
+        print(f"✅ Promoted {report['version']} to the active model")
+    else:
+        print(f"⚠️  Rejected: {report['reason']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+"""
+LifeLink - Streaming quantiles of /predict decision scores
+Fixed-memory score distributions per model version, for calibrated confidence
+
+KLLSketch is a KLL quantile sketch: a stack of compactors where level h
+holds items of weight 2**h. A level over its capacity is sorted and every
+other item (random offset) moves up a level. Capacities shrink by 2/3 per
+level below the top, so the sketch keeps about 3k items whatever the
+stream length, with rank error around 1.7 / k. Sketches merge by
+concatenating levels, so per-worker sketches add up to the service's.
+
+ScoreCalibration keeps one sketch per model, keyed by the bundle's
+calibration_key (the registry version, or a content hash for model files
+loaded by path, which training scripts rewrite in place). The request path
+only appends the score to a buffer and looks confidence up in a
+precomputed table (one bisect):
+    rank       = fraction of production scores <= score
+    confidence = how far the score sits into its side of the 0 threshold,
+                 in production ranks: 1 - rank / rank(0) for fake scores,
+                 (rank - rank(0)) / (1 - rank(0)) for genuine ones
+A background thread folds the buffers into the sketches, writes this
+process's sketches to <directory>/sketch-<pid>.npz, merges every
+worker's file and rebuilds the tables. Until a version has min_count
+scores its table does not exist and callers keep the raw confidence.
+Sketches of exited workers are folded into sketch-archive.npz at startup
+(absorb_dead_files), so the distribution survives restarts.
+
+Each saved sketch carries the time its version last received scores. Only
+the max_versions most recently seen versions are kept, plus `pinned` (the
+serving model's key) however long ago it was last seen. A version buffers
+at most max_buffered scores between refreshes; the rest of a burst is
+dropped (and counted), which thins the sample without skewing it.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from snapshot_file import SnapshotFile
+
+# Quantiles reported by export()
+EXPORT_QUANTILES = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999)
+ARCHIVE = 'sketch-archive.npz'
+
+
+class KLLSketch:
+    """Mergeable fixed-memory quantile sketch (see module docstring)"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays, so the total weight is preserved exactly
+                paired = len(items) - len(items) % 2
+                promoted = items[:paired][self._rng.integers(2)::2]
+                self.levels[level] = items[paired:]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def weighted_items(self):
+        """(items, weights) sorted by item"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, qs):
+        """Approximate values at the given ranks (0-1); the exact min and max at 0 and 1"""
+        qs = np.asarray(qs, dtype=float)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items, weights = self.weighted_items()
+        cumulative = np.cumsum(weights)
+        index = np.searchsorted(cumulative, qs * cumulative[-1], side='left')
+        values = items[np.minimum(index, len(items) - 1)]
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, values))
+
+    def cdf(self, values):
+        """Approximate fraction of the stream <= each value"""
+        items, weights = self.weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(items, values, side='right')] / max(cumulative[-1], 1.0)
+
+    def to_arrays(self):
+        return {
+            'items': np.concatenate(self.levels),
+            'sizes': np.array([len(items) for items in self.levels]),
+            'stats': np.array([self.count, self.min, self.max, self.k])
+        }
+
+    @classmethod
+    def from_arrays(cls, items, sizes, stats):
+        sketch = cls(k=int(stats[3]))
+        sketch.levels = np.split(np.asarray(items, dtype=float), np.cumsum(sizes)[:-1])
+        sketch.count, sketch.min, sketch.max = int(stats[0]), float(stats[1]), float(stats[2])
+        return sketch
+
+
+def _save_sketches(snapshot_file, sketches, seen):
+    arrays = {}
+    for version, sketch in sketches.items():
+        arrays.update({f'{name}:{version}': values for name, values in sketch.to_arrays().items()})
+        arrays[f'seen:{version}'] = np.array(seen.get(version, 0.0))
+    snapshot_file.save(arrays)
+
+
+def _load_sketches(path):
+    """({version: sketch}, {version: last seen}), least recently seen version first"""
+    try:
+        with np.load(path) as snapshot:
+            arrays = {name: snapshot[name] for name in snapshot.files}
+    except (FileNotFoundError, ValueError, OSError):
+        return {}, {}
+    versions = {name.split(':', 1)[1] for name in arrays}
+    seen = {version: float(arrays.get(f'seen:{version}', 0.0)) for version in versions}
+    return {version: KLLSketch.from_arrays(arrays[f'items:{version}'], arrays[f'sizes:{version}'],
+                                           arrays[f'stats:{version}'])
+            for version in sorted(versions, key=lambda version: (seen[version], version))}, seen
+
+
+def _most_recent(seen, max_versions, pinned=None):
+    """The max_versions most recently seen versions, and `pinned`"""
+    recent = sorted(seen, key=lambda version: (seen[version], version))[-max_versions:]
+    return set(recent) | ({pinned} & seen.keys())
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ScoreCalibration:
+    """Per-model-version score sketches and confidence tables (see module docstring)"""
+
+    def __init__(self, directory=None, k=200, table_size=1000, min_count=1000, refresh_seconds=5.0,
+                 max_versions=5, max_buffered=100000):
+        self.directory = directory
+        self.k = k
+        self.table_size = table_size
+        self.min_count = min_count
+        self.refresh_seconds = refresh_seconds
+        self.max_versions = max_versions
+        self.max_buffered = max_buffered
+        self.pinned = None  # Never pruned: the serving model's calibration_key
+        self.dropped = 0
+        self._sketches = {}  # version -> this process's KLLSketch
+        self._seen = {}  # version -> when this process last folded scores of it in
+        self._buffers = {}  # version -> scores not yet in the sketch
+        self._tables = {}  # version -> (quantile edges list, rank of 0); replaced as a whole
+        self._merged = {}  # version -> every worker's sketch merged, as of the last refresh
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._file = None
+        self._thread = None
+        self._pid = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def record(self, version, scores):
+        """Queue served decision scores of a model version (up to max_buffered per refresh)"""
+        self._ensure_worker()
+        with self._lock:
+            buffer = self._buffers.get(version)
+            if buffer is None:
+                buffer = self._buffers[version] = []
+            room = max(0, self.max_buffered - len(buffer))
+            if len(scores) > room:
+                self.dropped += len(scores) - room
+                scores = scores[:room]
+            buffer.extend(scores)
+
+    def confidence(self, version, score):
+        """Calibrated confidence (0-1) of a score, or None until the version has enough scores"""
+        table = self._tables.get(version)
+        if table is None:
+            return None
+        edges, zero_rank = table
+        rank = bisect.bisect_right(edges, score) / len(edges)
+        if score < 0:
+            confidence = 1.0 - rank / zero_rank if zero_rank > 0 else 1.0
+        else:
+            confidence = (rank - zero_rank) / (1.0 - zero_rank) if zero_rank < 1 else 1.0
+        return min(1.0, max(0.0, confidence))
+
+    def _ensure_worker(self):
+        # Threads do not survive fork; each worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._refresh_lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    # Scores a forked worker inherited were recorded by its parent
+                    self._sketches, self._seen, self._buffers = {}, {}, {}
+                self._pid = os.getpid()
+                self._file = (SnapshotFile(os.path.join(self.directory, f'sketch-{self._pid}.npz'))
+                              if self.directory is not None else None)
+                self._thread = threading.Thread(target=self._run, name='score-sketch', daemon=True)
+                self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception:
+                pass  # Calibration must never take the worker down; retried next round
+
+    def refresh(self):
+        """Fold buffered scores in, share this process's sketches and rebuild the tables"""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        with self._refresh_lock:
+            now = time.time()
+            for version, scores in buffers.items():
+                self._sketches.setdefault(version, KLLSketch(self.k)).update(scores)
+                self._seen[version] = now
+            keep = _most_recent(self._seen, self.max_versions, self.pinned)
+            self._sketches = {version: sketch for version, sketch in self._sketches.items() if version in keep}
+            self._seen = {version: self._seen[version] for version in self._sketches}
+
+            if self._file is not None and buffers:
+                _save_sketches(self._file, self._sketches, self._seen)
+            merged = self._collect()
+
+            tables = {}
+            for version, sketch in merged.items():
+                if sketch.count >= self.min_count:
+                    edges = sketch.quantiles(np.arange(1, self.table_size + 1) / self.table_size)
+                    tables[version] = (edges.tolist(), float(sketch.cdf([0.0])[0]))
+            self._merged = merged
+            self._tables = tables
+
+    def _collect(self):
+        """Every worker's sketches (and the archive) merged per version"""
+        if self.directory is None:
+            return {version: KLLSketch(self.k).merge(sketch) for version, sketch in self._sketches.items()}
+        merged = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if not (filename.startswith('sketch-') and filename.endswith('.npz')):
+                continue
+            for version, sketch in _load_sketches(os.path.join(self.directory, filename))[0].items():
+                if version in merged:
+                    merged[version].merge(sketch)
+                else:
+                    merged[version] = sketch
+        return merged
+
+    def absorb_dead_files(self):
+        """
+        Fold the sketches of exited workers into the archive (call once at startup)
+
+        With gunicorn's preload_app this runs in the master before it forks,
+        after the model is loaded so that its version is pinned.
+        """
+        if self.directory is None:
+            return 0
+        archive_file = SnapshotFile(os.path.join(self.directory, ARCHIVE))
+        absorbed = 0
+        with archive_file.lock():
+            archive, seen = _load_sketches(archive_file.path)
+            for filename in os.listdir(self.directory):
+                pid = filename[len('sketch-'):-len('.npz')]
+                if not (filename.startswith('sketch-') and pid.isdigit()) or _alive(int(pid)):
+                    continue
+                path = os.path.join(self.directory, filename)
+                sketches, sketches_seen = _load_sketches(path)
+                for version, sketch in sketches.items():
+                    archive[version] = archive[version].merge(sketch) if version in archive else sketch
+                    seen[version] = max(seen.get(version, 0.0), sketches_seen[version])
+                os.remove(path)
+                absorbed += 1
+            if absorbed:
+                keep = _most_recent(seen, self.max_versions, self.pinned)
+                _save_sketches(archive_file, {version: archive[version] for version in keep}, seen)
+        return absorbed
+
+    def stats(self):
+        merged = self._merged
+        return {
+            'versions': {version: {'count': sketch.count, 'calibrated': version in self._tables}
+                         for version, sketch in merged.items()},
+            'buffered': sum(len(buffer) for buffer in list(self._buffers.values())),
+            'dropped': self.dropped
+        }
+
+    def export(self, version=None):
+        """Merged distribution of one or every model version, for drift monitoring"""
+        merged = self._merged
+        versions = [version] if version is not None else sorted(merged)
+        result = {}
+        for name in versions:
+            sketch = merged.get(name)
+            if sketch is None:
+                continue
+            items, weights = sketch.weighted_items()
+            result[name] = {
+                'count': sketch.count,
+                'min': sketch.min,
+                'max': sketch.max,
+                'calibrated': name in self._tables,
+                'quantiles': dict(zip((str(q) for q in EXPORT_QUANTILES),
+                                      sketch.quantiles(EXPORT_QUANTILES).tolist())),
+                'sketch': {'k': sketch.k, 'items': items.tolist(), 'weights': weights.tolist()}
+            }
+        return result
@@ -0,0 +1,123 @@
+"""
+LifeLink - Shadow scoring of a candidate fake-request model
+Compares a candidate against the serving model without touching latency
+
+The request path hands over its feature rows and the scores it already
+returned (submit() is a non-blocking queue put; rows are dropped when the
+queue is full). A background thread scores them with the candidate and
+keeps agreement statistics: how often both models give the same
+fake/genuine label, which way they disagree, and how far the raw decision
+scores are apart.
+"""
+
+import os
+import queue
+import threading
+
+import numpy as np
+
+
+class ShadowScorer:
+    """Score requests with a candidate ModelBundle off the request path"""
+
+    def __init__(self, max_queue=1024):
+        self.max_queue = max_queue
+        self.candidate = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.compared = 0
+        self.agreed = 0
+        self.primary_fake_shadow_genuine = 0
+        self.primary_genuine_shadow_fake = 0
+        self.abs_score_diff_sum = 0.0
+        self.dropped = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def set_candidate(self, bundle):
+        """Start shadowing `bundle` (None turns shadow mode off); resets the stats"""
+        with self._stats_lock:
+            self.candidate = bundle
+            self._reset_stats()
+
+    def submit(self, X, primary_scores):
+        """Queue rows already scored by the serving model; never blocks"""
+        candidate = self.candidate
+        if candidate is None:
+            return False
+        if np.shape(X)[-1] != candidate.n_features:
+            with self._stats_lock:
+                self.skipped += 1
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((candidate, np.asarray(X, dtype=float), np.asarray(primary_scores)))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            candidate, X, primary = self._queue.get()
+            try:
+                self.record(candidate, primary, candidate.decision_function(X.reshape(-1, X.shape[-1])))
+            except Exception:
+                with self._stats_lock:
+                    self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def record(self, candidate, primary_scores, shadow_scores):
+        primary_fake = np.asarray(primary_scores) < 0
+        shadow_fake = np.asarray(shadow_scores) < 0
+        with self._stats_lock:
+            if candidate is not self.candidate:
+                return  # Candidate changed while this batch was queued
+            self.compared += len(primary_fake)
+            self.agreed += int((primary_fake == shadow_fake).sum())
+            self.primary_fake_shadow_genuine += int((primary_fake & ~shadow_fake).sum())
+            self.primary_genuine_shadow_fake += int((~primary_fake & shadow_fake).sum())
+            self.abs_score_diff_sum += float(np.abs(np.asarray(primary_scores) - shadow_scores).sum())
+
+    def drain(self, timeout=5.0):
+        """Wait until queued rows are scored (tests and shutdown)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'candidate': self.candidate.version if self.candidate is not None else None,
+                'compared': self.compared,
+                'agreed': self.agreed,
+                'agreement_rate': round(self.agreed / self.compared, 4) if self.compared else None,
+                'primary_fake_shadow_genuine': self.primary_fake_shadow_genuine,
+                'primary_genuine_shadow_fake': self.primary_genuine_shadow_fake,
+                'mean_abs_score_diff': (round(self.abs_score_diff_sum / self.compared, 6)
+                                        if self.compared else None),
+                'queued': self._queue.qsize(),
+                'dropped': self.dropped,
+                'skipped_feature_mismatch': self.skipped,
+                'errors': self.errors
+            }
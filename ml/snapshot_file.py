@@ -0,0 +1,84 @@
+"""
+LifeLink - Shared .npz snapshots
+Named numpy arrays that every gunicorn worker reads and any worker replaces
+
+A snapshot is written to a temporary file and moved into place with
+os.replace(), so readers always load a complete file. Readers stat the
+path before using their in-memory copy and reload when it was replaced;
+os.replace() gives every snapshot a new inode, so even two writes within
+one mtime tick are noticed. Writers hold an flock()ed lock file (as the
+learning store does) around read-modify-write, so concurrent changes from
+different workers are applied one after the other.
+"""
+
+import contextlib
+import os
+import tempfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+
+class SnapshotFile:
+    """One .npz file of named arrays shared between processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._loaded_stamp = None
+        self._lock_file = None
+        self._lock_pid = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def changed(self):
+        """True if the file was replaced since this process last loaded or saved it"""
+        return self._stamp() != self._loaded_stamp
+
+    def load_if_changed(self):
+        """The arrays, if the file changed since the last load or save; otherwise None"""
+        stamp = self._stamp()
+        if stamp == self._loaded_stamp:
+            return None
+        self._loaded_stamp = stamp
+        if stamp is None:
+            return None
+        with np.load(self.path) as snapshot:
+            return {name: snapshot[name] for name in snapshot.files}
+
+    def save(self, arrays):
+        fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(self.path) + '-', suffix='.npz',
+                                   dir=os.path.dirname(os.path.abspath(self.path)))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, self.path)
+        except Exception:
+            os.remove(tmp)
+            raise
+        self._loaded_stamp = self._stamp()
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Exclusive across processes (the caller serializes its own threads)"""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_pid != os.getpid():
+            # flock() locks belong to the open file; forked workers need their own
+            self._lock_file = open(self.path + '.lock', 'a+b')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
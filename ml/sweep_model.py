@@ -0,0 +1,225 @@
+"""
+LifeLink - Accuracy vs latency sweep for the fake request detector
+Evidence for picking n_estimators / max_samples / contamination
+
+Every combination of the given grid is trained in a process pool (one
+IsolationForest per task, n_jobs=1, so candidates use all cores between
+them). Each candidate is scored on a held-out split of labelled rows
+(precision / recall / F1 for the 'fake' class). Inference latency is then
+measured in the parent process, one candidate at a time so the timings do
+not compete for cores, on the evaluator /predict uses (FlatForest):
+    single_row_ms   - median latency of one row
+    batch_ms        - median latency of a batch (default 1000 rows)
+Model size is the pickled forest plus the flat arrays.
+
+The Pareto frontier keeps the candidates no other candidate beats on F1,
+single-row latency and size at once.
+
+Usage:
+    python sweep_model.py                          # enhanced synthetic data
+    python sweep_model.py --features base --data exports/ --workers 8
+    python sweep_model.py --n-estimators 50,100,200 --output sweep.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from flat_forest import FlatForest
+from model_registry import BASE_FEATURES, ENHANCED_FEATURES
+
+DEFAULT_GRID = {
+    'n_estimators': [25, 50, 100, 200, 400],
+    'max_samples': [64, 128, 256, 512],
+    'contamination': [0.1, 0.15, 0.2, 0.25]
+}
+
+
+def load_labelled_rows(features, data_paths=None, max_rows=200000, seed=42):
+    """
+    Feature matrix and is-fake labels.
+
+    Without data_paths the synthetic generator of the matching training
+    script is used; otherwise up to max_rows labelled rows are sampled from
+    the exports (see train_from_logs.py).
+    """
+    if data_paths:
+        import pandas as pd
+        from train_from_logs import ReservoirSampler, iter_chunks
+
+        reservoir = ReservoirSampler(max_rows, len(features) + 1, seed=seed)
+        for chunk in iter_chunks(data_paths, list(features) + ['label']):
+            if 'label' not in chunk.columns:
+                raise ValueError('The sweep needs a label column in the export')
+            X = chunk[list(features)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            y = chunk['label'].isin(['fake', -1, '-1']).to_numpy(dtype=float)
+            valid = ~np.isnan(X).any(axis=1) & chunk['label'].notna().to_numpy()
+            reservoir.add(np.column_stack([X[valid], y[valid]]))
+        sample = reservoir.sample()
+        return sample[:, :-1], sample[:, -1].astype(bool)
+
+    if list(features) == ENHANCED_FEATURES:
+        from train_model_enhanced import generate_enhanced_training_data
+        df = generate_enhanced_training_data()
+    else:
+        from train_model import generate_training_data
+        df = generate_training_data()
+    return df[list(features)].to_numpy(dtype=float), df['label'].isin(['fake', -1]).to_numpy()
+
+
+def split(X, y, holdout=0.3, seed=42):
+    """Shuffled train / held-out split with the same fake ratio in both"""
+    rng = np.random.default_rng(seed)
+    train, test = [], []
+    for cls in (False, True):
+        index = rng.permutation(np.flatnonzero(y == cls))
+        cut = int(round(len(index) * (1 - holdout)))
+        train.append(index[:cut])
+        test.append(index[cut:])
+    train, test = np.concatenate(train), np.concatenate(test)
+    return X[train], y[train], X[test], y[test]
+
+
+def classification_stats(y_true_fake, predicted_fake):
+    tp = int((predicted_fake & y_true_fake).sum())
+    fp = int((predicted_fake & ~y_true_fake).sum())
+    fn = int((~predicted_fake & y_true_fake).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4)}
+
+
+def train_candidate(params, X_train, X_test, y_test, seed=42):
+    """Pool task: fit one candidate and score it on the held-out rows"""
+    scaler = StandardScaler().fit(X_train)
+    started = time.perf_counter()
+    model = IsolationForest(
+        n_estimators=params['n_estimators'],
+        max_samples=min(params['max_samples'], len(X_train)),
+        contamination=params['contamination'],
+        random_state=seed,
+        n_jobs=1
+    ).fit(scaler.transform(X_train))
+    fit_seconds = time.perf_counter() - started
+
+    predicted_fake = model.predict(scaler.transform(X_test)) == -1
+    result = dict(params, fit_seconds=round(fit_seconds, 3), **classification_stats(y_test, predicted_fake))
+    return result, model, scaler
+
+
+def _median_ms(fn, rows, repeats):
+    fn(rows)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000.0, 4)
+
+
+def measure_latency(model, scaler, X, batch_rows=1000, repeats=200):
+    flat = FlatForest.from_sklearn(model, scaler)
+    batch = X[np.arange(batch_rows) % len(X)]
+    flat_bytes = sum(getattr(flat, name).nbytes for name in FlatForest.ARRAYS)
+    return {
+        'single_row_ms': _median_ms(flat.decision_function, X[:1], repeats),
+        'batch_ms': _median_ms(flat.decision_function, batch, max(5, repeats // 20)),
+        'batch_rows': batch_rows,
+        'model_bytes': len(pickle.dumps(model)),
+        'flat_bytes': int(flat_bytes)
+    }
+
+
+def pareto_frontier(results, maximize=('f1',), minimize=('single_row_ms', 'model_bytes')):
+    """Results not dominated by any other result on the given objectives"""
+    def key(result):
+        return [result[m] for m in maximize] + [-result[m] for m in minimize]
+
+    keys = [key(r) for r in results]
+    frontier = []
+    for i, ki in enumerate(keys):
+        dominated = any(
+            all(a >= b for a, b in zip(kj, ki)) and any(a > b for a, b in zip(kj, ki))
+            for j, kj in enumerate(keys) if j != i
+        )
+        if not dominated:
+            frontier.append(results[i])
+    return sorted(frontier, key=lambda r: r['single_row_ms'])
+
+
+def run_sweep(X, y, grid=DEFAULT_GRID, workers=None, holdout=0.3, batch_rows=1000, repeats=200, seed=42):
+    """Train every grid combination in a process pool, then time each one"""
+    X_train, _, X_test, y_test = split(X, y, holdout, seed)
+    candidates = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(train_candidate, params, X_train, X_test, y_test, seed)
+                   for params in candidates]
+        trained = [future.result() for future in futures]
+
+    results = []
+    for result, model, scaler in trained:
+        result.update(measure_latency(model, scaler, X_test, batch_rows, repeats))
+        results.append(result)
+    return results
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy vs latency sweep for the fake request detector')
+    parser.add_argument('--features', choices=['base', 'enhanced'], default='enhanced')
+    parser.add_argument('--data', nargs='*', help='Labelled CSV/JSONL/Parquet exports (default: synthetic)')
+    parser.add_argument('--n-estimators', type=_int_list, default=DEFAULT_GRID['n_estimators'])
+    parser.add_argument('--max-samples', type=_int_list, default=DEFAULT_GRID['max_samples'])
+    parser.add_argument('--contamination', type=_float_list, default=DEFAULT_GRID['contamination'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--holdout', type=float, default=0.3)
+    parser.add_argument('--batch-rows', type=int, default=1000)
+    parser.add_argument('--output', help='Write all results and the frontier as JSON')
+    args = parser.parse_args()
+
+    features = ENHANCED_FEATURES if args.features == 'enhanced' else BASE_FEATURES
+    grid = {'n_estimators': args.n_estimators, 'max_samples': args.max_samples,
+            'contamination': args.contamination}
+    n_candidates = len(args.n_estimators) * len(args.max_samples) * len(args.contamination)
+
+    print("=" * 80)
+    print(f"🔬 LifeLink - Fake detector sweep ({n_candidates} candidates, {args.workers} workers)")
+    print("=" * 80)
+
+    X, y = load_labelled_rows(features, args.data)
+    results = run_sweep(X, y, grid, workers=args.workers, holdout=args.holdout, batch_rows=args.batch_rows)
+    frontier = pareto_frontier(results)
+
+    print(f"\n📈 Pareto frontier (F1 vs single-row latency vs size), {len(frontier)} of {len(results)}:")
+    print(f"   {'trees':>5} {'samples':>7} {'contam':>6} | {'prec':>6} {'recall':>6} {'f1':>6} | "
+          f"{'1 row ms':>8} {'batch ms':>8} | {'size KB':>8}")
+    for r in frontier:
+        print(f"   {r['n_estimators']:>5} {r['max_samples']:>7} {r['contamination']:>6} | "
+              f"{r['precision']:>6.3f} {r['recall']:>6.3f} {r['f1']:>6.3f} | "
+              f"{r['single_row_ms']:>8.3f} {r['batch_ms']:>8.3f} | {r['model_bytes'] / 1024:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'features': features, 'rows': len(X), 'results': results, 'frontier': frontier}, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Shared fixtures; also makes the flat ml/ modules importable from any directory"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ML_DIR not in sys.path:
+    sys.path.insert(0, ML_DIR)
+
+# Keep the app's persistent learning store out of the source tree
+os.environ.setdefault('LEARNING_STORE_PATH', os.path.join(tempfile.mkdtemp(), 'learning_store.bin'))
+# ...and start from an empty model registry, so the builtin model is served
+os.environ.setdefault('MODEL_REGISTRY_PATH', os.path.join(tempfile.mkdtemp(), 'registry'))
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.mkdtemp(), 'metrics'))
+os.environ.setdefault('DONOR_LOCATIONS_PATH', os.path.join(tempfile.mkdtemp(), 'donor_locations.npz'))
+os.environ.setdefault('DONOR_TABLE_PATH', os.path.join(tempfile.mkdtemp(), 'donor_table.npz'))
+os.environ.setdefault('WEIGHTS_PATH', os.path.join(tempfile.mkdtemp(), 'scorer_weights.npz'))
+os.environ.setdefault('SKETCH_DIR', os.path.join(tempfile.mkdtemp(), 'score_sketches'))
+os.environ.setdefault('PROFILE_DIR', os.path.join(tempfile.mkdtemp(), 'profiles'))
+
+
+@pytest.fixture
+def ml_app(monkeypatch):
+    """The Flask app module with the committed model artifacts loaded"""
+    import app as ml_app_module
+
+    monkeypatch.chdir(ML_DIR)
+    assert ml_app_module.load_model()
+    return ml_app_module
+
+
+@pytest.fixture
+def client(ml_app):
+    return ml_app.app.test_client()
@@ -0,0 +1,200 @@
+"""
+Parity tests: the columnar scoring engine must reproduce the original
+per-donor scoring path exactly (values, reasons and ranking order)
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+import agent_scorer
+from agent_scorer import AgentScorer
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+
+
+def per_donor_score(scorer, donors_data, request_context):
+    """The original score_donors loop, kept here as the reference implementation"""
+    scored_donors = []
+    for donor in donors_data:
+        score_breakdown = scorer._calculate_score(donor, request_context)
+        if score_breakdown['eligibility'] == 0 or score_breakdown['blood_match'] == 0:
+            continue  # Pruned before scoring
+        prediction = scorer._predict_donor_behavior(donor, request_context)
+        scored_donors.append({
+            'donor_id': donor.get('donor_id'),
+            'total_score': score_breakdown['total'],
+            'confidence': score_breakdown['confidence'],
+            'score_breakdown': score_breakdown,
+            'predictions': prediction,
+            'reason': scorer._generate_reason(score_breakdown, prediction)
+        })
+    scored_donors.sort(key=lambda x: x['total_score'], reverse=True)
+    return scored_donors
+
+
+def make_donors(n, seed):
+    rng = random.Random(seed)
+    donors = []
+    for i in range(n):
+        donor = {
+            'donor_id': f'donor-{i}',
+            'blood_group': rng.choice(BLOOD_GROUPS),
+            # Coarse values produce plenty of score ties and half-way roundings
+            'distance': rng.choice([rng.randint(0, 30), round(rng.uniform(0, 25), 1), 0.3, 4.99, 5]),
+            'reliability_score': rng.choice([rng.randint(0, 100), round(rng.uniform(0, 100), 2)]),
+            'can_donate': rng.random() < 0.6,
+            'days_since_last_donation': rng.randint(0, 400),
+            'is_available': rng.random() < 0.7,
+            'last_active_hours': rng.choice([0.5, 2, 5.9, 6, 12, 48])
+        }
+        # Exercise the defaults for missing fields
+        for key in ('distance', 'reliability_score', 'last_active_hours', 'days_since_last_donation'):
+            if rng.random() < 0.05:
+                del donor[key]
+        donors.append(donor)
+    return donors
+
+
+def make_scorer(donors, seed):
+    rng = random.Random(seed)
+    scorer = AgentScorer()
+    for donor in donors:
+        if rng.random() < 0.3:
+            for _ in range(rng.randint(1, 3)):
+                scorer.update_learning_data(donor['donor_id'], rng.uniform(1, 60), rng.random() < 0.5)
+    return scorer
+
+
+def freeze_hour(monkeypatch, hour):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 1, hour, 30)
+
+    monkeypatch.setattr(agent_scorer, 'datetime', FrozenDatetime)
+
+
+@pytest.mark.parametrize('hour', [3, 8, 12, 20])
+@pytest.mark.parametrize('urgency', ['normal', 'urgent', 'critical'])
+def test_columnar_matches_per_donor_path(monkeypatch, hour, urgency):
+    freeze_hour(monkeypatch, hour)
+    donors = make_donors(500, seed=hour)
+    scorer = make_scorer(donors, seed=hour)
+    context = {'blood_group': 'O+', 'urgency': urgency}
+
+    assert scorer.score_donors(donors, context) == per_donor_score(scorer, donors, context)
+
+
+def test_ranking_keeps_input_order_for_ties(monkeypatch):
+    freeze_hour(monkeypatch, 12)
+    donor = {'blood_group': 'A+', 'distance': 2, 'reliability_score': 80,
+             'can_donate': True, 'is_available': True, 'last_active_hours': 0.5}
+    donors = [dict(donor, donor_id=str(i)) for i in range(20)]
+    scorer = AgentScorer()
+    context = {'blood_group': 'A+', 'urgency': 'normal'}
+
+    ranked = scorer.score_donors(donors, context)
+
+    assert [d['donor_id'] for d in ranked] == [str(i) for i in range(20)]
+
+
+def test_empty_pool():
+    assert AgentScorer().score_donors([], {'urgency': 'critical'}) == []
+
+
+def test_round_column_matches_builtin_round():
+    rng = random.Random(7)
+    # Three-decimal values ending in 5 are the half-way cases np.round can get wrong
+    values = [rng.randint(0, 200000) / 1000 for _ in range(20000)]
+    values += [rng.randint(0, 20000) / 1000 + 0.0005 for _ in range(2000)]
+    values += [rng.uniform(-50, 150) for _ in range(5000)]
+
+    for ndigits in (1, 2):
+        expected = [round(value, ndigits) for value in values]
+        assert agent_scorer._round_column(values, ndigits).tolist() == expected
+
+
+@pytest.mark.parametrize('top_k', [1, 7, 10, 50, 499, 500, 1000])
+def test_rank_donors_is_prefix_of_full_ranking(monkeypatch, top_k):
+    freeze_hour(monkeypatch, 12)
+    donors = make_donors(500, seed=top_k)
+    scorer = make_scorer(donors, seed=top_k)
+    context = {'blood_group': 'A+', 'urgency': 'critical'}
+
+    ranked, positions = scorer.rank_donors(donors, context, top_k)
+
+    assert ranked == scorer.score_donors(donors, context)[:top_k]
+    assert [donors[i]['donor_id'] for i in positions] == [d['donor_id'] for d in ranked]
+
+
+@pytest.mark.parametrize('urgency', ['normal', 'urgent', 'critical'])
+@pytest.mark.parametrize('top_k', [None, 3, 25])
+def test_match_donors_equals_score_then_recommend(monkeypatch, urgency, top_k):
+    freeze_hour(monkeypatch, 12)
+    donors = make_donors(200, seed=11)
+    scorer = make_scorer(donors, seed=11)
+    context = {'blood_group': 'O+', 'urgency': urgency}
+
+    scored, strategy = scorer.match_donors(donors, context, top_k)
+    full = scorer.score_donors(donors, context)
+
+    assert scored == full[:top_k]
+    assert strategy == scorer.recommend_strategy(full, context)
+
+
+def test_compatibility_table():
+    from blood_compatibility import BLOOD_GROUPS as GROUPS, compatible_mask, is_compatible
+
+    assert compatible_mask(GROUPS, 'AB+').all()
+    assert compatible_mask(GROUPS, 'O-').tolist() == [group == 'O-' for group in GROUPS]
+    assert compatible_mask(['O-', 'O+', 'A-', 'A+', 'B+', 'AB-'], 'A+').tolist() == [True, True, True, True, False, False]
+    assert not is_compatible('B+', 'O-') and is_compatible('o-', 'B+')
+    # Unknown groups are scored rather than dropped
+    assert compatible_mask([None, 'unknown'], 'O-').all() and is_compatible('B+', None)
+
+
+def test_blood_match_ignores_case_and_spaces(monkeypatch):
+    freeze_hour(monkeypatch, 12)
+    donors = [{'donor_id': group, 'blood_group': group, 'can_donate': True}
+              for group in ('o+', ' O+ ', 'o-', 'A+', 'AB+', None)]
+    context = {'blood_group': ' O+', 'urgency': 'normal'}
+    scorer = AgentScorer()
+
+    scored = {d['donor_id']: d['score_breakdown']['blood_match'] for d in scorer.score_donors(donors, context)}
+    assert scored == {'o+': 100, ' O+ ': 100, 'o-': 85, None: 70}
+    columns = {'donor_id': [d['donor_id'] for d in donors], 'blood_group': [d['blood_group'] for d in donors],
+               'can_donate': [True] * len(donors)}
+    assert scorer.score_donor_columns(columns, context) == scorer.score_donors(donors, context)
+    assert {d['donor_id']: d['score_breakdown']['blood_match'] for d in per_donor_score(scorer, donors, context)} \
+        == scored
+
+
+def test_blood_match_without_a_recipient_group(monkeypatch):
+    freeze_hour(monkeypatch, 12)
+    donors = [{'donor_id': str(group), 'blood_group': group, 'can_donate': True} for group in ('A+', 'O-', None)]
+    scorer = AgentScorer()
+
+    scored = scorer.score_donors(donors, {'urgency': 'normal'})
+
+    assert {d['donor_id']: d['score_breakdown']['blood_match'] for d in scored} == {'A+': 70, 'O-': 70, 'None': 100}
+
+
+def test_incompatible_and_ineligible_donors_are_pruned(monkeypatch):
+    freeze_hour(monkeypatch, 12)
+    donors = [
+        {'donor_id': 'b-pos', 'blood_group': 'B+', 'can_donate': True},
+        {'donor_id': 'recent', 'blood_group': 'O-', 'can_donate': False, 'days_since_last_donation': 30},
+        {'donor_id': 'o-neg', 'blood_group': 'O-', 'can_donate': True},
+        {'donor_id': 'soon', 'blood_group': 'O-', 'can_donate': False, 'days_since_last_donation': 75}
+    ]
+    context = {'blood_group': 'O-', 'urgency': 'normal'}
+    scorer = AgentScorer()
+
+    ranked, positions = scorer.rank_donors(donors, context, 10)
+    assert [d['donor_id'] for d in ranked] == ['o-neg', 'soon'] and positions == [2, 3]
+    columns = {key: [d.get(key, 0) for d in donors] for key in ('donor_id', 'blood_group', 'can_donate',
+                                                                  'days_since_last_donation')}
+    assert scorer.score_donor_columns(columns, context) == scorer.score_donors(donors, context)
+    assert scorer.match_donors(donors[:2], context) == ([], scorer._strategy_for(context, 0, 0))
@@ -0,0 +1,98 @@
+"""Flask endpoint tests for the ML inference API"""
+
+import pytest
+
+SAMPLE_FEATURES = [
+    [0, 180, 720, 0],
+    [5, 7, 2, 5],
+    [1, 45, 48, 1],
+    [9, 1, 0, 9],
+]
+
+
+def test_predict_batch_matches_single_predictions(client):
+    response = client.post('/predict-batch', json={'features': SAMPLE_FEATURES})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == len(SAMPLE_FEATURES)
+
+    for row, result in zip(SAMPLE_FEATURES, body['results']):
+        single = client.post('/predict', json={'features': row}).get_json()
+        assert result['prediction'] == single['prediction']
+        assert result['score'] == pytest.approx(single['score'])
+        assert result['features_received'] == row
+
+
+def test_predict_batch_label_agrees_with_forest(ml_app, client):
+    import numpy as np
+
+    body = client.post('/predict-batch', json={'features': SAMPLE_FEATURES}).get_json()
+    labels = ml_app.model.predict(ml_app.scaler.transform(np.array(SAMPLE_FEATURES, dtype=float)))
+
+    assert [r['prediction'] for r in body['results']] == ['fake' if l == -1 else 'genuine' for l in labels]
+
+
+@pytest.mark.parametrize('features', [
+    [],
+    [1, 2, 3, 4],
+    [[1, 2, 3]],
+    [[1, 2, 3, 4], [1, 2, 3]],
+    [[1, 2, 3, 'x']],
+])
+def test_predict_batch_rejects_bad_rows(client, features):
+    response = client.post('/predict-batch', json={'features': features})
+
+    assert response.status_code == 400
+
+
+def test_rank_donors_returns_top_k_with_positions(client):
+    donors = [
+        {'donor_id': str(i), 'blood_group': 'A+', 'distance': i, 'reliability_score': 70,
+         'can_donate': True, 'is_available': True, 'last_active_hours': 2}
+        for i in range(30)
+    ]
+    context = {'blood_group': 'A+', 'urgency': 'urgent'}
+
+    body = client.post('/rank-donors', json={'donors': donors, 'request_context': context, 'top_k': 5}).get_json()
+
+    assert body['total_donors'] == 30
+    assert [r['donor_id'] for r in body['rankings']] == ['0', '1', '2', '3', '4']
+    assert [r['index'] for r in body['rankings']] == [0, 1, 2, 3, 4]
+
+
+def test_update_learning_batch_acknowledges_once(ml_app, client):
+    events = [
+        {'donor_id': 'batch-a', 'response_time_minutes': 10, 'success': True, 'timestamp': '2024-01-01T10:00:00Z'},
+        {'donor_id': 'batch-a', 'response_time_minutes': 20, 'success': False, 'timestamp': '2024-01-01T11:00:00Z'},
+        {'donor_id': 'batch-b', 'response_time_minutes': 5, 'success': True},
+    ]
+
+    body = client.post('/update-learning-batch', json={'events': events}).get_json()
+
+    assert body == {'success': True, 'message': 'Learning data updated', 'events_applied': 3, 'donors_updated': 2}
+    assert ml_app.agent_scorer.avg_response_times['batch-a'] == pytest.approx(10 * 0.7 + 20 * 0.3)
+    assert ml_app.agent_scorer.success_rates['batch-a'] == pytest.approx(0.8)
+
+
+def test_update_learning_rejects_non_numeric_response_time(ml_app, client):
+    for value in ('soon', None, [5]):
+        response = client.post('/update-learning', json={'donor_id': 'bad-time', 'response_time_minutes': value})
+        assert response.status_code == 400 and 'response_time_minutes' in response.get_json()['message']
+    assert 'bad-time' not in ml_app.agent_scorer.avg_response_times
+
+    assert client.post('/update-learning', json={'donor_id': 'str-time', 'response_time_minutes': '12.5',
+                                                 'success': True}).status_code == 200
+    assert ml_app.agent_scorer.avg_response_times['str-time'] == pytest.approx(12.5)
+
+
+def test_update_learning_batch_rejects_bad_events(ml_app, client):
+    events = [
+        {'donor_id': 'bad-ts-a', 'response_time_minutes': 10, 'success': True},
+        {'donor_id': 'bad-ts-b', 'response_time_minutes': 10, 'success': True, 'timestamp': 'yesterday'},
+    ]
+
+    response = client.post('/update-learning-batch', json={'events': events})
+
+    assert response.status_code == 400 and 'Event 1' in response.get_json()['message']
+    assert 'bad-ts-a' not in ml_app.agent_scorer.avg_response_times
@@ -0,0 +1,40 @@
+"""Benchmark suite smoke tests"""
+
+import benchmark
+
+
+def test_suite_reports_latency_throughput_and_memory(monkeypatch):
+    monkeypatch.chdir(benchmark.ML_DIR)
+    monkeypatch.setenv('RESULT_CACHE_SIZE', '0')
+    monkeypatch.setenv('MODEL_WATCH_SECONDS', '0')
+
+    report = benchmark.run_suite(['score_donors', 'recommend_strategy', 'update_learning_data'],
+                                 sizes=[10, 50], min_seconds=0.01, log=lambda line: None)
+
+    assert [(r['case'], r['size']) for r in report['results']] == [
+        ('score_donors', 10), ('score_donors', 50),
+        ('recommend_strategy', 10), ('recommend_strategy', 50),
+        ('update_learning_data', 10), ('update_learning_data', 50)]
+    for result in report['results']:
+        assert result['calls'] >= 3
+        assert 0 < result['p50_ms'] <= result['p95_ms'] <= result['p99_ms'] <= result['max_ms']
+        assert result['items_per_s'] > 0
+        assert result['peak_memory_mb'] is not None
+
+
+def test_find_regressions_uses_margin():
+    baseline = {'results': [
+        {'case': 'score_donors', 'size': 100, 'p50_ms': 1.0},
+        {'case': 'score_donors', 'size': 1000, 'p50_ms': 10.0},
+    ]}
+    results = [
+        {'case': 'score_donors', 'size': 100, 'p50_ms': 1.2},
+        {'case': 'score_donors', 'size': 1000, 'p50_ms': 13.0},
+        {'case': 'flask_predict', 'size': 1, 'p50_ms': 5.0},
+    ]
+
+    regressions = benchmark.find_regressions(results, baseline, margin=0.25)
+
+    assert [(r['case'], r['size']) for r in regressions] == [('score_donors', 1000)]
+    assert regressions[0]['change'] == 0.3
+    assert benchmark.find_regressions(results, baseline, margin=0.5) == []
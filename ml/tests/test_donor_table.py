@@ -0,0 +1,129 @@
+"""Resident donor feature table, deltas and scoring by donor id"""
+
+import pytest
+
+from agent_scorer import AgentScorer
+from benchmark import REQUEST_CONTEXT, make_donors
+from donor_table import DonorTable, StaleVersionError
+from learning_store import LearningStore
+
+
+def _scored(scored_donors):
+    return [(d['donor_id'], d['total_score']) for d in scored_donors]
+
+
+def _without_distance(donors):
+    # Distances depend on the request, so the table does not keep them
+    return [{key: value for key, value in donor.items() if key != 'distance'} for donor in donors]
+
+
+def test_columns_score_like_the_full_records():
+    donors = make_donors(300, seed=3)
+    table = DonorTable()
+    table.load_snapshot(donors)
+    scorer = AgentScorer(LearningStore(capacity=1000))
+
+    ids = [d['donor_id'] for d in donors[::-3]]
+    columns, unknown = table.columns(ids)
+    assert unknown == 0
+    by_id = {d['donor_id']: d for d in donors}
+    assert _scored(scorer.score_donor_columns(columns, REQUEST_CONTEXT)) == \
+        _scored(scorer.score_donors(_without_distance(by_id[i] for i in ids), REQUEST_CONTEXT))
+
+    eligible, _ = table.columns()
+    assert eligible['donor_id'] == [d['donor_id'] for d in donors if d['can_donate']]
+
+
+def test_delta_keeps_unsent_fields_and_checks_the_version():
+    table = DonorTable()
+    version = table.load_snapshot([{'donor_id': 'a', 'blood_group': 'O-', 'reliability_score': 90, 'can_donate': True},
+                                   {'donor_id': 'b', 'can_donate': True}])
+
+    version = table.apply_delta([{'donor_id': 'a', 'is_available': True}, {'donor_id': 'c', 'distance': 2}],
+                                ['b'], base_version=version)
+    columns, unknown = table.columns(['a', 'c', 'b'])
+    assert unknown == 1
+    assert columns['blood_group'] == ['O-', None, None]
+    assert columns['reliability_score'].tolist() == [90, 50, 50]
+    assert columns['is_available'].tolist() == [True, False, False]
+    assert table.columns()[0]['donor_id'] == ['a']
+
+    with pytest.raises(StaleVersionError):
+        table.apply_delta([{'donor_id': 'a', 'can_donate': False}], base_version=version - 1)
+    assert table.version == version
+    with pytest.raises(ValueError):
+        table.load_snapshot([{'blood_group': 'A+'}])
+
+
+@pytest.mark.parametrize('field, value', [('reliability_score', None), ('days_since_last_donation', 'soon'),
+                                          ('can_donate', None), ('blood_group', 7)])
+def test_bad_values_are_rejected_before_any_change(client, field, value):
+    version = client.post('/donor-table/snapshot', json={'donors': [{'donor_id': 'a', 'can_donate': True}]}
+                          ).get_json()['version']
+
+    response = client.post('/donor-table/delta', json={
+        'base_version': version, 'remove': ['a'],
+        'upsert': [{'donor_id': 'b', 'reliability_score': 80}, {'donor_id': 'c', field: value}]})
+
+    assert response.status_code == 400 and field in response.get_json()['message']
+    assert client.get('/donor-table').get_json()['version'] == version
+    assert client.post('/donor-table/snapshot', json={'donors': [{'donor_id': 'c', field: value}]}).status_code == 400
+
+
+def test_table_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'donor_table.npz')
+    writer, reader = DonorTable(path, flush_seconds=60), DonorTable(path, flush_seconds=60)
+
+    writer.load_snapshot(make_donors(20))
+    assert len(reader) == 0 and writer.stats()['pending_changes'] == 1
+    writer.flush()
+    reader.apply_delta([{'donor_id': 'donor-0', 'reliability_score': 7}], base_version=1)
+    reader.flush()
+    assert writer.columns(['donor-0'])[0]['reliability_score'].tolist() == [7]
+    assert DonorTable(path).stats() == writer.stats()
+    assert reader.stats()['snapshot_id'] == writer.stats()['snapshot_id']
+
+
+def test_pending_deltas_are_replayed_over_another_workers_flush(tmp_path):
+    path = str(tmp_path / 'donor_table.npz')
+    first, second = DonorTable(path, flush_seconds=60), DonorTable(path, flush_seconds=60)
+    first.load_snapshot([{'donor_id': 'a', 'reliability_score': 10}, {'donor_id': 'b', 'reliability_score': 20}])
+    first.flush()
+
+    second.apply_delta([{'donor_id': 'b', 'reliability_score': 25}], base_version=1)
+    first.apply_delta([{'donor_id': 'c', 'can_donate': True}], ['a'], base_version=1)
+    first.flush()
+
+    # Another worker's flush is merged under this worker's pending delta
+    columns, unknown = second.columns(['a', 'b', 'c'])
+    assert unknown == 1 and columns['reliability_score'].tolist() == [50, 25, 50]
+    second.flush()
+    assert first.columns(['b'])[0]['reliability_score'].tolist() == [25]
+    assert len(first) == len(second) == 2 and first.stats()['pending_changes'] == 0
+
+
+def test_scoring_endpoints_accept_donor_ids(client):
+    donors = make_donors(50, seed=4)
+    response = client.post('/donor-table/snapshot', json={'donors': donors})
+    assert response.status_code == 200
+    version = response.get_json()['version']
+
+    ids = [d['donor_id'] for d in donors[:10]]
+    full = client.post('/score-donors', json={'donors': _without_distance(donors[:10]),
+                                              'request_context': REQUEST_CONTEXT}).get_json()
+    by_id = client.post('/score-donors', json={'donor_ids': ids, 'request_context': REQUEST_CONTEXT}).get_json()
+    assert _scored(by_id['scored_donors']) == _scored(full['scored_donors'])
+    assert by_id['donor_table_version'] == version and by_id['unknown_donors'] == 0
+
+    matched = client.post('/match', json={'donor_ids': None, 'request_context': REQUEST_CONTEXT}).get_json()
+    assert matched['total_donors'] == sum(d['can_donate'] for d in donors)
+
+    delta = {'base_version': version, 'upsert': [{'donor_id': ids[0], 'can_donate': False}]}
+    assert client.post('/donor-table/delta', json=delta).get_json()['version'] == version + 1
+    stale = client.post('/donor-table/delta', json=delta)
+    assert stale.status_code == 409 and stale.get_json()['version'] == version + 1
+    assert 'route="/donor-table/delta",status="409"' in client.get('/metrics').get_data(as_text=True)
+
+    assert client.post('/donor-table/delta', json={'upsert': []}).status_code == 400
+    assert client.post('/score-donors', json={'donor_ids': 'x', 'request_context': {}}).status_code == 400
+    assert client.get('/donor-table').get_json()['donors'] == 50
@@ -0,0 +1,40 @@
+"""Parity tests for the flat-array IsolationForest evaluator"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from flat_forest import FlatForest
+
+
+def _feature_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 10, n), rng.integers(0, 365, n),
+        rng.integers(0, 8760, n), rng.integers(0, 10, n)
+    ]).astype(float)
+
+
+def test_matches_trained_detector(ml_app):
+    flat = FlatForest.from_sklearn(ml_app.model, ml_app.scaler)
+    X = _feature_rows(500)
+
+    expected = ml_app.model.decision_function(ml_app.scaler.transform(X))
+    np.testing.assert_allclose(flat.decision_function(X), expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(flat.decision_function(X[0]), expected[:1], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('max_features', [1.0, 0.5])
+def test_matches_sklearn_for_wider_forests(max_features):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(2000, 8)) * [1, 10, 100, 1, 5, 50, 2, 3]
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=60, max_samples=512, max_features=max_features,
+                            random_state=0).fit(scaler.transform(X))
+
+    flat = FlatForest.from_sklearn(model, scaler)
+
+    expected = model.decision_function(scaler.transform(X))
+    np.testing.assert_allclose(flat.decision_function(X), expected, rtol=0, atol=1e-9)
+    assert ((flat.decision_function(X) < 0) == (model.predict(scaler.transform(X)) == -1)).all()
@@ -0,0 +1,146 @@
+"""Donor location index and distances computed from request_context.location"""
+
+import numpy as np
+import pytest
+
+from agent_scorer import AgentScorer
+from geo_index import DonorGeoIndex, haversine_km, parse_location
+from learning_store import LearningStore
+
+BANGALORE = (12.9716, 77.5946)
+
+
+def _random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return ([f'donor-{i}' for i in range(n)],
+            BANGALORE[0] + rng.uniform(-0.5, 0.5, n), BANGALORE[1] + rng.uniform(-0.5, 0.5, n))
+
+
+def test_parse_location_shapes():
+    assert parse_location({'lat': 12.9, 'lng': 77.5}) == (12.9, 77.5)
+    assert parse_location({'type': 'Point', 'coordinates': [77.5, 12.9]}) == (12.9, 77.5)
+    assert parse_location({'latitude': '12.9', 'longitude': '77.5'}) == (12.9, 77.5)
+    assert parse_location({'lat': 120, 'lng': 0}) is None
+    assert parse_location(None) is None
+
+
+def test_haversine_known_distance():
+    # Bangalore -> Chennai is about 290 km great-circle
+    assert haversine_km(*BANGALORE, [13.0827], [80.2707])[0] == pytest.approx(290, abs=5)
+    assert haversine_km(*BANGALORE, [BANGALORE[0]], [BANGALORE[1]])[0] == 0
+
+
+@pytest.mark.parametrize('brute_force_max', [0, 10 ** 6])
+def test_queries_match_a_full_scan(brute_force_max):
+    ids, lats, lngs = _random_points(3000)
+    index = DonorGeoIndex(brute_force_max=brute_force_max)
+    index.replace(ids, lats, lngs)
+    expected = haversine_km(*BANGALORE, lats, lngs)
+
+    found, distances = index.radius(*BANGALORE, 10)
+    within = np.flatnonzero(expected <= 10)
+    assert sorted(found) == sorted(ids[i] for i in within)
+    assert np.all(np.diff(distances) >= 0)
+
+    found, distances = index.nearest(*BANGALORE, 25)
+    assert found == [ids[i] for i in np.argsort(expected, kind='stable')[:25]]
+    assert np.allclose(distances, np.sort(expected)[:25])
+
+    found, _ = index.nearest(*BANGALORE, 25, max_km=1)
+    assert len(found) == np.count_nonzero(expected <= 1)
+
+
+def test_upsert_remove_and_lookup():
+    index = DonorGeoIndex()
+    index.upsert(['a', 'b'], [12.97, 13.0], [77.59, 77.6])
+    index.upsert(['b'], [12.97], [77.59])
+    assert index.remove(['a', 'missing']) == 1
+
+    assert len(index) == 1
+    distances = index.distances(*BANGALORE, ['b', 'a'])
+    assert distances[0] < 1 and np.isnan(distances[1])
+    with pytest.raises(ValueError):
+        index.upsert(['c'], [91], [0])
+
+
+def test_snapshot_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'donor_locations.npz')
+    writer, reader = DonorGeoIndex(path, flush_seconds=60), DonorGeoIndex(path, flush_seconds=60)
+
+    writer.upsert(['a'], [12.97], [77.59])
+    writer.flush()
+    assert reader.nearest(*BANGALORE, 1)[0] == ['a']
+
+    reader.upsert(['b'], [12.98], [77.60])
+    reader.flush()
+    writer.remove(['a'])
+    writer.flush()
+    assert sorted(DonorGeoIndex(path).nearest(*BANGALORE, 5)[0]) == ['b']
+    assert reader.version == writer.version == 3
+
+
+def test_writes_stay_in_memory_until_flushed(tmp_path):
+    path = str(tmp_path / 'donor_locations.npz')
+    first, second = DonorGeoIndex(path, flush_seconds=60), DonorGeoIndex(path, flush_seconds=60)
+
+    first.upsert(['a', 'b'], [12.97, 12.98], [77.59, 77.60])
+    assert not (tmp_path / 'donor_locations.npz').exists()
+    assert len(first) == 2 and first.stats()['pending_changes'] == 1
+
+    # Another worker's flush is merged under this worker's pending changes
+    second.upsert(['c'], [12.99], [77.61])
+    second.flush()
+    version = first.version
+    first.remove(['b'])
+    assert sorted(first.nearest(*BANGALORE, 5)[0]) == ['a', 'c']
+    assert first.version > version
+
+    first.flush()
+    assert first.stats()['pending_changes'] == 0
+    assert sorted(DonorGeoIndex(path).nearest(*BANGALORE, 5)[0]) == ['a', 'c']
+    assert sorted(second.nearest(*BANGALORE, 5)[0]) == ['a', 'c']
+
+
+def test_scorer_fills_missing_distances():
+    index = DonorGeoIndex()
+    index.upsert(['indexed'], [12.98], [77.60])
+    scorer = AgentScorer(LearningStore(capacity=100), index)
+    context = {'blood_group': 'A+', 'urgency': 'critical', 'location': {'lat': BANGALORE[0], 'lng': BANGALORE[1]}}
+    donors = [
+        {'donor_id': 'sent', 'blood_group': 'A+', 'distance': 3.0},
+        {'donor_id': 'own', 'blood_group': 'A+', 'location': {'type': 'Point', 'coordinates': [77.59, 12.97]}},
+        {'donor_id': 'indexed', 'blood_group': 'A+'},
+        {'donor_id': 'unknown', 'blood_group': 'A+'}
+    ]
+
+    columns = scorer._donor_columns(donors, context)
+    assert columns['distance'][0] == 3.0
+    assert columns['distance'][1] < 1
+    assert columns['distance'][2] == pytest.approx(haversine_km(*BANGALORE, [12.98], [77.60])[0])
+    assert columns['distance'][3] == 999
+
+    by_columns = scorer._table_columns({'donor_id': ['indexed', 'unknown']}, context)
+    assert by_columns['distance'].tolist() == columns['distance'][2:].tolist()
+
+
+def test_location_endpoints(client):
+    ids, lats, lngs = _random_points(500, seed=1)
+    donors = [{'donor_id': d, 'location': {'type': 'Point', 'coordinates': [lng, lat]}}
+              for d, lat, lng in zip(ids, lats.tolist(), lngs.tolist())]
+    response = client.post('/donor-locations', json={'donors': donors, 'replace': True})
+    assert response.status_code == 200 and response.get_json()['donors'] == 500
+
+    body = {'location': {'lat': BANGALORE[0], 'lng': BANGALORE[1]}, 'k': 5}
+    nearest = client.post('/nearby-donors', json=body).get_json()['donors']
+    expected = np.argsort(haversine_km(*BANGALORE, lats, lngs))[:5]
+    assert [d['donor_id'] for d in nearest] == [ids[i] for i in expected]
+
+    # Scoring without distances uses the index
+    scored = client.post('/score-donors', json={
+        'donors': [{'donor_id': nearest[0]['donor_id'], 'blood_group': 'A+'}],
+        'request_context': {'blood_group': 'A+', 'urgency': 'normal', 'location': body['location']}
+    }).get_json()['scored_donors']
+    assert scored[0]['score_breakdown']['distance'] == pytest.approx(100 - nearest[0]['distance'] * 5, abs=0.1)
+
+    assert client.post('/nearby-donors', json={'location': body['location']}).status_code == 400
+    assert client.post('/donor-locations', json={'donors': [{'donor_id': 'x'}]}).status_code == 400
@@ -0,0 +1,116 @@
+"""Learning store tests: EMA semantics, persistence, sharing and eviction"""
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from learning_store import LearningStore
+
+
+def test_ema_matches_original_dict_rules():
+    store = LearningStore(capacity=8)
+    store.update('a', 20, True)
+    store.update('a', 10, False)
+    store.update('b', 5, False)
+
+    assert store.avg_response_times['a'] == pytest.approx(20 * 0.7 + 10 * 0.3)
+    assert store.success_rates['a'] == pytest.approx(1.0 * 0.8)
+    assert store.success_rates['b'] == 0.5
+    assert 'c' not in store.avg_response_times
+    assert store.avg_response_times.get('c', 30) == 30
+
+
+def test_file_store_survives_reopen(tmp_path):
+    path = str(tmp_path / 'store.bin')
+    store = LearningStore(path, capacity=16)
+    store.update('507f1f77bcf86cd799439011', 12, True)
+    store.flush()
+    del store
+
+    reopened = LearningStore(path, capacity=999)
+
+    assert reopened.capacity == 16
+    assert reopened.avg_response_times['507f1f77bcf86cd799439011'] == 12
+
+
+def _write_from_child(path):
+    LearningStore(path).update('from-child', 7, True)
+
+
+def test_writes_are_visible_to_other_processes(tmp_path):
+    path = str(tmp_path / 'store.bin')
+    store = LearningStore(path, capacity=16)
+    assert 'from-child' not in store
+
+    process = multiprocessing.get_context('fork').Process(target=_write_from_child, args=(path,))
+    process.start()
+    process.join()
+
+    assert process.exitcode == 0
+    assert store.avg_response_times['from-child'] == 7
+
+
+def test_ttl_eviction():
+    now = time.time()
+    store = LearningStore(capacity=8, ttl_seconds=100)
+    store.update('old', 10, True, timestamp=now - 150)
+    store.update('new', 10, True, timestamp=now - 50)
+
+    assert store.evict_expired(now=now) == 1
+    assert 'old' not in store
+    assert 'new' in store
+
+
+def test_back_dated_events_do_not_trigger_eviction():
+    store = LearningStore(capacity=8, ttl_seconds=100)
+    store.update_many(['a', 'b'], [10, 20], [True, False], [1000, 1001])
+
+    assert {'a', 'b'} <= set(store.avg_response_times)
+
+
+def test_full_store_evicts_oldest_feedback():
+    store = LearningStore(capacity=3, ttl_seconds=None)
+    for i, donor_id in enumerate(['a', 'b', 'c']):
+        store.update(donor_id, 10, True, timestamp=1000 + i)
+
+    store.update('d', 10, True, timestamp=2000)
+
+    assert len(store) == 3
+    assert 'a' not in store
+    assert {'b', 'c', 'd'} <= set(store.avg_response_times)
+
+
+def test_long_ids_are_hashed_to_fit():
+    store = LearningStore(capacity=4)
+    long_id = 'x' * 100
+    store.update(long_id, 3, True)
+
+    assert store.avg_response_times[long_id] == 3
+    assert 'x' * 99 not in store
+
+
+def test_update_many_matches_sequential_updates():
+    import random
+
+    rng = random.Random(3)
+    events = [(f'd{rng.randint(0, 30)}', rng.uniform(1, 90), rng.random() < 0.5, rng.randint(0, 50))
+              for _ in range(400)]
+
+    sequential = LearningStore(capacity=64, ttl_seconds=None)
+    sequential.update('d1', 40, False, timestamp=0)  # some donors have prior state
+    sequential.update('d2', 5, True, timestamp=0)
+    batched = LearningStore(capacity=64, ttl_seconds=None)
+    batched.update('d1', 40, False, timestamp=0)
+    batched.update('d2', 5, True, timestamp=0)
+
+    # Sequential reference: per donor, timestamp order, input order on ties
+    for donor_id, rt, success, ts in sorted(events, key=lambda e: e[3]):
+        sequential.update(donor_id, rt, success, timestamp=ts)
+    donors = batched.update_many(*map(list, zip(*events)))
+
+    assert donors == len({e[0] for e in events})
+    for donor_id in sequential.avg_response_times:
+        assert batched.avg_response_times[donor_id] == pytest.approx(sequential.avg_response_times[donor_id])
+        assert batched.success_rates[donor_id] == pytest.approx(sequential.success_rates[donor_id])
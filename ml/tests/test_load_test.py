@@ -0,0 +1,51 @@
+"""Load harness tests"""
+
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from load_test import Histogram, LoadRunner, TrafficGenerator, meets_targets
+
+
+def test_synthetic_traffic_is_accepted_by_every_route(client):
+    records = TrafficGenerator(donors=(1, 30), seed=1).records(40)
+
+    assert {r['path'] for r in records} == {'/predict', '/score-donors', '/recommend-strategy', '/update-learning'}
+    for record in records:
+        response = client.post(record['path'], json=record['body'])
+        assert response.status_code == 200, (record['path'], response.get_json())
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram()
+    for ms in [0.5, 1, 3, 3, 7000, 20000]:
+        histogram.observe(ms)
+
+    summary = histogram.summary()
+    assert summary['buckets_ms']['<=1'] == 2
+    assert summary['buckets_ms']['<=5'] == 2
+    assert summary['buckets_ms']['<=10000'] == 1
+    assert summary['buckets_ms']['+Inf'] == 1
+    assert summary['max_ms'] == 20000
+
+
+@pytest.fixture
+def live_server(ml_app):
+    server = make_server('127.0.0.1', 0, ml_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_runner_reports_per_route_latency(live_server):
+    records = TrafficGenerator(donors=(1, 20), seed=2).records(50)
+
+    report = LoadRunner(live_server, max_in_flight=8).run(records, rps=100, duration=0.5)
+
+    assert report['overall']['requests'] == 50
+    assert report['overall']['error_rate'] == 0
+    assert set(report['routes']) <= {'/predict', '/score-donors', '/recommend-strategy', '/update-learning'}
+    assert sum(r['requests'] for r in report['routes'].values()) == 50
+    assert meets_targets(report, min_throughput=0.5)
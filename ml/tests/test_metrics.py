@@ -0,0 +1,77 @@
+"""Prometheus metrics tests"""
+
+import multiprocessing
+import os
+
+import pytest
+
+from metrics import MetricsRegistry
+
+
+def _registry(directory):
+    registry = MetricsRegistry(str(directory))
+    requests = registry.counter('test_requests_total', 'Requests', {'route': ['/a', '/b']})
+    latency = registry.histogram('test_latency_seconds', 'Latency', (0.1, 1.0), {'route': ['/a']})
+    return registry, requests, latency
+
+
+def _record_in_child(directory):
+    _, requests, latency = _registry(directory)
+    requests.inc(2, '/a')
+    latency.observe(0.5, '/a')
+
+
+def test_values_are_summed_across_processes(tmp_path):
+    registry, requests, latency = _registry(tmp_path)
+    requests.inc(1, '/a')
+    requests.inc(1, '/unknown')
+    latency.observe(0.05, '/a')
+
+    context = multiprocessing.get_context('fork')
+    for _ in range(2):
+        child = context.Process(target=_record_in_child, args=(str(tmp_path),))
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+
+    text = registry.render()
+
+    assert 'test_requests_total{route="/a"} 5' in text
+    assert 'test_requests_total{route="other"} 1' in text
+    assert 'test_requests_total{route="/b"}' not in text  # Zero series are left out
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{route="/a"} 3' in text
+    assert 'test_latency_seconds_sum{route="/a"} 1.05' in text
+
+
+def test_files_of_dead_processes_are_removed_on_start(tmp_path):
+    (tmp_path / 'metrics-999999999.json').write_text('{}')
+    (tmp_path / f'metrics-{os.getpid()}.json').write_text('{}')
+
+    MetricsRegistry(str(tmp_path)).remove_dead_files()
+
+    assert sorted(os.listdir(tmp_path)) == [f'metrics-{os.getpid()}.json']
+
+
+def test_metrics_endpoint(client):
+    client.post('/predict', json={'features': [5, 7, 2, 5]})
+    client.post('/predict', json={'features': [1, 2]})
+    client.post('/score-donors', json={
+        'donors': [{'donor_id': str(i), 'distance': i} for i in range(12)],
+        'request_context': {'urgency': 'urgent'}
+    })
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'lifelink_http_requests_total{method="POST",route="/predict",status="200"}' in text
+    assert 'lifelink_http_requests_total{method="POST",route="/predict",status="400"}' in text
+    assert 'lifelink_donors_per_request_bucket{route="/score-donors",le="50"}' in text
+    assert 'lifelink_model_inference_seconds_count{stage="decision_function"}' in text
+    assert 'lifelink_scoring_seconds_count{operation="score_donors"}' in text
+    assert 'lifelink_learning_store_donors ' in text
+    assert 'lifelink_model_info{version="builtin"} 1' in text
@@ -0,0 +1,63 @@
+"""Micro-batcher tests: concurrent rows share one model call and get their own result"""
+
+import threading
+
+import numpy as np
+
+from metrics import MetricsRegistry
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_rows_are_batched_and_routed_back(tmp_path):
+    calls = []
+
+    def score_batch(model, X):
+        calls.append(len(X))
+        return X.sum(axis=1)
+
+    metrics = MetricsRegistry(str(tmp_path))
+    batcher = MicroBatcher(score_batch, window_ms=50, max_batch=8, metrics=metrics)
+    rows = [[i, i, i, i] for i in range(8)]
+    results = [None] * len(rows)
+    start = threading.Barrier(len(rows))
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.score(rows[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [4.0 * i for i in range(8)]
+    assert sum(calls) == 8 and len(calls) < 8
+    stats = batcher.stats()
+    assert stats['batch_size']['count'] == len(calls) and stats['batch_size']['sum'] == 8
+    assert stats['queue_delay_seconds']['count'] == 8
+    assert f'lifelink_micro_batch_size_count {len(calls)}' in metrics.render()
+
+
+def test_rows_are_scored_by_the_model_they_were_submitted_with():
+    calls = []
+
+    def score_batch(model, X):
+        calls.append((model, len(X)))
+        return X.sum(axis=1) * model
+
+    batcher = MicroBatcher(score_batch, window_ms=50, max_batch=8)
+    futures = [batcher.submit([i, 0, 0, 0], model) for i, model in enumerate([1, 10, 1, 10])]
+
+    assert [future.result(timeout=2) for future in futures] == [0.0, 10.0, 2.0, 30.0]
+    assert sorted(calls) == [(1, 2), (10, 2)]
+
+
+def test_errors_reach_every_caller():
+    def score_batch(model, X):
+        raise ValueError('model exploded')
+
+    batcher = MicroBatcher(score_batch, window_ms=1)
+    future = batcher.submit(np.zeros(4))
+
+    assert isinstance(future.exception(timeout=2), ValueError)
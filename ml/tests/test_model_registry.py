@@ -0,0 +1,161 @@
+"""Model registry, hot swap and shadow scoring tests"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import BASE_FEATURES, ENHANCED_FEATURES, ModelBundle, ModelRegistry, RegistryWatcher, save_model_files
+from shadow_scorer import ShadowScorer
+
+
+def _train(n_features=4, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(500, n_features)) * 10 + 50
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=20, contamination=0.2, random_state=seed).fit(scaler.transform(X))
+    return model, scaler
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+
+def test_publish_load_and_pointers(registry):
+    model, scaler = _train()
+    version = registry.publish(model, scaler, BASE_FEATURES, training_stats={'samples': 500})
+
+    assert version == 'v0001'
+    assert registry.publish(*_train(seed=1), BASE_FEATURES) == 'v0002'
+    assert [m['version'] for m in registry.versions()] == ['v0001', 'v0002']
+    assert registry.metadata(version)['training'] == {'samples': 500}
+
+    bundle = registry.load(version)
+    X = np.random.default_rng(2).normal(size=(20, 4)) * 10 + 50
+    np.testing.assert_allclose(bundle.decision_function(X), model.decision_function(scaler.transform(X)),
+                               atol=1e-9)
+
+    assert registry.pointers() == (None, None)
+    registry.set_active('v0002')
+    registry.set_shadow('v0001')
+    assert registry.pointers() == ('v0002', 'v0001')
+    registry.set_shadow(None)
+    assert registry.shadow_version() is None
+
+    with pytest.raises(KeyError):
+        registry.set_active('v0009')
+    with pytest.raises(ValueError):
+        registry.publish(model, scaler, ENHANCED_FEATURES)
+
+
+def test_model_files_are_replaced_whole(tmp_path):
+    paths = str(tmp_path / 'models' / 'fake_detector.pkl'), str(tmp_path / 'models' / 'scaler.pkl')
+    keys = []
+    for seed in (0, 1):
+        model, scaler = _train(seed=seed)
+        save_model_files(model, scaler, *paths)
+        keys.append(ModelBundle.from_files('builtin', *paths, BASE_FEATURES).calibration_key)
+
+    # A model retrained in place gets its own score distribution
+    assert keys[0] != keys[1] and all(key.startswith('builtin@') for key in keys)
+
+    assert sorted(p.name for p in (tmp_path / 'models').iterdir()) == ['fake_detector.pkl', 'scaler.pkl']
+    bundle = ModelBundle.from_files('builtin', *paths, BASE_FEATURES)
+    X = np.random.default_rng(2).normal(size=(20, 4)) * 10 + 50
+    np.testing.assert_allclose(bundle.decision_function(X), model.decision_function(scaler.transform(X)),
+                               atol=1e-9)
+
+
+def test_watcher_reports_pointer_changes(registry):
+    registry.publish(*_train(), BASE_FEATURES)
+    seen = []
+    watcher = RegistryWatcher(registry, lambda *pointers: seen.append(pointers), interval_seconds=0)
+
+    assert watcher.check()
+    assert not watcher.check()
+    registry.set_active('v0001')
+    assert watcher.check()
+    assert seen == [(None, None), ('v0001', None)]
+
+
+def test_shadow_scorer_agreement(registry):
+    registry.publish(*_train(), BASE_FEATURES)
+    candidate = registry.load('v0001')
+    shadow = ShadowScorer()
+    shadow.set_candidate(candidate)
+
+    X = np.random.default_rng(3).normal(size=(50, 4)) * 10 + 50
+    primary = candidate.decision_function(X)
+    primary[:5] = -primary[:5]  # Flip five labels
+    primary[primary == 0] = 1.0
+
+    assert shadow.submit(X, primary)
+    assert not shadow.submit(np.zeros((1, 8)), [0.1])
+    shadow.drain()
+
+    stats = shadow.stats()
+    assert stats['compared'] == 50
+    assert stats['agreed'] == 45
+    assert stats['primary_fake_shadow_genuine'] + stats['primary_genuine_shadow_fake'] == 5
+    assert stats['skipped_feature_mismatch'] == 1
+
+
+@pytest.fixture
+def admin(ml_app, monkeypatch):
+    monkeypatch.setattr(ml_app, 'ADMIN_TOKEN', 'secret')
+    yield ml_app
+    ml_app.model_registry.set_active(None)
+    ml_app.model_registry.set_shadow(None)
+    ml_app.shadow_scorer.set_candidate(None)
+
+
+def test_admin_endpoints_require_token(client):
+    assert client.get('/admin/models').status_code == 403
+    assert client.get('/admin/models', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+
+def test_hot_swap_and_shadow_through_admin_endpoints(admin, client):
+    headers = {'X-Admin-Token': 'secret'}
+    builtin = client.post('/predict', json={'features': [5, 7, 2, 5]}).get_json()
+    builtin_model, builtin_scaler = admin.model, admin.scaler
+
+    enhanced_version = admin.model_registry.publish(*_train(n_features=8), ENHANCED_FEATURES)
+    response = client.post('/admin/models/activate', json={'version': enhanced_version}, headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['active']['version'] == enhanced_version
+    assert admin.model_registry.active_version() == enhanced_version
+
+    # The 8-feature model now serves /predict
+    assert client.post('/predict', json={'features': [5, 7, 2, 5]}).status_code == 400
+    assert client.post('/predict', json={'features': [5, 7, 2, 5, 3, 3, 6, 10]}).status_code == 200
+
+    base_version = admin.model_registry.publish(builtin_model, builtin_scaler, BASE_FEATURES)
+    client.post('/admin/models/activate', json={'version': base_version}, headers=headers)
+    assert client.post('/predict', json={'features': [5, 7, 2, 5]}).get_json()['score'] == \
+        pytest.approx(builtin['score'])
+
+    candidate = admin.model_registry.publish(*_train(seed=4), BASE_FEATURES)
+    response = client.post('/admin/models/shadow', json={'version': candidate}, headers=headers)
+    assert response.status_code == 200
+
+    client.post('/predict-batch', json={'features': [[0, 180, 720, 0], [9, 1, 0, 9]]})
+    admin.shadow_scorer.drain()
+    stats = client.get('/admin/models', headers=headers).get_json()['shadow']
+    assert stats['candidate'] == candidate
+    assert stats['compared'] == 2
+
+    assert client.post('/admin/models/activate', json={'version': 'v9999'}, headers=headers).status_code == 400
+
+
+def test_removed_active_pointer_returns_to_builtin_model(admin, client):
+    builtin = client.post('/predict', json={'features': [5, 7, 2, 5]}).get_json()
+    version = admin.model_registry.publish(*_train(n_features=8), ENHANCED_FEATURES)
+
+    admin._on_registry_change(version, None)
+    assert admin.active_model.version == version
+
+    admin._on_registry_change(None, None)
+    assert admin.active_model.version == 'builtin'
+    assert client.post('/predict', json={'features': [5, 7, 2, 5]}).get_json()['score'] == \
+        pytest.approx(builtin['score'])
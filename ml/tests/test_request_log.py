@@ -0,0 +1,116 @@
+"""Sampled, queue-backed structured logging"""
+
+import io
+import json
+import logging
+import threading
+
+import request_log
+
+
+class _Counted:
+    """Message argument that records when (and on which thread) it is formatted"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return 'counted'
+
+
+def _configure(name, rates=None, default_rate=1.0, **kwargs):
+    stream = io.StringIO()
+    handler = request_log.configure(stream=stream, name=name, **kwargs)
+    return stream, handler, request_log.RequestLogger(rates, default_rate, logging.getLogger(name))
+
+
+def _lines(stream, handler):
+    handler.flush()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_parse_sample_rates():
+    assert request_log.parse_sample_rates('/predict=0.01, /match=0.5,') == {'/predict': 0.01, '/match': 0.5}
+    assert request_log.parse_sample_rates('') == {}
+
+
+def test_json_lines_carry_route_and_fields():
+    stream, handler, log = _configure('lifelink.test.json')
+
+    log.info('/predict', 'Prediction %s score=%.4f', 'fake', -0.12345, model_version='v0001')
+
+    [entry] = _lines(stream, handler)
+    assert entry['level'] == 'INFO'
+    assert entry['route'] == '/predict'
+    assert entry['message'] == 'Prediction fake score=-0.1235'
+    assert entry['model_version'] == 'v0001'
+
+
+def test_sampled_out_lines_are_never_formatted():
+    stream, handler, log = _configure('lifelink.test.sampled', {'/predict': 0.0})
+    argument = _Counted()
+
+    for _ in range(100):
+        log.info('/predict', 'Prediction %s', argument)
+    log.info('/match', 'Matched %s', argument)
+
+    entries = _lines(stream, handler)
+    assert [entry['route'] for entry in entries] == ['/match']
+    assert log.sampled_out == 100
+    # Formatted once, by the writer thread rather than the caller
+    assert argument.threads == ['request-log-writer']
+
+
+def test_errors_are_always_logged_with_traceback():
+    stream, handler, log = _configure('lifelink.test.errors', {'/predict': 0.0}, default_rate=0.0)
+
+    try:
+        raise ValueError('bad row')
+    except ValueError as e:
+        log.error('/predict', 'Prediction failed: %s', e)
+
+    [entry] = _lines(stream, handler)
+    assert entry['level'] == 'ERROR'
+    assert entry['message'] == 'Prediction failed: bad row'
+    assert 'ValueError: bad row' in entry['exception']
+
+
+def test_service_events_and_warnings_are_never_sampled():
+    stream, handler, log = _configure('lifelink.test.events', default_rate=0.0)
+
+    log.info(None, 'Switched to model %s', 'v0002', model_version='v0002')
+    log.warning(None, 'Model not found at %s', 'models/fake_detector.pkl')
+    log.info('/predict', 'Prediction %s', 'fake')
+
+    entries = _lines(stream, handler)
+    assert [(entry['level'], entry['message']) for entry in entries] == [
+        ('INFO', 'Switched to model v0002'), ('WARNING', 'Model not found at models/fake_detector.pkl')]
+    assert 'route' not in entries[0] and entries[0]['model_version'] == 'v0002'
+
+
+def test_full_queue_drops_instead_of_blocking():
+    release = threading.Event()
+
+    class Blocked(logging.Handler):
+        def emit(self, record):
+            release.wait(5)
+
+    handler = request_log.AsyncHandler(Blocked(), max_queue=2)
+    logger = logging.getLogger('lifelink.test.full')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        for i in range(10):
+            logger.warning('line %d', i)
+        # One record is held by the writer, two wait in the queue
+        assert handler.stats()['dropped'] >= 7
+    finally:
+        release.set()
+        handler.flush()
+        logger.removeHandler(handler)
+
+
+def test_health_reports_logging(client):
+    stats = client.get('/health').get_json()['logging']
+    assert {'queued', 'dropped', 'sampled_out'} <= set(stats)
@@ -0,0 +1,86 @@
+"""Phase timings, the stack sampler and opt-in request profiles"""
+
+import threading
+import time
+
+from benchmark import REQUEST_CONTEXT, make_donors
+from request_profiler import PhaseTimer, ProfileStore, StackSampler
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _server_timing(header):
+    return {part.split(';dur=')[0]: float(part.split(';dur=')[1]) for part in header.split(', ')}
+
+
+def test_mark_excludes_durations_added_by_callbacks():
+    phases = PhaseTimer()
+    time.sleep(0.01)
+    phases.mark('parse')
+    phases.add('score', 0.02)
+    phases.mark('score')
+
+    assert phases.durations['parse'] >= 0.01
+    # The second mark only adds the few microseconds not already reported
+    assert 0.02 <= phases.durations['score'] < 0.025
+    assert list(_server_timing(phases.server_timing())) == ['parse', 'score', 'total']
+
+
+def test_stack_sampler_finds_the_hot_function():
+    sampler = StackSampler(threading.get_ident(), interval=0.001).start()
+    _busy(0.2)
+    summary = sampler.stop().summary(top_n=50)
+
+    assert summary['samples'] > 10
+    assert '_busy' in summary['self'][0]['function']
+    assert any('test_stack_sampler_finds_the_hot_function' in row['function'] for row in summary['cumulative'])
+
+
+def test_profile_store_keeps_newest(tmp_path):
+    store = ProfileStore(str(tmp_path), keep=3)
+    ids = [store.save({'n': i}) for i in range(5)]
+
+    assert [p['n'] for p in store.recent()] == [4, 3, 2]
+    assert store.get(ids[0]) is None
+    assert store.get(ids[-1])['id'] == ids[-1]
+    assert store.get('../../etc/passwd') is None
+
+
+def test_score_donors_reports_server_timing(client):
+    response = client.post('/score-donors', json={'donors': make_donors(200, seed=7), 'request_context': REQUEST_CONTEXT})
+
+    assert response.status_code == 200
+    phases = _server_timing(response.headers['Server-Timing'])
+    assert list(phases) == ['parse', 'validate', 'score', 'rank', 'serialize', 'total']
+    assert phases['total'] >= sum(v for k, v in phases.items() if k != 'total') - 0.1
+    assert 'X-Profile-Id' not in response.headers
+
+
+def test_profile_header_needs_admin_token(ml_app, client, monkeypatch):
+    # Distinct pools, so no request is answered from the result cache
+    bodies = [{'donors': make_donors(5000, seed), 'request_context': REQUEST_CONTEXT} for seed in (1, 2, 3)]
+    monkeypatch.setattr(ml_app, 'ADMIN_TOKEN', 'secret')
+
+    response = client.post('/score-donors', json=bodies[0], headers={'X-Profile': '1'})
+    assert 'X-Profile-Id' not in response.headers
+
+    response = client.post('/score-donors', json=bodies[1], headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+
+    assert client.get(f'/admin/profiles/{profile_id}').status_code == 403
+    profile = client.get(f'/admin/profiles/{profile_id}', headers={'X-Admin-Token': 'secret'}).get_json()
+    assert profile['route'] == '/score-donors'
+    assert profile['status'] == 200
+    assert {'parse', 'score', 'rank', 'serialize'} <= set(profile['phases_ms'])
+    assert profile['samples'] > 0 and profile['self']
+
+    # The client address does not matter, proxied or not
+    response = client.post('/score-donors', json=bodies[2], headers={'X-Profile': '1', 'X-Forwarded-For': '127.0.0.1'})
+    assert 'X-Profile-Id' not in response.headers
+
+    recent = client.get('/admin/profiles', headers={'X-Admin-Token': 'secret'}).get_json()['profiles']
+    assert recent[0]['id'] == profile_id
@@ -0,0 +1,88 @@
+"""Result cache tests: LRU/TTL/cost eviction and invalidation through the API"""
+
+import time
+
+import numpy as np
+
+from result_cache import ResultCache
+
+
+def test_lru_eviction_and_hit_rate():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 1)
+
+
+def test_ttl_expiry():
+    cache = ResultCache(max_entries=4, ttl_seconds=0.01)
+    cache.put('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_cost_budget():
+    cache = ResultCache(max_entries=10, ttl_seconds=60, max_cost=100)
+    cache.put('small', 1, cost=40)
+    cache.put('medium', 2, cost=50)
+    cache.put('large', 3, cost=30)  # Over budget: evicts 'small'
+    cache.put('huge', 4, cost=500)  # Never cached
+
+    assert cache.get('small') is None
+    assert cache.get('medium') == 2 and cache.get('large') == 3
+    assert cache.get('huge') is None
+    assert cache.stats()['cost'] == 80
+
+
+def test_score_donors_cache_invalidated_by_learning(ml_app, client):
+    body = {
+        'donors': [{'donor_id': 'cache-1', 'distance': 1, 'can_donate': True, 'is_available': True}],
+        'request_context': {'urgency': 'normal'}
+    }
+    ml_app.scoring_cache.clear()
+    hits = ml_app.scoring_cache.hits
+
+    first = client.post('/score-donors', json=body).get_json()
+    second = client.post('/score-donors', json=body).get_json()
+    assert first == second
+    assert ml_app.scoring_cache.hits == hits + 1
+
+    client.post('/update-learning', json={'donor_id': 'cache-1', 'response_time_minutes': 1, 'success': True})
+    third = client.post('/score-donors', json=body).get_json()
+
+    assert ml_app.scoring_cache.hits == hits + 1
+    assert third['scored_donors'][0]['confidence'] == 0.9
+
+
+def test_predict_cache_cleared_on_model_reload(ml_app, client):
+    client.post('/predict', json={'features': [0, 180, 720, 0]})
+    assert ml_app.predict_cache.stats()['entries'] >= 1
+
+    ml_app.load_model()
+
+    assert ml_app.predict_cache.stats()['entries'] == 0
+
+
+def test_score_donors_cache_hits_are_observed(ml_app, client, monkeypatch):
+    seen = []
+    monkeypatch.setattr(ml_app.agent_scorer, 'score_observer',
+                        lambda ids, order, scores: seen.append(([ids[i] for i in order.tolist()],
+                                                                np.round(scores['distance'][order], 2).tolist())))
+    body = {
+        'donors': [{'donor_id': f'observed-{i}', 'distance': i, 'can_donate': True} for i in range(3)],
+        'request_context': {'urgency': 'normal'}
+    }
+    ml_app.scoring_cache.clear()
+
+    client.post('/score-donors', json=body)
+    client.post('/score-donors', json=body)
+
+    assert len(seen) == 2 and seen[0] == seen[1]
@@ -0,0 +1,67 @@
+"""Retraining from moderator labels: validation gate, promotion and the label drop"""
+
+import pytest
+
+import retrain
+from conftest import ML_DIR
+from model_registry import BASE_FEATURES, ModelRegistry
+from train_model import generate_training_data
+
+
+@pytest.fixture
+def labels(tmp_path, monkeypatch):
+    monkeypatch.chdir(ML_DIR)  # The builtin model is loaded from models/
+    labels_dir = tmp_path / 'labels'
+    labels_dir.mkdir()
+    df = generate_training_data()
+    df[BASE_FEATURES + ['label']].to_csv(labels_dir / 'reviews.csv', index=False)
+    return str(labels_dir), str(tmp_path / 'registry')
+
+
+def test_better_candidate_is_promoted_once(labels):
+    labels_dir, registry_path = labels
+
+    report = retrain.retrain(labels_dir, registry_path, min_improvement=-1)
+    assert report['outcome'] == 'promoted' and report['serving_version'] == 'builtin'
+    # Base data plus the labels not held out
+    assert report['base_rows'] == 1000
+    assert report['training_rows'] == report['base_rows'] + report['rows'] - report['holdout_rows']
+    registry = ModelRegistry(registry_path)
+    assert registry.active_version() == report['version']
+    assert registry.metadata(report['version'])['training']['source'] == 'retrain'
+
+    again = retrain.retrain(labels_dir, registry_path)
+    assert again['outcome'] == 'skipped'
+    assert retrain.read_state(labels_dir)['last_trained']['version'] == report['version']
+
+
+def test_worse_candidate_is_rejected(labels):
+    labels_dir, registry_path = labels
+
+    report = retrain.retrain(labels_dir, registry_path, min_improvement=1)
+    assert report['outcome'] == 'rejected' and 'f1' in report['candidate'] and 'f1' in report['serving']
+    assert ModelRegistry(registry_path).versions() == []
+
+
+def test_too_few_labels_are_skipped(tmp_path):
+    labels_dir = str(tmp_path / 'labels')
+    retrain.write_label_file(labels_dir, [dict(zip(BASE_FEATURES, [1, 200, 30, 0]), label='genuine')] * 10)
+
+    report = retrain.retrain(labels_dir, str(tmp_path / 'registry'))
+    assert report['outcome'] == 'skipped' and report['rows'] == 10
+
+
+def test_label_endpoint(ml_app, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_app, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(ml_app, 'LABELS_DIR', str(tmp_path))
+    headers = {'X-Admin-Token': 'secret'}
+    row = dict(zip(BASE_FEATURES, [9, 2, 0.5, 7]), label='fake')
+
+    assert client.post('/admin/labels', json={'rows': [row]}).status_code == 403
+    response = client.post('/admin/labels', json={'rows': [row, dict(row, label='genuine')]}, headers=headers)
+    assert response.status_code == 200 and response.get_json()['rows'] == 2
+    assert len(retrain.labels_signature(str(tmp_path))) == 1
+
+    assert client.post('/admin/labels', json={'rows': [dict(row, label='maybe')]}, headers=headers).status_code == 400
+    assert client.post('/admin/labels', json={'rows': [{'label': 'fake'}]}, headers=headers).status_code == 400
+    assert client.get('/admin/retrain', headers=headers).get_json()['last_run'] is None
@@ -0,0 +1,134 @@
+"""Streaming score quantiles and calibrated /predict confidence"""
+
+import os
+
+import numpy as np
+import pytest
+
+from score_sketch import KLLSketch, ScoreCalibration
+
+
+def test_quantiles_are_accurate_in_fixed_memory():
+    values = np.random.default_rng(0).normal(0.1, 0.15, 200000)
+    sketch = KLLSketch(k=200, seed=0)
+    for chunk in np.array_split(values, 400):
+        sketch.update(chunk)
+
+    assert sketch.count == len(values) and len(sketch.to_arrays()['items']) < 1000
+    items, weights = sketch.weighted_items()
+    assert weights.sum() == len(values)
+
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+    assert np.max(np.abs(ranks - qs)) < 0.02
+    assert sketch.quantiles([0, 1]).tolist() == [values.min(), values.max()]
+
+
+def test_merge_and_round_trip():
+    rng = np.random.default_rng(1)
+    a, b = rng.uniform(-0.5, 0, 50000), rng.uniform(0, 0.5, 50000)
+    first, second = KLLSketch(seed=1), KLLSketch(seed=2)
+    first.update(a)
+    second.update(b)
+
+    merged = KLLSketch.from_arrays(**first.to_arrays()).merge(second)
+    assert merged.count == 100000 and merged.min == a.min() and merged.max == b.max()
+    assert merged.cdf([0.0])[0] == pytest.approx(0.5, abs=0.02)
+    assert merged.quantiles([0.25])[0] == pytest.approx(-0.25, abs=0.02)
+
+
+def test_confidence_is_the_quantile_rank_on_each_side_of_the_threshold():
+    calibration = ScoreCalibration(min_count=1000, refresh_seconds=3600)
+    calibration.record('v1', np.random.default_rng(2).uniform(-0.2, 0.6, 20000).tolist())
+    assert calibration.confidence('v1', 0.3) is None  # Not refreshed yet
+    calibration.refresh()
+
+    # A quarter of the scores are fake: -0.1 is halfway into them, 0.2 a third of the way into the genuine ones
+    assert calibration.confidence('v1', -0.1) == pytest.approx(0.5, abs=0.03)
+    assert calibration.confidence('v1', 0.2) == pytest.approx(1 / 3, abs=0.03)
+    assert calibration.confidence('v1', -1) == 1 and calibration.confidence('v1', 1) == 1
+    assert calibration.confidence('v2', 0.2) is None
+
+
+def test_workers_share_sketches_and_dead_ones_are_archived(tmp_path):
+    directory = str(tmp_path)
+    exited = KLLSketch()
+    exited.update([0.1] * 100)
+    np.savez(tmp_path / 'sketch-999999999.npz', **{f'{name}:v1': values for name, values in exited.to_arrays().items()})
+
+    calibration = ScoreCalibration(directory, min_count=10, refresh_seconds=3600)
+    calibration.record('v1', [-0.1] * 100)
+    calibration.refresh()
+    assert calibration.export('v1')['v1']['count'] == 200
+
+    assert ScoreCalibration(directory).absorb_dead_files() == 1
+    assert not (tmp_path / 'sketch-999999999.npz').exists()
+    calibration.record('v2', [0.2] * 20)
+    calibration.refresh()
+    assert calibration.stats()['versions'] == {'v1': {'count': 200, 'calibrated': True},
+                                               'v2': {'count': 20, 'calibrated': True}}
+
+
+def test_the_most_recently_seen_versions_and_the_pinned_one_are_kept(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr('score_sketch.time.time', lambda: next(clock))
+    calibration = ScoreCalibration(str(tmp_path), min_count=1, refresh_seconds=3600, max_versions=3)
+    calibration.pinned = 'v0'
+    for version in ['v0', 'v1', 'v2', 'v3', 'v4', 'v5', 'v2']:
+        calibration.record(version, [0.1])
+        calibration.refresh()
+    assert sorted(calibration.stats()['versions']) == ['v0', 'v2', 'v4', 'v5']
+
+    # Exited workers' sketches are pruned the same way in the archive
+    for pid, versions in ((999999998, ['v6', 'v1']), (999999999, ['v7', 'v8', 'v9'])):
+        sketches = {}
+        for version in versions:
+            sketch = KLLSketch()
+            sketch.update([0.2])
+            sketches.update({f'{name}:{version}': values for name, values in sketch.to_arrays().items()})
+            sketches[f'seen:{version}'] = np.array(float(next(clock)))
+        np.savez(tmp_path / f'sketch-{pid}.npz', **sketches)
+    (tmp_path / f'sketch-{os.getpid()}.npz').unlink()
+
+    archiver = ScoreCalibration(str(tmp_path), max_versions=3)
+    archiver.pinned = 'v1'
+    assert archiver.absorb_dead_files() == 2
+    calibration.refresh()
+    assert sorted(calibration.stats()['versions']) == ['v1', 'v7', 'v8', 'v9']
+
+
+def test_buffered_scores_are_capped_between_refreshes():
+    calibration = ScoreCalibration(refresh_seconds=3600, max_buffered=100)
+    calibration.record('v1', [0.1] * 60)
+    calibration.record('v1', np.full(60, 0.2))
+    assert calibration.stats()['buffered'] == 100 and calibration.dropped == 20
+
+    calibration.refresh()
+    calibration.record('v1', [0.3] * 50)
+    assert calibration.stats()['buffered'] == 50 and calibration.dropped == 20
+
+
+def test_predict_reports_calibrated_confidence(ml_app, client, monkeypatch):
+    calibration = ScoreCalibration(min_count=100, refresh_seconds=3600)
+    monkeypatch.setattr(ml_app, 'score_calibration', calibration)
+    rows = np.random.default_rng(3).uniform([0, 0, 0, 0], [10, 365, 200, 10], (200, 4)).round(1).tolist()
+
+    body = client.post('/predict', json={'features': rows[0]}).get_json()
+    assert body['confidence_method'] == 'raw' and body['confidence'] == min(abs(body['score']), 1.0)
+
+    client.post('/predict-batch', json={'features': rows})
+    calibration.refresh()
+    body = client.post('/predict', json={'features': rows[0]}).get_json()
+    assert body['confidence_method'] == 'quantile'
+    key = ml_app.active_model.calibration_key
+    assert key.startswith('builtin@')
+    assert body['confidence'] == calibration.confidence(key, body['score'])
+
+    # The repeated row was a cache hit, so only fresh scores are counted
+    client.post('/predict', json={'features': rows[0]})
+    calibration.refresh()
+    exported = client.get('/score-sketch').get_json()
+    assert exported['active_version'] == 'builtin' and exported['active_calibration_key'] == key
+    assert exported['versions'][key]['count'] == 201
+    assert sum(exported['versions'][key]['sketch']['weights']) == 201
+    assert client.get('/score-sketch?version=nope').status_code == 404
@@ -0,0 +1,47 @@
+"""Accuracy vs latency sweep tests"""
+
+import numpy as np
+
+from sweep_model import classification_stats, pareto_frontier, run_sweep, split
+
+
+def test_pareto_frontier_drops_dominated_candidates():
+    results = [
+        {'name': 'fast', 'f1': 0.80, 'single_row_ms': 0.1, 'model_bytes': 100},
+        {'name': 'accurate', 'f1': 0.95, 'single_row_ms': 0.5, 'model_bytes': 400},
+        {'name': 'dominated', 'f1': 0.79, 'single_row_ms': 0.2, 'model_bytes': 200},
+        {'name': 'tie', 'f1': 0.80, 'single_row_ms': 0.1, 'model_bytes': 100},
+    ]
+    assert [r['name'] for r in pareto_frontier(results)] == ['fast', 'tie', 'accurate']
+
+
+def test_classification_stats():
+    y = np.array([True, True, False, False])
+    assert classification_stats(y, np.array([True, False, True, False])) == \
+        {'precision': 0.5, 'recall': 0.5, 'f1': 0.5}
+    assert classification_stats(y, np.zeros(4, dtype=bool))['precision'] == 0.0
+
+
+def test_split_is_stratified():
+    y = np.arange(1000) < 200
+    _, y_train, _, y_test = split(np.zeros((1000, 1)), y, holdout=0.3)
+    assert len(y_test) == 300
+    assert y_train.sum() == 140 and y_test.sum() == 60
+
+
+def test_run_sweep_reports_accuracy_latency_and_size():
+    rng = np.random.default_rng(0)
+    genuine = rng.normal(0, 1, size=(400, 4))
+    fake = rng.normal(6, 1, size=(100, 4))
+    X = np.vstack([genuine, fake])
+    y = np.arange(500) >= 400
+
+    grid = {'n_estimators': [10, 30], 'max_samples': [64], 'contamination': [0.2]}
+    results = run_sweep(X, y, grid, workers=2, batch_rows=50, repeats=5)
+
+    assert [r['n_estimators'] for r in results] == [10, 30]
+    for r in results:
+        assert r['recall'] > 0.8
+        assert r['single_row_ms'] > 0 and r['batch_ms'] > 0
+        assert r['model_bytes'] > 0 and r['flat_bytes'] > 0
+    assert results[1]['model_bytes'] > results[0]['model_bytes']
@@ -0,0 +1,86 @@
+"""Out-of-core training tests"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import BASE_FEATURES
+from train_from_logs import ReservoirSampler, train_from_logs
+
+
+def _export(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'requests_per_day': rng.integers(0, 10, n),
+        'account_age_days': rng.integers(0, 365, n),
+        'time_gap_hours': rng.integers(0, 8760, n),
+        'location_changes': rng.integers(0, 10, n),
+        'request_id': np.arange(n)
+    })
+    df['label'] = np.where(df['requests_per_day'] > 7, 'fake', 'genuine')
+    return df
+
+
+def test_reservoir_keeps_a_uniform_sample():
+    sampler = ReservoirSampler(1000, 1, seed=0)
+    stream = np.arange(100000, dtype=float).reshape(-1, 1)
+    for start in range(0, len(stream), 7919):
+        sampler.add(stream[start:start + 7919])
+
+    sample = sampler.sample()[:, 0]
+    assert sampler.seen == len(stream)
+    assert len(np.unique(sample)) == 1000
+    # Roughly a tenth of the sample from each tenth of the stream
+    counts = np.bincount((sample // 10000).astype(int), minlength=10)
+    assert counts.min() > 60 and counts.max() < 140
+
+
+def test_reservoir_smaller_stream_than_k():
+    sampler = ReservoirSampler(50, 2, seed=0)
+    sampler.add(np.ones((10, 2)))
+    sampler.add(np.zeros((5, 2)))
+    assert sampler.sample().shape == (15, 2)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl', 'parquet'])
+def test_streamed_scaler_matches_full_fit(tmp_path, fmt):
+    df = _export(5000)
+    for part, start in enumerate(range(0, len(df), 2000)):
+        chunk = df.iloc[start:start + 2000]
+        path = tmp_path / f'part-{part}.{fmt}'
+        if fmt == 'csv':
+            chunk.to_csv(path, index=False)
+        elif fmt == 'jsonl':
+            chunk.to_json(path, orient='records', lines=True)
+        else:
+            chunk.to_parquet(path)
+
+    model, scaler, stats = train_from_logs([str(tmp_path)], BASE_FEATURES, chunk_size=700,
+                                           n_estimators=20, max_samples=128)
+
+    full = StandardScaler().fit(df[BASE_FEATURES].to_numpy(dtype=float))
+    np.testing.assert_allclose(scaler.mean_, full.mean_)
+    np.testing.assert_allclose(scaler.var_, full.var_)
+
+    assert stats['files'] == 3
+    assert stats['rows_seen'] == 5000
+    assert stats['samples'] == 20 * 128
+    assert 'accuracy' in stats
+    assert model.n_features_in_ == 4
+    assert model.predict(scaler.transform([[9, 1, 0, 9]]))[0] == -1
+
+
+def test_bad_rows_are_dropped_and_missing_columns_rejected(tmp_path):
+    df = _export(100)
+    df.loc[:9, 'account_age_days'] = None
+    df.to_csv(tmp_path / 'export.csv', index=False)
+
+    _, _, stats = train_from_logs([str(tmp_path / 'export.csv')], BASE_FEATURES,
+                                  n_estimators=5, max_samples=32)
+    assert stats['rows_dropped'] == 10
+    assert stats['samples'] == 90
+
+    df.drop(columns=['location_changes']).to_csv(tmp_path / 'export.csv', index=False)
+    with pytest.raises(ValueError):
+        train_from_logs([str(tmp_path / 'export.csv')], BASE_FEATURES)
@@ -0,0 +1,108 @@
+"""Content negotiation tests: MessagePack and Arrow bodies must score like JSON"""
+
+import msgpack
+import pyarrow as pa
+import pytest
+
+import wire
+
+DONORS = [
+    {'donor_id': f'd{i}', 'blood_group': 'O+' if i % 3 else 'A+', 'distance': i * 0.7,
+     'reliability_score': 40 + i, 'can_donate': i % 2 == 0, 'days_since_last_donation': 30 * i,
+     'is_available': i % 4 != 0, 'last_active_hours': i % 7}
+    for i in range(40)
+]
+CONTEXT = {'blood_group': 'O+', 'urgency': 'critical'}
+
+
+def arrow_body(rows, **metadata):
+    table = pa.Table.from_pylist(rows).replace_schema_metadata(
+        {key: wire.json.dumps(value) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def read_arrow(data):
+    return pa.ipc.open_stream(data).read_all()
+
+
+@pytest.fixture
+def json_scored(client):
+    return client.post('/score-donors', json={'donors': DONORS, 'request_context': CONTEXT}).get_json()
+
+
+def test_msgpack_round_trip(client, json_scored):
+    response = client.post('/score-donors',
+                           data=msgpack.packb({'donors': DONORS, 'request_context': CONTEXT}),
+                           content_type=wire.MSGPACK, headers={'Accept': wire.MSGPACK})
+
+    assert response.mimetype == wire.MSGPACK
+    assert msgpack.unpackb(response.data) == json_scored
+
+
+def test_arrow_donor_columns_score_like_json(client, json_scored):
+    # Drop a column and null out some values to exercise the defaults
+    rows = [dict(donor) for donor in DONORS]
+    for row in rows:
+        del row['last_active_hours']
+    rows[3]['distance'] = None
+
+    json_rows = [dict(row) for row in rows]
+    del json_rows[3]['distance']
+    expected = client.post('/score-donors', json={'donors': json_rows, 'request_context': CONTEXT}).get_json()
+
+    response = client.post('/score-donors', data=arrow_body(rows, request_context=CONTEXT),
+                           content_type=wire.ARROW)
+
+    assert response.get_json() == expected
+
+
+def test_arrow_scored_donors_feed_recommend_strategy(client, json_scored):
+    scored = client.post('/score-donors', json={'donors': DONORS, 'request_context': CONTEXT},
+                         headers={'Accept': wire.ARROW})
+    assert scored.mimetype == wire.ARROW
+    table = read_arrow(scored.data)
+    assert table.column('donor_id').to_pylist() == [d['donor_id'] for d in json_scored['scored_donors']]
+
+    # Re-send the Arrow response as-is, adding request_context to the metadata
+    metadata = dict(table.schema.metadata)
+    metadata[b'request_context'] = wire.json.dumps(CONTEXT).encode()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema.with_metadata(metadata)) as writer:
+        writer.write_table(table)
+
+    via_arrow = client.post('/recommend-strategy', data=sink.getvalue().to_pybytes(), content_type=wire.ARROW)
+    via_json = client.post('/recommend-strategy', json={'scored_donors': json_scored['scored_donors'],
+                                                        'request_context': CONTEXT})
+
+    assert via_arrow.get_json() == via_json.get_json()
+
+
+def test_unknown_content_type_is_415(client):
+    response = client.post('/score-donors', data='donors', content_type='text/csv')
+
+    assert response.status_code == 415
+
+
+def test_malformed_bodies_are_400(client):
+    for content_type in (wire.MSGPACK, wire.ARROW):
+        response = client.post('/score-donors', data=b'\xc1 not a body', content_type=content_type)
+        assert response.status_code == 400 and response.get_json()['error'] == 'Invalid request'
+
+    table = pa.Table.from_pylist(DONORS[:2]).replace_schema_metadata({'request_context': '{not json'})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    assert client.post('/match', data=sink.getvalue().to_pybytes(), content_type=wire.ARROW).status_code == 400
+
+
+def test_arrow_integer_donor_ids(client):
+    rows = [dict(donor, donor_id=i) for i, donor in enumerate(DONORS)]
+    expected = client.post('/score-donors', json={'donors': rows, 'request_context': CONTEXT}).get_json()
+
+    response = client.post('/score-donors', data=arrow_body(rows, request_context=CONTEXT), content_type=wire.ARROW)
+
+    assert response.status_code == 200 and response.get_json() == expected
+    assert isinstance(response.get_json()['scored_donors'][0]['donor_id'], int)
@@ -0,0 +1,225 @@
+"""
+LifeLink - Out-of-core training from exported request logs
+Trains the fake request detector on real feature exports of any size
+
+The export is read chunk by chunk (CSV, JSONL or Parquet, one file or a
+directory of files), so memory use is bounded by the chunk size and the
+sample, never by the size of the export:
+
+    1. StandardScaler.partial_fit() on every chunk gives the exact mean and
+       variance of the full stream.
+    2. A reservoir sample (Algorithm R, vectorized per chunk) keeps a uniform
+       random subset of rows. IsolationForest only ever looks at max_samples
+       rows per tree, so by default the reservoir holds
+       n_estimators * max_samples rows - enough for every tree to draw its
+       own rows - instead of the whole export.
+    3. The forest is fitted on the scaled sample and the model and scaler
+       are written to the same paths the serving code loads.
+
+Usage:
+    python train_from_logs.py exports/requests-2024-*.csv
+    python train_from_logs.py exports/ --features enhanced --register --activate
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from model_registry import BASE_FEATURES, ENHANCED_FEATURES, REGISTRY_PATH, ModelRegistry, save_model_files
+
+FEATURE_SETS = {
+    'base': (BASE_FEATURES, 'models/fake_detector.pkl', 'models/scaler.pkl'),
+    'enhanced': (ENHANCED_FEATURES, 'models/fake_detector_enhanced.pkl', 'models/scaler_enhanced.pkl')
+}
+
+EXTENSIONS = ('.csv', '.jsonl', '.json', '.parquet', '.pq')
+
+
+def expand_paths(paths):
+    """Files matching the given paths, globs or directories, in sorted order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(EXTENSIONS)))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return files
+
+
+def iter_chunks(paths, columns, chunk_size=100000):
+    """
+    Yield DataFrames of at most chunk_size rows with the requested columns.
+
+    Columns that are missing from a file are simply absent from its chunks;
+    callers decide whether that is an error.
+    """
+    for path in expand_paths(paths):
+        if path.endswith(('.parquet', '.pq')):
+            import pyarrow.parquet as pq
+
+            parquet = pq.ParquetFile(path)
+            present = [c for c in columns if c in parquet.schema_arrow.names]
+            for batch in parquet.iter_batches(batch_size=chunk_size, columns=present):
+                yield batch.to_pandas()
+        elif path.endswith(('.jsonl', '.json')):
+            with pd.read_json(path, lines=True, chunksize=chunk_size) as reader:
+                for chunk in reader:
+                    yield chunk[[c for c in columns if c in chunk.columns]]
+        else:
+            for chunk in pd.read_csv(path, chunksize=chunk_size,
+                                     usecols=lambda name: name in columns):
+                yield chunk
+
+
+class ReservoirSampler:
+    """Uniform random sample of k rows from a stream of row blocks"""
+
+    def __init__(self, k, n_columns, seed=42):
+        self.k = k
+        self.rows = np.empty((k, n_columns))
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, block):
+        block = np.asarray(block, dtype=float)
+        n = len(block)
+
+        # Fill the reservoir first
+        fill = min(max(self.k - self.seen, 0), n)
+        self.rows[self.seen:self.seen + fill] = block[:fill]
+
+        # Row with stream index i replaces slot randint(0, i] when that is < k
+        if fill < n:
+            positions = np.arange(self.seen + fill, self.seen + n)
+            slots = self.rng.integers(0, positions + 1)
+            keep = slots < self.k
+            slots, candidates = slots[keep], block[fill:][keep]
+            # Within a block a later row overwrites an earlier one, as in the
+            # sequential algorithm
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last
+            self.rows[slots[last]] = candidates[last]
+
+        self.seen += n
+
+    def sample(self):
+        return self.rows[:min(self.seen, self.k)]
+
+
+def train_from_logs(paths, features=BASE_FEATURES, chunk_size=100000, n_estimators=100,
+                    max_samples=256, contamination=0.2, sample_size=None, seed=42):
+    """
+    Stream the exports once and fit the scaler and forest.
+
+    Returns (model, scaler, stats). A 'label' column, when present, is only
+    used for the reported training stats ('fake'/-1 = fake).
+    """
+    sample_size = sample_size or n_estimators * max_samples
+    scaler = StandardScaler()
+    reservoir = ReservoirSampler(sample_size, len(features) + 1, seed=seed)
+
+    stats = {'files': len(expand_paths(paths)), 'chunks': 0, 'rows_seen': 0, 'rows_dropped': 0}
+    for chunk in iter_chunks(paths, list(features) + ['label'], chunk_size):
+        missing = [c for c in features if c not in chunk.columns]
+        if missing:
+            raise ValueError(f'Export is missing feature columns: {missing}')
+
+        X = chunk[list(features)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(X).any(axis=1)
+        labels = (chunk['label'].isin(['fake', -1, '-1']).to_numpy(dtype=float)
+                  if 'label' in chunk.columns else np.full(len(chunk), np.nan))
+
+        stats['chunks'] += 1
+        stats['rows_seen'] += len(chunk)
+        stats['rows_dropped'] += int((~valid).sum())
+        if not valid.any():
+            continue
+
+        scaler.partial_fit(X[valid])
+        reservoir.add(np.column_stack([X[valid], labels[valid]]))
+
+    sample = reservoir.sample()
+    if len(sample) == 0:
+        raise ValueError('No usable rows in the export')
+
+    X_scaled = scaler.transform(sample[:, :-1])
+    model = IsolationForest(
+        n_estimators=n_estimators,
+        max_samples=min(max_samples, len(sample)),
+        contamination=contamination,
+        random_state=seed,
+        bootstrap=False,
+        n_jobs=-1
+    )
+    model.fit(X_scaled)
+
+    predicted_fake = model.predict(X_scaled) == -1
+    stats.update({
+        'samples': len(sample),
+        'predicted_fake': int(predicted_fake.sum())
+    })
+    labelled = ~np.isnan(sample[:, -1])
+    if labelled.any():
+        labelled_fake = sample[labelled, -1] == 1
+        stats['labelled_fake'] = int(labelled_fake.sum())
+        stats['accuracy'] = round(float((predicted_fake[labelled] == labelled_fake).mean()), 4)
+
+    return model, scaler, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the fake request detector from exported logs')
+    parser.add_argument('paths', nargs='+', help='CSV/JSONL/Parquet files, globs or directories')
+    parser.add_argument('--features', choices=sorted(FEATURE_SETS), default='base')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--max-samples', type=int, default=256)
+    parser.add_argument('--contamination', type=float, default=0.2)
+    parser.add_argument('--sample-size', type=int, default=None,
+                        help='Reservoir size (default: n_estimators * max_samples)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--register', action='store_true', help='Also publish to the model registry')
+    parser.add_argument('--activate', action='store_true', help='Make the published version active')
+    args = parser.parse_args()
+
+    features, model_path, scaler_path = FEATURE_SETS[args.features]
+
+    print("=" * 60)
+    print("🩸 LifeLink - Fake Request Detection Training (exported logs)")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    model, scaler, stats = train_from_logs(
+        args.paths, features, chunk_size=args.chunk_size, n_estimators=args.n_estimators,
+        max_samples=args.max_samples, contamination=args.contamination,
+        sample_size=args.sample_size, seed=args.seed)
+    stats['training_seconds'] = round(time.perf_counter() - started, 2)
+
+    print(f"✅ Streamed {stats['rows_seen']} rows from {stats['files']} files "
+          f"({stats['chunks']} chunks, {stats['rows_dropped']} dropped)")
+    print(f"✅ Forest fitted on a {stats['samples']} row sample in {stats['training_seconds']}s")
+    if 'accuracy' in stats:
+        print(f"   Accuracy on labelled sample rows: {stats['accuracy'] * 100:.2f}%")
+
+    save_model_files(model, scaler, model_path, scaler_path)
+    print(f"✅ Model saved to: {model_path}")
+    print(f"✅ Scaler saved to: {scaler_path}")
+
+    if args.register:
+        registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_PATH', REGISTRY_PATH))
+        version = registry.publish(model, scaler, features, training_stats=stats)
+        print(f"✅ Published to model registry as {version}")
+        if args.activate:
+            registry.set_active(version)
+            print(f"✅ {version} is now the active model")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,8 +7,8 @@ import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+import sys
 
 def generate_training_data():
     """
@@ -101,18 +101,39 @@ def save_model(model, scaler):
     Save trained model and scaler
     """
     
-    print("\n💾 Saving model and scaler...")
+    from model_registry import save_model_files
     
-    # Create models directory
-    os.makedirs('models', exist_ok=True)
+    print("\n💾 Saving model and scaler...")
     
-    # Save model
-    joblib.dump(model, 'models/fake_detector.pkl')
-    joblib.dump(scaler, 'models/scaler.pkl')
+    # Save model (replaced atomically; a running server may be loading it)
+    save_model_files(model, scaler, 'models/fake_detector.pkl', 'models/scaler.pkl')
     
     print("✅ Model saved to: models/fake_detector.pkl")
     print("✅ Scaler saved to: models/scaler.pkl")
 
+def register_model(model, scaler, df, activate=False):
+    """
+    Publish the model to the versioned registry (see model_registry.py)
+    """
+    from model_registry import BASE_FEATURES, ModelRegistry
+    
+    X_scaled = scaler.transform(df[BASE_FEATURES].values)
+    predicted_fake = model.predict(X_scaled) == -1
+    labelled_fake = (df['label'] == 'fake').values
+    
+    registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_PATH', 'models/registry'))
+    version = registry.publish(model, scaler, BASE_FEATURES, training_stats={
+        'samples': len(df),
+        'labelled_fake': int(labelled_fake.sum()),
+        'predicted_fake': int(predicted_fake.sum()),
+        'accuracy': round(float((predicted_fake == labelled_fake).mean()), 4)
+    })
+    print(f"✅ Published to model registry as {version}")
+    
+    if activate:
+        registry.set_active(version)
+        print(f"✅ {version} is now the active model")
+
 def test_model(model, scaler):
     """
     Test model with sample data
@@ -171,6 +192,10 @@ def main():
     # Save model
     save_model(model, scaler)
     
+    # Optionally add it to the model registry
+    if '--register' in sys.argv:
+        register_model(model, scaler, df, activate='--activate' in sys.argv)
+    
     # Test model
     test_model(model, scaler)
     
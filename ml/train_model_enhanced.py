@@ -8,6 +8,7 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import sys
 from datetime import datetime
 
 def generate_enhanced_training_data():
@@ -105,14 +106,29 @@ def train_enhanced_model():
     accuracy = np.mean(predictions == df['label']) * 100
     print(f"✅ Training accuracy: {accuracy:.2f}%")
     
-    # Save model and scaler
-    os.makedirs('models', exist_ok=True)
-    joblib.dump(model, 'models/fake_detector_enhanced.pkl')
-    joblib.dump(scaler, 'models/scaler_enhanced.pkl')
+    # Save model and scaler (replaced atomically; a running server may be loading them)
+    from model_registry import save_model_files
+    save_model_files(model, scaler, 'models/fake_detector_enhanced.pkl', 'models/scaler_enhanced.pkl')
     
     print("✅ Enhanced model saved to models/fake_detector_enhanced.pkl")
     print("✅ Enhanced scaler saved to models/scaler_enhanced.pkl")
     
+    # Optionally publish to the versioned registry (see model_registry.py)
+    if '--register' in sys.argv:
+        from model_registry import ModelRegistry
+        
+        registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_PATH', 'models/registry'))
+        version = registry.publish(model, scaler, feature_columns, training_stats={
+            'samples': len(df),
+            'labelled_fake': int((df['label'] == -1).sum()),
+            'predicted_fake': int((predictions == -1).sum()),
+            'accuracy': round(accuracy / 100, 4)
+        })
+        print(f"✅ Published to model registry as {version}")
+        if '--activate' in sys.argv:
+            registry.set_active(version)
+            print(f"✅ {version} is now the active model")
+    
     return model, scaler
 
 def test_enhanced_model():
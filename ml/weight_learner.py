@@ -0,0 +1,280 @@
+"""
+LifeLink - Online learning of the donor scoring weights
+Fits AgentScorer.weights to feedback in a background thread
+
+Scoring hands the sub-scores of the top donors it returned to the
+learner (record_scores(), a non-blocking queue put; dropped when the
+queue is full). Feedback (/update-learning) hands over the outcome with
+the donor's score_breakdown, which the backend keeps from the scoring
+response and sends back. Without one the learner falls back to the
+sub-scores it last saw for that donor, but that memory is per process: with
+several workers the scoring call and the feedback rarely meet in the same
+one. Outcomes matched neither way are counted as unmatched (stats() and,
+with a metrics registry, lifelink_weight_learning_outcomes_total). Each
+(sub-score vector, outcome) pair is a training sample.
+
+The model is logistic: P(success) = sigmoid(scale * (x . w) + bias),
+with x the sub-scores / 100 and w the weights, kept on the simplex
+(every weight >= min_weight, sum 1) so total scores stay on 0-100.
+Every batch_size samples take one vectorized gradient step, and the
+new weights are published to the scorer with a single dict assignment;
+scoring never waits for training.
+
+Before a batch is trained on it is scored with the weights that were
+serving (progressive validation), so each weight version carries the
+log loss and ranking AUC of the feedback it was judged on. With a path,
+the weights live in an .npz snapshot (see snapshot_file.py): every
+worker trains against and publishes the latest shared version.
+"""
+
+import collections
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from snapshot_file import SnapshotFile
+
+# Sub-scores in the order of the weight vector
+SUBSCORES = ('distance', 'reliability', 'eligibility', 'response_history', 'blood_match', 'availability')
+
+# How an outcome found its sub-scores (the lifelink_weight_learning_outcomes_total label)
+OUTCOME_MATCHES = ('score_breakdown', 'recent_scores', 'unmatched')
+
+# History columns per weight version
+_HISTORY = ('version', 'published_at', 'samples', 'log_loss_sum', 'concordant', 'pairs')
+MAX_HISTORY = 100
+
+
+def project_to_simplex(values, floor=0.0):
+    """Closest vector to `values` with every entry >= floor and sum 1"""
+    values = np.asarray(values, dtype=float) - floor
+    mass = 1.0 - floor * len(values)
+    ordered = np.sort(values)[::-1]
+    cumulative = np.cumsum(ordered) - mass
+    k = np.flatnonzero(ordered - cumulative / np.arange(1, len(values) + 1) > 0)[-1]
+    return np.maximum(values - cumulative[k] / (k + 1), 0.0) + floor
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def concordant_pairs(scores, outcomes):
+    """(concordant, total) positive/negative pairs; concordant / total is the AUC, ties count half"""
+    positives, negatives = scores[outcomes > 0.5], np.sort(scores[outcomes <= 0.5])
+    below = np.searchsorted(negatives, positives, side='left')
+    ties = np.searchsorted(negatives, positives, side='right') - below
+    return float(np.sum(below) + 0.5 * np.sum(ties)), float(len(positives) * len(negatives))
+
+
+class WeightLearner:
+    """Background trainer of an AgentScorer's weights (see module docstring)"""
+
+    def __init__(self, scorer, path=None, batch_size=64, learning_rate=0.05, min_weight=0.02,
+                 max_queue=1024, max_recent=100000, max_recorded=1000, sync_seconds=1.0, metrics=None):
+        self.scorer = scorer
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.min_weight = min_weight
+        self.max_queue = max_queue
+        self.max_recent = max_recent
+        self.max_recorded = max_recorded
+        self.sync_seconds = sync_seconds
+
+        self.weights = project_to_simplex([scorer.weights[key] for key in SUBSCORES], min_weight)
+        self.scale, self.bias = 5.0, -2.5
+        self.version = 0
+        self.history = np.zeros((0, len(_HISTORY)))
+
+        self._file = SnapshotFile(path) if path is not None else None
+        self._recent = collections.OrderedDict()  # donor_id -> last sub-score vector
+        self._pending_x, self._pending_y = [], []
+        self.samples = 0
+        self.matched_recent = 0
+        self.unmatched = 0
+        self.dropped = 0
+        self.outcomes = None
+        if metrics is not None:
+            self.outcomes = metrics.counter(
+                'lifelink_weight_learning_outcomes_total', 'Feedback outcomes by how their sub-scores were found',
+                {'match': OUTCOME_MATCHES})
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._train_lock = threading.RLock()
+        self._sync()
+
+    # ------------------------------------------------------------------
+    # Request path (never blocks)
+    # ------------------------------------------------------------------
+
+    def record_scores(self, donor_ids, order, scores):
+        """
+        AgentScorer.score_observer: remember the sub-scores of the best
+        max_recorded donors a scoring call returned (the ones the backend
+        is likely to contact and report back on)
+        """
+        order = order[:self.max_recorded]
+        X = np.column_stack([scores[key][order] for key in SUBSCORES]) / 100.0
+        self._put(('scores', [donor_ids[i] for i in order.tolist()], X))
+
+    def record_outcome(self, donor_id, success, score_breakdown=None):
+        """Feedback for one donor; score_breakdown as returned by /score-donors, if known"""
+        x = None
+        if isinstance(score_breakdown, dict) and all(key in score_breakdown for key in SUBSCORES):
+            x = np.array([score_breakdown[key] for key in SUBSCORES], dtype=float) / 100.0
+        self._put(('outcome', donor_id, x, 1.0 if success else 0.0))
+
+    def _put(self, item):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='weight-learner', daemon=True)
+                self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Learner thread
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.sync_seconds)
+            except queue.Empty:
+                self._sync()
+                continue
+            try:
+                self._ingest(item)
+            except Exception:
+                pass  # A bad sample must not stop learning
+            finally:
+                self._queue.task_done()
+
+    def _ingest(self, item):
+        if item[0] == 'scores':
+            _, donor_ids, X = item
+            for donor_id, x in zip(donor_ids, X):
+                self._recent[donor_id] = x
+                self._recent.move_to_end(donor_id)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+            return
+
+        _, donor_id, x, y = item
+        match = 'score_breakdown'
+        if x is None:
+            x = self._recent.get(donor_id)
+            match = 'recent_scores' if x is not None else 'unmatched'
+        if self.outcomes is not None:
+            self.outcomes.inc(1, match)
+        if x is None:
+            self.unmatched += 1
+            return
+        if match == 'recent_scores':
+            self.matched_recent += 1
+        self._pending_x.append(x)
+        self._pending_y.append(y)
+        if len(self._pending_y) >= self.batch_size:
+            X, y = np.array(self._pending_x), np.array(self._pending_y)
+            self._pending_x, self._pending_y = [], []
+            self.train(X, y)
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued record has been processed (for tests and shutdown)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return not self._queue.unfinished_tasks
+
+    # ------------------------------------------------------------------
+    # Training and publishing
+    # ------------------------------------------------------------------
+
+    def train(self, X, y):
+        """One mini-batch step on samples X (rows x SUBSCORES, 0-1) with outcomes y; publishes the result"""
+        with self._train_lock:
+            if self._file is None:
+                self._step(X, y)
+                self._publish()
+                return
+            with self._file.lock():
+                self._sync()
+                self._step(X, y)
+                self._file.save({
+                    'weights': self.weights, 'scale': self.scale, 'bias': self.bias,
+                    'version': self.version, 'history': self.history
+                })
+                self._publish()
+
+    def _step(self, X, y):
+        # Progressive validation: judge the serving weights before learning from the batch
+        combined = X @ self.weights
+        p = _sigmoid(self.scale * combined + self.bias)
+        log_loss = -np.sum(y * np.log(p + 1e-12) + (1 - y) * np.log(1 - p + 1e-12))
+        concordant, pairs = concordant_pairs(combined, y)
+        self._history_row()[2:] += (len(y), log_loss, concordant, pairs)
+
+        error = (p - y) / len(y)
+        gradient = self.scale * (X.T @ error)
+        self.scale = max(0.1, self.scale - self.learning_rate * float(error @ combined))
+        self.bias -= self.learning_rate * float(np.sum(error))
+        self.weights = project_to_simplex(self.weights - self.learning_rate * gradient, self.min_weight)
+        self.version += 1
+        self.samples += len(y)
+        self._history_row()
+
+    def _history_row(self):
+        """The history row of the current version, added when it is first used"""
+        if len(self.history) == 0 or self.history[-1, 0] != self.version:
+            row = np.array([[self.version, time.time(), 0, 0, 0, 0]], dtype=float)
+            self.history = np.concatenate([self.history, row])[-MAX_HISTORY:]
+        return self.history[-1]
+
+    def _sync(self):
+        """Adopt weights another worker published"""
+        if self._file is None or not self._file.changed():
+            return
+        with self._train_lock:
+            arrays = self._file.load_if_changed()
+            if arrays is not None and int(arrays['version']) != self.version:
+                self.weights = arrays['weights']
+                self.scale, self.bias = float(arrays['scale']), float(arrays['bias'])
+                self.version = int(arrays['version'])
+                self.history = arrays['history']
+                self._publish()
+
+    def _publish(self):
+        self.scorer.set_weights(dict(zip(SUBSCORES, np.round(self.weights, 6).tolist())), self.version)
+
+    def stats(self):
+        history = self.history
+        return {
+            'version': self.version,
+            'weights': dict(zip(SUBSCORES, np.round(self.weights, 4).tolist())),
+            'samples': self.samples,
+            'pending': len(self._pending_y),
+            'matched_recent': self.matched_recent,
+            'unmatched': self.unmatched,
+            'dropped': self.dropped,
+            'history': [{
+                'version': int(row[0]),
+                'published_at': row[1],
+                'samples': int(row[2]),
+                'log_loss': round(row[3] / row[2], 4) if row[2] else None,
+                'auc': round(row[4] / row[5], 4) if row[5] else None
+            } for row in history.tolist()]
+        }
@@ -0,0 +1,181 @@
+"""
+LifeLink - Wire formats for the ML Inference API
+Content negotiation between JSON (default), MessagePack and Arrow IPC
+
+Request bodies are picked by Content-Type, responses by Accept:
+    application/json                      - default
+    application/msgpack                   - same document, binary encoded
+    application/vnd.apache.arrow.stream   - columnar donor batches
+
+An Arrow request carries one row per donor (or per scored donor for
+/recommend-strategy). Non-tabular fields such as request_context travel as
+JSON values in the schema metadata, keyed by field name. The columns are
+handed to the scorer as arrays, without building a dict per donor.
+
+msgpack and pyarrow are optional; a format whose library is missing is
+answered with 415 Unsupported Media Type, and a body that does not decode
+in its declared format with 400.
+"""
+
+import json
+
+import numpy as np
+from flask import Response, jsonify
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+_MEDIA_TYPES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    ARROW: ARROW,
+    'application/vnd.apache.arrow.file': ARROW
+}
+
+
+# Columns handed over as Python values rather than numpy arrays, so ids
+# keep their JSON type (numpy integers cannot be serialized back)
+ID_COLUMNS = ('donor_id',)
+
+
+class PayloadError(Exception):
+    """Base class of request body errors; app.py answers them with an error handler"""
+
+
+class UnsupportedMediaType(PayloadError):
+    """Raised when a body uses a format this deployment cannot decode"""
+
+
+class MalformedPayload(PayloadError):
+    """Raised when a MessagePack or Arrow body does not decode"""
+
+
+def _available(media_type):
+    if media_type == MSGPACK:
+        return msgpack is not None
+    if media_type == ARROW:
+        return pa is not None
+    return True
+
+
+def request_format(req):
+    """Media type of the request body (JSON when unspecified)"""
+    media_type = _MEDIA_TYPES.get(req.mimetype or JSON)
+    if media_type is None or not _available(media_type):
+        raise UnsupportedMediaType(req.mimetype)
+    return media_type
+
+
+def response_format(req):
+    """Best available media type from the Accept header (JSON by default)"""
+    best = req.accept_mimetypes.best_match(
+        [JSON] + [m for m in _MEDIA_TYPES if m != JSON and _available(_MEDIA_TYPES[m])],
+        default=JSON)
+    return _MEDIA_TYPES[best]
+
+
+def read_payload(req, defaults=None):
+    """
+    Decode the request body into a dict.
+
+    JSON and MessagePack bodies decode to the same document. An Arrow body
+    decodes to its schema metadata plus 'donor_columns', a dict of numpy
+    arrays keyed by column name. Nulls in a column listed in `defaults` are
+    replaced by that default before conversion.
+
+    Returns None when the body is empty or a malformed JSON body; raises
+    MalformedPayload for a MessagePack or Arrow body that does not decode.
+    """
+    media_type = request_format(req)
+
+    if media_type == JSON:
+        # Clients that omit Content-Type have always been treated as JSON
+        return req.get_json(silent=True, force=not req.mimetype)
+
+    body = req.get_data()
+    if not body:
+        return None
+
+    if media_type == MSGPACK:
+        try:
+            data = msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.exceptions.UnpackException) as e:
+            raise MalformedPayload(f'Invalid MessagePack body: {e}') from e
+        return data if isinstance(data, dict) else None
+
+    try:
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        return _table_payload(table, defaults or {})
+    except (pa.ArrowException, ValueError) as e:
+        # Also bad JSON metadata, and defaults that do not fit the column type
+        raise MalformedPayload(f'Invalid Arrow body: {e}') from e
+
+
+def _table_payload(table, defaults):
+    # Struct columns (e.g. predictions) become 'predictions.success_probability'
+    table = table.flatten()
+
+    data = {}
+    for key, value in (table.schema.metadata or {}).items():
+        data[key.decode()] = json.loads(value)
+
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in defaults and column.null_count:
+            column = column.fill_null(defaults[name])
+        if name in ID_COLUMNS or pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            columns[name] = column.to_pylist()
+        else:
+            columns[name] = column.to_numpy()
+    data['donor_columns'] = columns
+
+    return data
+
+
+def respond(req, body, status=200, rows_key=None):
+    """
+    Encode a response body in the format the client asked for.
+
+    Arrow responses are only produced for endpoints that return a list of
+    rows (rows_key). The list becomes the table, nested dicts become struct
+    columns, and every other field is stored in the schema metadata.
+    """
+    media_type = response_format(req)
+
+    if media_type == MSGPACK:
+        return Response(msgpack.packb(body, default=_to_builtin), status=status, mimetype=MSGPACK)
+
+    if media_type == ARROW and rows_key is not None and rows_key in body:
+        table = pa.Table.from_pylist(body[rows_key])
+        metadata = {key: json.dumps(value, default=_to_builtin)
+                    for key, value in body.items() if key != rows_key}
+        table = table.replace_schema_metadata(metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), status=status, mimetype=ARROW)
+
+    return jsonify(body), status
+
+
+def _to_builtin(value):
+    """Fallback encoder for numpy scalars"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')